@@ -0,0 +1,283 @@
+"""
+Local stand-in for the Notion endpoints used by the clients, and for the OpenAI vision call.
+
+Unlike the cassettes it keeps state, so created pages are found by later queries, and it can
+add latency and throttle with 429 responses like Notion does. Point the clients to it with:
+
+    COOK_UPLOAD_NOTION_URL=http://127.0.0.1:<port>/v1
+    OPENAI_BASE_URL=http://127.0.0.1:<port>/v1
+
+    python -m benchmarks.fake_api --port 8010 --latency 0.2 --requests-per-second 3
+"""
+
+import json
+import re
+from collections import Counter, deque
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from threading import Lock, Thread
+from time import monotonic, sleep
+from typing import Annotated
+from urllib.parse import parse_qs, unquote, urlsplit
+from uuid import uuid4
+
+from typer import Option, Typer
+
+from .fixtures import DB_ID, metadata, search_response, search_result
+
+app = Typer(pretty_exceptions_enable=False)
+
+MAX_PAGE_SIZE = 100
+
+
+class FakeAPI:
+    """
+    Fake Notion database and vision model served over HTTP from a background thread.
+
+    Use it as a context manager, the server listens between `__enter__` and `__exit__`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        vision_latency: float = 0.0,
+        requests_per_second: float = 0,
+        types: tuple[str, ...] = ('Meat', 'Sweet'),
+        port: int = 0,
+    ):
+        """
+        Initializes the FakeAPI instance.
+
+        Args:
+            latency (float, optional): Seconds added to every Notion response.
+            vision_latency (float, optional): Seconds added to every vision response.
+            requests_per_second (float, optional): The Notion requests accepted per second, the
+                others get a 429. 0 for no limit.
+            types (tuple[str, ...], optional): The dish types of the database.
+            port (int, optional): The port to listen on, 0 for any free one.
+        """
+        self.latency = latency
+        self.vision_latency = vision_latency
+        self.requests_per_second = requests_per_second
+        self.metadata = metadata(0, list(types))
+        self.pages: list[dict] = []
+        self.blocks: dict[str, list[dict]] = {}
+        self.requests: Counter[str] = Counter()
+        self.throttled = 0
+        self._recent: deque[float] = deque()
+        self._extractions = count()
+        self._lock = Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), _handler(self))
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """The base URL of both APIs."""
+        return f'http://127.0.0.1:{self._server.server_port}/v1'
+
+    def __enter__(self) -> 'FakeAPI':
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *_):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _throttle(self) -> bool:
+        if not self.requests_per_second:
+            return False
+        with self._lock:
+            now = monotonic()
+            while self._recent and now - self._recent[0] >= 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.requests_per_second:
+                self.throttled += 1
+                return True
+            self._recent.append(now)
+            return False
+
+    def handle(self, method: str, path: str, query: dict, body: dict) -> tuple[int, dict]:
+        """
+        Answers one request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the request, without the query string.
+            query (dict): The query string parameters.
+            body (dict): The JSON body, empty if none.
+
+        Returns:
+            tuple[int, dict]: The status and the JSON body of the response.
+        """
+        if path == '/v1/chat/completions' and method == 'POST':
+            sleep(self.vision_latency)
+            return 200, self._completion()
+
+        route = _route(method, path)
+        self.requests[route] += 1
+        if self._throttle():
+            return 429, {'object': 'error', 'status': 429, 'code': 'rate_limited'}
+        sleep(self.latency)
+
+        match route, re.findall(r'/(?:databases|blocks)/([^/]+)', path):
+            case 'GET databases', [db_id] if db_id == DB_ID:
+                return 200, self.metadata
+            case 'POST databases/query', [db_id] if db_id == DB_ID:
+                return 200, self._query(body, query.get('filter_properties'))
+            case 'POST pages', []:
+                return 200, self._create_page(body)
+            case 'GET blocks/children', [block_id] if block_id in self.blocks:
+                size = int(query.get('page_size', [MAX_PAGE_SIZE])[0])
+                return 200, _list(self.blocks[block_id][:size])
+            case 'PATCH blocks/children', [block_id] if block_id in self.blocks:
+                return 200, _list(self._append(block_id, body['children'], body.get('after')))
+        return 404, {'object': 'error', 'status': 404, 'code': 'object_not_found'}
+
+    def _query(self, body: dict, properties: list[str] | None) -> dict:
+        with self._lock:
+            pages = [page for page in self.pages if _matches(page, body.get('filter'))]
+        start = int(body.get('start_cursor') or 0)
+        end = start + min(body.get('page_size', MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+        return {
+            **search_response(0),
+            'results': [_project(page, properties) for page in pages[start:end]],
+            'next_cursor': str(end) if end < len(pages) else None,
+            'has_more': end < len(pages),
+        }
+
+    def _create_page(self, body: dict) -> dict:
+        page = search_result(0)
+        page_id = str(uuid4())
+        title = body['properties']['Name']['title'][0]['text']['content']
+        page['id'] = page_id
+        page['properties']['Name']['title'][0]['text']['content'] = title
+        page['properties']['Name']['title'][0]['plain_text'] = title
+        page['url'] = f'https://www.notion.so/{page_id.replace("-", "")}'
+        # Notion timestamps have minute precision
+        page['last_edited_time'] = datetime.now(UTC).strftime('%Y-%m-%dT%H:%M:00.000Z')
+        with self._lock:
+            self.pages.append(page)
+            self.blocks[page_id] = []
+        self._append(page_id, body.get('children', []), None)
+        return page
+
+    def _append(self, block_id: str, children: list[dict], after: str | None) -> list[dict]:
+        added = [{**child, 'id': str(uuid4())} for child in children]
+        with self._lock:
+            blocks = self.blocks[block_id]
+            index = len(blocks)
+            if after is not None:
+                index = next(i for i, block in enumerate(blocks) if block['id'] == after) + 1
+            blocks[index:index] = added
+        return added
+
+    def _completion(self) -> dict:
+        i = next(self._extractions)
+        content = {'title': f'Recipe {i}', 'ingredients': '- 1 egg', 'steps': '1. Cook it'}
+        message = {'role': 'assistant', 'content': json.dumps(content), 'refusal': None}
+        return {
+            'id': f'chatcmpl-{i}',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': 'gpt-4o-mini',
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': message}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        }
+
+
+def _route(method: str, path: str) -> str:
+    parts = [part for part in path.split('/')[2:] if part]
+    # Drop the ids, /databases/<id>/query is `databases/query`
+    return f'{method} {"/".join(parts[::2] if len(parts) > 1 else parts)}'
+
+
+def _project(page: dict, properties: list[str] | None) -> dict:
+    if properties is None:
+        return page
+    # The query string is decoded, unlike the ids
+    return {
+        **page,
+        'properties': {
+            name: value
+            for name, value in page['properties'].items()
+            if unquote(value['id']) in properties
+        },
+    }
+
+
+def _list(results: list[dict]) -> dict:
+    return {'object': 'list', 'results': results, 'next_cursor': None, 'has_more': False}
+
+
+def _matches(page: dict, filter_: dict | None) -> bool:
+    match filter_:
+        case None:
+            return True
+        case {'property': 'Name', 'title': {'equals': title}}:
+            return page['properties']['Name']['title'][0]['plain_text'] == title
+        case {'timestamp': 'last_edited_time', 'last_edited_time': {'on_or_after': after}}:
+            return page['last_edited_time'] >= after
+    return False
+
+
+def _handler(api: FakeAPI) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # The headers and the body are written separately, keep-alive would wait on delayed ACKs
+        disable_nagle_algorithm = True
+
+        def _respond(self):
+            split = urlsplit(self.path)
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length)) if length else {}
+            status, data = api.handle(self.command, split.path, parse_qs(split.query), body)
+            payload = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            if status == 429:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self._respond()
+
+        def do_POST(self):
+            self._respond()
+
+        def do_PATCH(self):
+            self._respond()
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+@app.command()
+def main(
+    port: Annotated[int, Option(help='Port to listen on.')] = 8010,
+    latency: Annotated[float, Option(help='Seconds added to every Notion response.')] = 0.0,
+    vision_latency: Annotated[
+        float,
+        Option(help='Seconds added to every vision response.'),
+    ] = 0.0,
+    requests_per_second: Annotated[
+        float,
+        Option(help='Notion requests accepted per second, 0 for no limit.'),
+    ] = 0,
+):
+    """Serves the fake APIs until interrupted."""
+    with FakeAPI(latency, vision_latency, requests_per_second, port=port) as api:
+        print(f'Listening on {api.url}')
+        try:
+            while True:
+                sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    app()
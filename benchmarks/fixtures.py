@@ -0,0 +1,196 @@
+"""Synthetic Notion responses and recipes of any size, so that the benchmarks run offline."""
+
+from uuid import UUID
+
+DB_ID = '56dada1e4604428b9e2d7d1a8d2ad131'
+USER = {'object': 'user', 'id': '9823e3c7-7622-4acd-a752-78077928d05f'}
+# Headings and dividers of the four sections of a page
+FIXED_BLOCKS = 8
+
+
+def _id(i: int) -> str:
+    return str(UUID(int=i))
+
+
+def _rich_text(content: str) -> list[dict]:
+    return [
+        {
+            'type': 'text',
+            'text': {'content': content, 'link': None},
+            'annotations': {
+                'bold': False,
+                'italic': False,
+                'strikethrough': False,
+                'underline': False,
+                'code': False,
+                'color': 'default',
+            },
+            'plain_text': content,
+            'href': None,
+        },
+    ]
+
+
+def _select(property_id: str, i: int, name: str) -> dict:
+    return {
+        'id': property_id,
+        'type': 'select',
+        'select': {'id': _id(i), 'name': name, 'color': 'blue'},
+    }
+
+
+def search_result(i: int) -> dict:
+    """
+    Builds one page of a database query response.
+
+    Args:
+        i (int): The index of the page, used for its id and title.
+
+    Returns:
+        dict: The page as returned by Notion.
+    """
+    title = f'Recipe {i}'
+    return {
+        'object': 'page',
+        'id': _id(i),
+        'created_time': '2021-06-16T20:26:00.000Z',
+        'last_edited_time': '2021-06-16T20:45:00.000Z',
+        'created_by': USER,
+        'last_edited_by': USER,
+        'cover': None,
+        'icon': None,
+        'parent': {'type': 'database_id', 'database_id': str(UUID(DB_ID))},
+        'archived': False,
+        'in_trash': False,
+        'properties': {
+            'Type': _select('%3A%3CxB', i, 'Sweet'),
+            'Origin': _select('Q%7D%3C_', i, 'Lebanon'),
+            'Difficulty': _select('oWhH', i, 'Medium'),
+            'Source': {'id': 'uv%5DN', 'type': 'rich_text', 'rich_text': _rich_text(f'p. {i}')},
+            'Date': {'id': '%7BJ%5EA', 'type': 'date', 'date': None},
+            'Name': {'id': 'title', 'type': 'title', 'title': _rich_text(title)},
+        },
+        'url': f'https://www.notion.so/Recipe-{i}-{UUID(int=i).hex}',
+        'public_url': None,
+    }
+
+
+def search_response(results: int) -> dict:
+    """
+    Builds a database query response.
+
+    Args:
+        results (int): The number of pages in the response.
+
+    Returns:
+        dict: The response as returned by Notion.
+    """
+    return {
+        'object': 'list',
+        'results': [search_result(i) for i in range(results)],
+        'next_cursor': None,
+        'has_more': False,
+        'type': 'page_or_database',
+        'page_or_database': {},
+        'request_id': _id(0),
+    }
+
+
+def _options(names: list[str]) -> dict:
+    return {
+        'options': [
+            {'id': _id(i), 'name': name, 'color': 'default', 'description': None}
+            for i, name in enumerate(names)
+        ],
+    }
+
+
+def metadata(options: int, types: list[str] | None = None) -> dict:
+    """
+    Builds a database metadata response.
+
+    Args:
+        options (int): The number of options of the type and origin select properties.
+        types (list[str], optional): Type options added before the generated ones.
+
+    Returns:
+        dict: The response as returned by Notion.
+    """
+    return {
+        'object': 'database',
+        'id': str(UUID(DB_ID)),
+        'cover': None,
+        'icon': {'type': 'emoji', 'emoji': '📖'},
+        'created_time': '2021-02-23T16:20:00.000Z',
+        'created_by': USER,
+        'last_edited_by': USER,
+        'last_edited_time': '2024-11-17T11:41:00.000Z',
+        'title': _rich_text('Recipes'),
+        'description': [],
+        'is_inline': True,
+        'properties': {
+            'Type': {
+                'id': '%3A%3CxB',
+                'name': 'Type',
+                'type': 'select',
+                'select': _options([*(types or []), *(f'Type {i}' for i in range(options))]),
+            },
+            'Origin': {
+                'id': 'Q%7D%3C_',
+                'name': 'Origin',
+                'type': 'select',
+                'select': _options([f'Country {i}' for i in range(options)]),
+            },
+            'Difficulty': {
+                'id': 'oWhH',
+                'name': 'Difficulty',
+                'type': 'select',
+                'select': _options(['Easy', 'Medium', 'Hard']),
+            },
+            'Source': {'id': 'uv%5DN', 'name': 'Source', 'type': 'rich_text', 'rich_text': {}},
+            'Date': {'id': '%7BJ%5EA', 'name': 'Date', 'type': 'date', 'date': {}},
+            'Name': {'id': 'title', 'name': 'Name', 'type': 'title', 'title': {}},
+        },
+        'parent': {'type': 'workspace', 'workspace': True},
+        'url': f'https://www.notion.so/{DB_ID}',
+        'public_url': None,
+        'archived': False,
+        'in_trash': False,
+        'request_id': _id(0),
+    }
+
+
+def page_params(blocks: int) -> dict:
+    """
+    Builds the parameters of a new page.
+
+    Args:
+        blocks (int): The number of blocks of the page body.
+
+    Returns:
+        dict: The parameters accepted by `NotionActions._create_new_page`.
+    """
+    items = max(blocks - FIXED_BLOCKS, 2)
+    return {
+        'title': 'Moise',
+        'difficulty': 'Hard',
+        'type_': 'Sweet',
+        'source': 'Test',
+        'ingredients': '\n'.join(f'- {i} g of ingredient {i}' for i in range(items // 2)),
+        'steps': '\n'.join(f'{i}. Do step number {i} of the recipe' for i in range(items // 2)),
+        'origin': None,
+        'date': '2024-12-21',
+    }
+
+
+def image(kilobytes: int) -> bytes:
+    """
+    Builds the bytes of a fake JPEG.
+
+    Args:
+        kilobytes (int): The size of the image.
+
+    Returns:
+        bytes: A JPEG header followed by pseudo random bytes.
+    """
+    return b'\xff\xd8\xff' + bytes(i * 7919 % 251 for i in range(kilobytes * 1024 - 3))
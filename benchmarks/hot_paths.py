@@ -0,0 +1,172 @@
+"""
+Offline micro-benchmarks of the CPU-bound hot paths, compared against a saved baseline.
+
+Each case runs on synthetic inputs of 10, 100 and 1000 results, blocks, options or kilobytes.
+The best time per call is compared with the baseline, and the command exits with code 1 when a
+case is slower than the baseline by more than the threshold.
+
+    python -m benchmarks.hot_paths --save      # record the baseline of this machine
+    python -m benchmarks.hot_paths             # compare against it
+"""
+
+import json
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import gettempdir
+from timeit import Timer
+from typing import Annotated
+
+from typer import Exit, Option, Typer
+
+from cook_upload.image_payload import encode_data_url
+from cook_upload.models import NotionDBMetadata, NotionDBSearch, NotionTitleSearch, TitleResult
+from cook_upload.notion_actions import NotionActions
+from cook_upload.title_index import TitleIndex
+
+from .fixtures import DB_ID, image, metadata, page_params, search_response, search_result
+
+app = Typer(pretty_exceptions_enable=False)
+
+BASELINE = Path(__file__).parent / 'baselines' / 'hot_paths.json'
+SIZES = (10, 100, 1000)
+
+
+def _new_page(blocks: int) -> Callable[[], object]:
+    notion = NotionActions('', DB_ID)
+    params = page_params(blocks)
+    return lambda: notion._create_new_page(**params)
+
+
+def _search(results: int) -> Callable[[], object]:
+    body = json.dumps(search_response(results))
+    return lambda: NotionDBSearch.model_validate(json.loads(body))
+
+
+def _titles(results: int) -> Callable[[], object]:
+    notion = NotionActions('', DB_ID)
+    body = json.dumps(_project(search_response(results), notion._title_properties())).encode()
+    return lambda: NotionTitleSearch.model_validate_json(body)
+
+
+def _project(response: dict, properties: list[str]) -> dict:
+    # What Notion returns with `filter_properties`
+    for result in response['results']:
+        result['properties'] = {
+            name: value for name, value in result['properties'].items() if value['id'] in properties
+        }
+    return response
+
+
+def _similar(titles: int) -> Callable[[], object]:
+    # Every title shares the trigrams of `Recipe`, the worst case of the inverted index
+    index = TitleIndex('benchmark', cache_dir=Path(gettempdir()))
+    index.update(TitleResult.model_validate(search_result(i)) for i in range(titles))
+    return lambda: index.similar('Recipes 12')
+
+
+def _metadata(options: int) -> Callable[[], object]:
+    body = json.dumps(metadata(options))
+    return lambda: NotionDBMetadata.model_validate(json.loads(body))
+
+
+def _encode(kilobytes: int) -> Callable[[], object]:
+    data = image(kilobytes)
+    return lambda: encode_data_url(data)
+
+
+# Every case builds, for a given size, the call to time
+CASES: dict[str, Callable[[int], Callable[[], object]]] = {
+    'new_page': _new_page,
+    'search': _search,
+    'titles': _titles,
+    'similar': _similar,
+    'metadata': _metadata,
+    'encode': _encode,
+}
+
+
+def measure(name: str, size: int, repeat: int) -> float:
+    """
+    Times one case.
+
+    Args:
+        name (str): The name of the case in `CASES`.
+        size (int): The size of the input.
+        repeat (int): The timing runs, the best one is kept.
+
+    Returns:
+        float: The time per call in milliseconds.
+    """
+    timer = Timer(CASES[name](size))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1000
+
+
+def regressions(
+    timings: dict[str, float],
+    baseline: dict[str, float],
+    threshold: float,
+) -> dict[str, float]:
+    """
+    Compares timings with a baseline.
+
+    Args:
+        timings (dict[str, float]): The time per call of every case and size.
+        baseline (dict[str, float]): The saved timings, cases missing from it are skipped.
+        threshold (float): The maximum ratio between a timing and its baseline.
+
+    Returns:
+        dict[str, float]: The ratio of every timing above the threshold.
+    """
+    ratios = {key: timing / baseline[key] for key, timing in timings.items() if key in baseline}
+    return {key: ratio for key, ratio in ratios.items() if ratio > threshold}
+
+
+@app.command()
+def main(
+    cases: Annotated[
+        list[str],
+        Option('--case', help=f'Cases to run, among {", ".join(CASES)}. Defaults to all.'),
+    ] = (),
+    sizes: Annotated[list[int], Option('--size', help='Input sizes.')] = SIZES,
+    repeat: Annotated[int, Option(min=1, help='Timing runs, the best one is kept.')] = 5,
+    baseline: Annotated[Path, Option(help='The baseline file.')] = BASELINE,
+    save: Annotated[bool, Option('--save', help='Save the timings as the baseline.')] = False,
+    threshold: Annotated[
+        float,
+        Option(min=1, help='Maximum slowdown against the baseline, as a ratio.'),
+    ] = 1.3,
+):
+    """Prints the time per call of the hot paths and fails on a regression."""
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        print(f'Unknown cases: {", ".join(sorted(unknown))}')
+        raise Exit(2)
+
+    timings = {}
+    print(f'{"case":<10}{"size":>8}{"time":>14}')
+    for name in cases or CASES:
+        for size in sizes:
+            timings[f'{name}[{size}]'] = timing = measure(name, size, repeat)
+            print(f'{name:<10}{size:>8}{timing:>11.3f} ms')
+
+    if save:
+        saved = json.loads(baseline.read_text()) if baseline.exists() else {}
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps({**saved, **timings}, indent=4, sort_keys=True) + '\n')
+        print(f'Saved the baseline to {baseline}')
+        return
+    if not baseline.exists():
+        print(f'No baseline at {baseline}, run with --save first')
+        return
+
+    slower = regressions(timings, json.loads(baseline.read_text()), threshold)
+    for key, ratio in slower.items():
+        print(f'{key} is {ratio:.2f}x slower than the baseline')
+    if slower:
+        raise Exit(1)
+    print(f'No case slower than {threshold:.2f}x the baseline')
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,113 @@
+"""
+Peak memory of building the vision request for one photo, legacy path against the low-copy one.
+
+Every upload runs in its own thread so the peak reflects concurrent uploads in one process. Each
+path is measured in a fresh interpreter, as the peak RSS of a process never goes down. The mapped
+photo counts towards the RSS of the low-copy path, but as clean page cache the kernel can drop,
+unlike the heap copies.
+
+    python -m benchmarks.image_payload --size-mb 8 --concurrency 8
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Barrier
+from typing import Annotated
+
+from typer import Option, Typer
+
+from cook_upload.constants import OPENAI_MESSAGE
+from cook_upload.image_payload import encode_data_url, map_image
+from cook_upload.models import ImageRequest
+from cook_upload.openai_actions import _image_message
+
+app = Typer(pretty_exceptions_enable=False)
+
+MB = 1024 * 1024
+
+
+def _legacy(image_path: Path) -> ImageRequest:
+    image = b64encode(image_path.read_bytes()).decode('utf-8')
+    message = deepcopy(OPENAI_MESSAGE)
+    message['content'][1]['image_url']['url'] = f'data:image/jpeg;base64,{image}'
+    return ImageRequest.model_validate(message)
+
+
+def _low_copy(image_path: Path) -> ImageRequest:
+    with map_image(image_path) as image:
+        return _image_message(encode_data_url(image), 'auto')
+
+
+PATHS = {'legacy': _legacy, 'low-copy': _low_copy}
+
+
+def _measure(path: str, image_path: Path, concurrency: int) -> dict:
+    build = PATHS[path]
+    barrier = Barrier(concurrency)
+
+    def upload(_) -> int:
+        barrier.wait()
+        request = build(image_path)
+        # Hold the request until every upload has built its own, as concurrent uploads would
+        barrier.wait()
+        return len(request.content[1].image_url.url)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    with ThreadPoolExecutor(concurrency) as executor:
+        sizes = list(executor.map(upload, range(concurrency)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    assert len(set(sizes)) == 1
+    return {
+        'path': path,
+        'traced_peak_mb': peak / MB / concurrency,
+        # ru_maxrss is in kilobytes on Linux
+        'rss_growth_mb': (rss_after - rss_before) / 1024 / concurrency,
+    }
+
+
+@app.command()
+def main(
+    size_mb: Annotated[int, Option(help='Size of the generated photo in MB.')] = 8,
+    concurrency: Annotated[int, Option(help='Number of concurrent uploads.')] = 8,
+    path: Annotated[str | None, Option(hidden=True)] = None,
+    image: Annotated[Path | None, Option(hidden=True)] = None,
+):
+    """Prints the peak memory per concurrent upload of each payload path."""
+    if path:
+        print(json.dumps(_measure(path, image, concurrency)))
+        return
+
+    with TemporaryDirectory() as directory:
+        image = Path(directory) / 'image.jpg'
+        image.write_bytes(os.urandom(size_mb * MB))
+        print(f'{size_mb} MB photo, {concurrency} concurrent uploads, per upload:')
+        for name in PATHS:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.image_payload', '--path', name]
+                + ['--image', str(image), '--concurrency', str(concurrency)],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+            result = json.loads(output)
+            print(
+                f'  {name:>8}: {result["traced_peak_mb"]:6.1f} MB traced peak, '
+                f'{result["rss_growth_mb"]:6.1f} MB peak RSS growth',
+            )
+
+
+if __name__ == '__main__':
+    app()
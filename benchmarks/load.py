@@ -0,0 +1,193 @@
+"""
+Load test of the Notion client and of `cook-batch` against the local fake APIs.
+
+The `notion` scenario adds pages from concurrent threads through `NotionActions`, duplicate
+check included. The `cli` scenario runs `cook-batch` in a subprocess on generated images, so the
+whole pipeline is exercised: encoding, vision calls and pages. Both print the throughput and the
+p50, p95 and max latency of every stage and endpoint.
+
+    python -m benchmarks.load notion --pages 200 --workers 8 --latency 0.1
+    python -m benchmarks.load cli --pages 50 --requests-per-second 3 --client-rps 3
+"""
+
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from enum import StrEnum
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Annotated
+
+from typer import Argument, Option, Typer
+
+from cook_upload.constants import (
+    CACHE_DIR_ENV,
+    NOTION_API_KEY,
+    NOTION_API_URL_ENV,
+    NOTION_DB_ID,
+    NOTION_REQUESTS_PER_SECOND_ENV,
+    OPENAI_API_KEY,
+    OPENAI_REQUESTS_PER_MINUTE_ENV,
+    OPENAI_TOKENS_PER_MINUTE_ENV,
+)
+from cook_upload.logger import logger
+from cook_upload.metrics import Metrics, format_summary, span, start_profiling, stop_profiling
+from cook_upload.notion_actions import NotionActions
+from cook_upload.rate_limit import RateLimiter
+
+from .fake_api import FakeAPI
+from .fixtures import DB_ID, image
+
+app = Typer(pretty_exceptions_enable=False)
+
+
+class Scenario(StrEnum):
+    notion = 'notion'
+    cli = 'cli'
+
+
+def run_notion(api: FakeAPI, pages: int, workers: int, client_rps: float) -> Metrics:
+    """
+    Adds pages to the fake database from concurrent threads.
+
+    Args:
+        api (FakeAPI): The running fake APIs.
+        pages (int): The number of pages to add.
+        workers (int): The number of threads adding pages.
+        client_rps (float): The client side rate limit, 0 for none.
+
+    Returns:
+        Metrics: The `add_entry` span of every page and the span of every request.
+    """
+    with TemporaryDirectory() as cache_dir:
+        notion = NotionActions(
+            'fake',
+            DB_ID,
+            cache_dir=Path(cache_dir),
+            rate_limiter=RateLimiter('Notion', requests_per_second=client_rps),
+            api_url=api.url,
+        )
+
+        def add(i: int) -> None:
+            with span('add_entry'):
+                notion.add_entry(
+                    title=f'Recipe {i}',
+                    difficulty='Easy',
+                    type_='Meat',
+                    source='Load test',
+                    ingredients='- 1 egg\n- 100 g of flour',
+                    steps='1. Mix\n2. Cook',
+                    origin=None,
+                    date=None,
+                )
+
+        metrics = start_profiling()
+        try:
+            with ThreadPoolExecutor(workers) as executor:
+                list(executor.map(add, range(pages)))
+        finally:
+            stop_profiling()
+    return metrics
+
+
+def run_cli(api: FakeAPI, pages: int, workers: int, client_rps: float) -> dict:
+    """
+    Runs `cook-batch` on generated images against the fake APIs.
+
+    Args:
+        api (FakeAPI): The running fake APIs.
+        pages (int): The number of images.
+        workers (int): The number of extraction workers.
+        client_rps (float): The client side Notion rate limit, 0 for none.
+
+    Returns:
+        dict: The metrics written by `cook-batch --metrics`.
+    """
+    with TemporaryDirectory() as directory:
+        directory = Path(directory)
+        images = directory / 'images'
+        images.mkdir()
+        for i in range(pages):
+            (images / f'page{i}.jpg').write_bytes(image(64) + i.to_bytes(4))
+
+        env = {
+            **os.environ,
+            CACHE_DIR_ENV: (directory / 'cache').as_posix(),
+            NOTION_API_URL_ENV: api.url,
+            NOTION_API_KEY: 'fake',
+            NOTION_DB_ID: DB_ID,
+            NOTION_REQUESTS_PER_SECOND_ENV: str(client_rps),
+            'OPENAI_BASE_URL': api.url,
+            OPENAI_API_KEY: 'fake',
+            OPENAI_REQUESTS_PER_MINUTE_ENV: '0',
+            OPENAI_TOKENS_PER_MINUTE_ENV: '0',
+        }
+        metrics_path = directory / 'metrics.json'
+        subprocess.run(
+            [
+                sys.executable,
+                '-m',
+                'cook_upload.batch',
+                images.as_posix(),
+                '--source',
+                'Load test',
+                '--type',
+                'Meat',
+                '--difficulty',
+                'easy',
+                '--workers',
+                str(workers),
+                '--metrics',
+                metrics_path.as_posix(),
+            ],
+            env=env,
+            capture_output=True,
+            check=True,
+        )
+        return json.loads(metrics_path.read_text())
+
+
+@app.command()
+def main(
+    scenario: Annotated[Scenario, Argument(help='What to drive against the fake APIs.')],
+    pages: Annotated[int, Option(min=1, help='Number of pages to add.')] = 100,
+    workers: Annotated[int, Option(min=1, help='Number of concurrent workers.')] = 8,
+    latency: Annotated[float, Option(help='Seconds added to every Notion response.')] = 0.05,
+    vision_latency: Annotated[
+        float,
+        Option(help='Seconds added to every vision response.'),
+    ] = 0.5,
+    requests_per_second: Annotated[
+        float,
+        Option(help='Notion requests the fake server accepts per second, 0 for no limit.'),
+    ] = 0,
+    client_rps: Annotated[
+        float,
+        Option(help='Notion requests per second the client allows itself, 0 for no limit.'),
+    ] = 0,
+):
+    """Prints the throughput and the latency of every stage and endpoint."""
+    logger.remove()
+    with FakeAPI(latency, vision_latency, requests_per_second) as api:
+        start = perf_counter()
+        if scenario == Scenario.notion:
+            metrics = run_notion(api, pages, workers, client_rps)
+            summary, report = metrics.summary(), metrics.report()
+        else:
+            data = run_cli(api, pages, workers, client_rps)
+            summary, report = data['summary'], format_summary(data['summary'])
+        elapsed = perf_counter() - start
+
+    print(report)
+    print(f'\n{len(api.pages)} pages in {elapsed:.2f}s, {len(api.pages) / elapsed:.1f} pages/s')
+    print(f'{api.throttled} requests throttled by the server')
+    for name, stats in summary.items():
+        if set(stats['statuses']) - {'200', 'ok'}:
+            print(f'{name} statuses: {stats["statuses"]}')
+
+
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,87 @@
+"""
+Time to build the body of a new page, from the recipe text to the dict sent to Notion.
+
+Compares the former model round trip, the direct builder, and the direct builder with the
+`validate_payloads` debug mode, at several page sizes.
+
+    python -m benchmarks.page_payload
+"""
+
+from timeit import Timer
+from typing import Annotated
+
+from typer import Option, Typer
+
+from cook_upload.constants import DELIMITER, NEW_PAGE_QUERY_TEMPLATE
+from cook_upload.models import NotionNewPage
+from cook_upload.models.notion_dbnewpage_model import BulletListItem, Delimiter, Heading2Block
+from cook_upload.notion_actions import NotionActions
+
+from .fixtures import DB_ID, page_params
+
+app = Typer(pretty_exceptions_enable=False)
+
+
+def _legacy(params: dict) -> dict:
+    """Validate, dump to JSON, validate again and dump, as `_create_new_page` used to."""
+    model = NotionNewPage.model_validate(NEW_PAGE_QUERY_TEMPLATE)
+    model.parent.database_id = DB_ID
+    model.properties.name.title[0].text.content = params['title']
+    model.properties.type_.select.name = params['type_']
+    model.properties.difficulty.select.name = params['difficulty']
+    model.properties.source.rich_text[0].text.content = params['source']
+    model.properties.date.date.start = params['date']
+    for title, text in (('Ingredients', params['ingredients']), ('Steps', params['steps'])):
+        model.children.append(
+            Heading2Block(
+                object='block',
+                type='heading_2',
+                heading_2={'rich_text': [{'type': 'text', 'text': {'content': title}}]},
+            ),
+        )
+        model.children.extend(
+            BulletListItem(
+                object='block',
+                type='bulleted_list_item',
+                bulleted_list_item={'rich_text': [{'type': 'text', 'text': {'content': item}}]},
+            )
+            for item in text.split('\n')
+        )
+        model.children.append(Delimiter(**DELIMITER))
+    model = NotionNewPage.model_validate_json(
+        model.model_dump_json(by_alias=True, exclude_none=True),
+    )
+    return model.model_dump(by_alias=True, exclude_none=True)
+
+
+@app.command()
+def main(
+    sizes: Annotated[list[int], Option('--size', help='Number of blocks of a page.')] = (
+        10,
+        100,
+        1000,
+    ),
+    repeat: Annotated[int, Option(min=1, help='Timing runs, the best one is reported.')] = 5,
+):
+    """Prints the time per page of each way of building the body."""
+    direct = NotionActions('', DB_ID)
+    validated = NotionActions('', DB_ID, validate_payloads=True)
+    builders = {
+        'legacy': _legacy,
+        'direct': lambda params: direct._new_page_query(**params),
+        'validated': lambda params: validated._new_page_query(**params),
+    }
+
+    print(f'{"blocks":>8}' + ''.join(f'{name:>14}' for name in builders))
+    for size in sizes:
+        params = page_params(size)
+        timings = []
+        for build in builders.values():
+            timer = Timer(lambda build=build, params=params: build(params))
+            number, _ = timer.autorange()
+            timings.append(min(timer.repeat(repeat, number)) / number * 1000)
+        print(f'{size:>8}' + ''.join(f'{timing:>11.3f} ms' for timing in timings))
+
+
+if __name__ == '__main__':
+    app()
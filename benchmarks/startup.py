@@ -0,0 +1,97 @@
+"""
+Startup cost of the CLI, from `python -X importtime` and the wall clock of `cook --help`.
+
+Exits with code 1 when importing `cook_upload.main` takes longer than the threshold or pulls in
+one of the dependencies that should only be imported when an image is uploaded.
+
+    python -m benchmarks.startup --threshold-ms 100
+"""
+
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+from typing import Annotated
+
+from typer import Exit, Option, Typer
+
+app = Typer(pretty_exceptions_enable=False)
+
+MODULE = 'cook_upload.main'
+DEFERRED_IMPORTS = (
+    'dotenv',
+    'httpx',
+    'iso3166',
+    'loguru',
+    'openai',
+    'pydantic',
+    'requests',
+    'sqlite3',
+)
+
+
+def import_times(module: str = MODULE) -> dict[str, int]:
+    """
+    Imports a module in a fresh interpreter with `-X importtime`.
+
+    Args:
+        module (str, optional): The module to import.
+
+    Returns:
+        dict[str, int]: The cumulative import time in microseconds of every imported module.
+    """
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.removeprefix('import time:').split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def _wall_clock_ms(args: list[str], repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = perf_counter()
+        subprocess.run([sys.executable, *args], capture_output=True, check=True)
+        runs.append((perf_counter() - start) * 1000)
+    return median(runs)
+
+
+@app.command()
+def main(
+    threshold_ms: Annotated[
+        float,
+        Option(help=f'Maximum cumulative import time of {MODULE}.'),
+    ] = 100,
+    repeat: Annotated[int, Option(min=1, help='Runs of each wall clock measurement.')] = 5,
+):
+    """Prints the startup cost of the CLI and fails on a regression."""
+    times = import_times()
+    import_ms = times[MODULE] / 1000
+    deferred = sorted(name for name in DEFERRED_IMPORTS if name in times)
+
+    interpreter_ms = _wall_clock_ms(['-c', 'pass'], repeat)
+    help_ms = _wall_clock_ms(['-m', MODULE, '--help'], repeat)
+
+    print(f'import {MODULE}: {import_ms:.1f} ms (threshold {threshold_ms:.0f} ms)')
+    print(
+        f'cook --help: {help_ms:.1f} ms, {help_ms - interpreter_ms:.1f} ms over a bare interpreter',
+    )
+    for name, cumulative in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        print(f'  {cumulative / 1000:8.1f} ms  {name}')
+
+    if deferred:
+        print(f'Imported on startup, but should be deferred: {", ".join(deferred)}')
+    if deferred or import_ms > threshold_ms:
+        raise Exit(code=1)
+
+
+if __name__ == '__main__':
+    app()
@@ -1,10 +1,52 @@
-from .constants import DishDifficulty
-from .models import (
-    ExtractionResponse,
-    ImageRequest,
-    NotionDBMetadata,
-    NotionDBSearch,
-    NotionNewPage,
-)
-from .notion_actions import NotionActions, PageAlreadyCreatedError
-from .openai_actions import parse_image
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .async_notion_actions import AsyncNotionActions
+    from .constants import DishDifficulty
+    from .image_hash import SimilarImageError
+    from .models import (
+        ExtractionResponse,
+        ImageRequest,
+        NotionDBMetadata,
+        NotionDBSearch,
+        NotionNewPage,
+        NotionTitleSearch,
+    )
+    from .notion_actions import NotionActions, PageAlreadyCreatedError
+    from .openai_actions import aparse_image, parse_image
+    from .title_index import TitleIndex
+
+# The public names are imported on first access, so that the CLI does not pay for the HTTP
+# clients, pydantic and openai before it needs them.
+_EXPORTS = {
+    'AsyncNotionActions': '.async_notion_actions',
+    'DishDifficulty': '.constants',
+    'ExtractionResponse': '.models',
+    'ImageRequest': '.models',
+    'NotionDBMetadata': '.models',
+    'NotionDBSearch': '.models',
+    'NotionNewPage': '.models',
+    'NotionTitleSearch': '.models',
+    'NotionActions': '.notion_actions',
+    'PageAlreadyCreatedError': '.notion_actions',
+    'SimilarImageError': '.image_hash',
+    'aparse_image': '.openai_actions',
+    'parse_image': '.openai_actions',
+    'TitleIndex': '.title_index',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        msg = f'module {__name__!r} has no attribute {name!r}'
+        raise AttributeError(msg)
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_EXPORTS])
@@ -0,0 +1,382 @@
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+import httpx
+from pydantic import validate_call
+
+from .constants import (
+    NOTION_BLOCK_CHILDREN_API_URL,
+    NOTION_DB_API_URL,
+    NOTION_MAX_CHILDREN,
+    NOTION_PAGES_API_URL,
+    NOTION_QUERY_PAGE_SIZE,
+)
+from .logger import logger
+from .metrics import endpoint, span
+from .models import NotionDBMetadata, NotionDBSearch, NotionTitleSearch, TitleResult
+from .models.notion_dbsearch_model import Result
+from .notion_actions import BaseNotionActions
+
+
+class AsyncNotionActions(BaseNotionActions):
+    """Asyncio counterpart of `NotionActions`, sharing one HTTP connection pool across calls."""
+
+    def __init__(self, api_key, db_id, client: httpx.AsyncClient | None = None, **kwargs):
+        """
+        Initializes the AsyncNotionActions instance.
+
+        Args:
+            api_key (str): The API key for authenticating with the Notion API.
+            db_id (str): The ID of the Notion database to interact with.
+            client (httpx.AsyncClient, optional): The HTTP client to use. If not given, one is
+                created and closed together with this instance.
+            **kwargs: The metadata cache options accepted by `BaseNotionActions`.
+        """
+        super().__init__(api_key, db_id, **kwargs)
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Closes the HTTP client if it has been created by this instance."""
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a request once the rate limiter allows it, and raises for error statuses.
+
+        The request is recorded as a span when profiling.
+
+        Args:
+            method (str): The HTTP method of the request.
+            url (str): The URL of the request.
+            **kwargs: Extra arguments forwarded to `httpx.AsyncClient.request`.
+
+        Returns:
+            httpx.Response: The successful response.
+
+        Raises:
+            httpx.HTTPStatusError: If the response has an error status.
+        """
+        await self.rate_limiter.aacquire()
+        with span(endpoint(method, url)) as timing:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            timing.status = response.status_code
+            timing.request_bytes = len(response.request.content)
+            timing.response_bytes = len(response.content)
+            response.raise_for_status()
+        return response
+
+    async def get_db_metadata(self, max_age: float | None = None) -> NotionDBMetadata:
+        """
+        Retrieves metadata for the Notion database, cached like `NotionActions.get_db_metadata`.
+
+        Args:
+            max_age (float, optional): The maximum age in seconds of the cached metadata.
+                Defaults to the instance `metadata_ttl`, 0 always fetches it.
+
+        Returns:
+            NotionDBMetadata: The metadata of the Notion database.
+
+        Raises:
+            httpx.HTTPStatusError: If the request to retrieve the metadata fails.
+        """
+        metadata = self._cached_metadata(self.metadata_ttl if max_age is None else max_age)
+        if metadata is not None:
+            return metadata
+        try:
+            response = await self._request(
+                'GET',
+                NOTION_DB_API_URL.format(self.api_url, self.db_id),
+            )
+        except httpx.HTTPStatusError as e:
+            msg = f'Failed to get database metadata. Error {e.response.text}'
+            logger.error(msg)
+            raise
+        return self._cache_metadata(response.json())
+
+    @validate_call
+    async def get_entry(self, title: str = '') -> NotionDBSearch:
+        """
+        Retrieves an entry from the Notion database.
+
+        Args:
+            title (str, optional): The title of the page to search for. If empty,
+                the entire database will be returned.
+
+        Returns:
+            NotionDBSearch: The search result containing the pages that match the title.
+        """
+        pages = [
+            data async for data in self._iter_pages(self._query_payload(self._title_filter(title)))
+        ]
+        return self._merge_pages(pages)
+
+    async def iter_entries(
+        self,
+        filter_: dict | None = None,
+        sorts: list[dict] | None = None,
+        page_size: int = NOTION_QUERY_PAGE_SIZE,
+    ) -> AsyncIterator[Result]:
+        """
+        Lazily iterates over the pages of the Notion database matching a query.
+
+        Args:
+            filter_ (dict, optional): The Notion filter object. All the pages if not given.
+            sorts (list[dict], optional): The Notion sort objects.
+            page_size (int, optional): The number of results fetched per request, at most 100.
+
+        Yields:
+            Result: The matching pages.
+        """
+        async for data in self._iter_pages(self._query_payload(filter_, sorts, page_size)):
+            for result in data.results:
+                yield result
+
+    async def iter_titles(
+        self,
+        filter_: dict | None = None,
+        sorts: list[dict] | None = None,
+        page_size: int = NOTION_QUERY_PAGE_SIZE,
+        sources: bool = True,
+    ) -> AsyncIterator[TitleResult]:
+        """
+        Lazily iterates over the titles of the pages matching a query, see
+        `NotionActions.iter_titles`.
+
+        Args:
+            filter_ (dict, optional): The Notion filter object. All the pages if not given.
+            sorts (list[dict], optional): The Notion sort objects.
+            page_size (int, optional): The number of results fetched per request, at most 100.
+            sources (bool, optional): Also return the sources, which needs the database
+                metadata.
+
+        Yields:
+            TitleResult: The matching pages.
+        """
+        properties = self._title_properties(await self.get_db_metadata() if sources else None)
+        body = self._query_payload(filter_, sorts, page_size)
+        async for data in self._iter_pages(body, lambda body: self.query_titles(body, properties)):
+            for result in data.results:
+                yield result
+
+    async def _iter_pages(
+        self,
+        body: dict,
+        query: Callable[[dict], Awaitable[NotionDBSearch | NotionTitleSearch]] | None = None,
+    ) -> AsyncIterator[NotionDBSearch | NotionTitleSearch]:
+        query = query or self.query
+        while True:
+            data = await query(body)
+            yield data
+            if not data.has_more:
+                return
+            body = {**body, 'start_cursor': data.next_cursor}
+
+    async def query(self, body: dict) -> NotionDBSearch:
+        """
+        Queries the Notion database.
+
+        Args:
+            body (dict): The query body, with the optional `filter`, `sorts`, `start_cursor`
+                and `page_size` keys.
+
+        Returns:
+            NotionDBSearch: One page of the pages matching the query.
+
+        Raises:
+            httpx.HTTPStatusError: If the query fails.
+        """
+        try:
+            response = await self._request(
+                'POST',
+                f'{NOTION_DB_API_URL.format(self.api_url, self.db_id)}/query',
+                json=body,
+            )
+        except httpx.HTTPStatusError as e:
+            msg = f'Failed to get page. Error {e.response.text}'
+            logger.error(msg)
+            raise
+
+        data = response.json()
+        logger.debug('Validated query {} and got {}', body, data)
+        with span('notion validate query'):
+            return NotionDBSearch.model_validate(data)
+
+    async def query_titles(self, body: dict, properties: list[str]) -> NotionTitleSearch:
+        """
+        Queries the Notion database for some properties of the pages only.
+
+        Args:
+            body (dict): The query body, like for `query`.
+            properties (list[str]): The ids of the properties Notion returns.
+
+        Returns:
+            NotionTitleSearch: One page of the pages matching the query.
+
+        Raises:
+            httpx.HTTPStatusError: If the query fails.
+        """
+        try:
+            response = await self._request(
+                'POST',
+                f'{NOTION_DB_API_URL.format(self.api_url, self.db_id)}/query'
+                f'?{self._filter_properties(properties)}',
+                json=body,
+            )
+        except httpx.HTTPStatusError as e:
+            msg = f'Failed to get page. Error {e.response.text}'
+            logger.error(msg)
+            raise
+
+        logger.opt(lazy=True).debug(
+            'Queried titles {} and got {}',
+            lambda: body,
+            lambda: response.text,
+        )
+        with span('notion validate titles'):
+            return NotionTitleSearch.model_validate_json(response.content)
+
+    @validate_call
+    async def is_title_used(self, title: str, source: str, force: bool = False) -> None:
+        """
+        Checks if a title has already been used in the Notion database.
+
+        Args:
+            title (str): The title to check for.
+            source (str): The source associated with the title.
+            force (bool, optional): If True, allows page to be added even if the title and sources
+                pair already exists.
+
+        Raises:
+            PageAlreadyCreatedError: If the title has already been used and `force` is False.
+        """
+        titles = self.iter_titles(self._title_filter(title), sources=False)
+        results = [result async for result in titles]
+        self._check_title(self._matching_urls(results, title), title, source, force)
+
+    async def add_entry(
+        self,
+        title: str,
+        difficulty: str,
+        type_: str,
+        source: str,
+        ingredients: str,
+        steps: str,
+        origin: str,
+        date: str,
+        force: bool = False,
+        checked: bool = False,
+    ) -> str:
+        """
+        Adds a new entry to the Notion database, appending long pages like `NotionActions`.
+
+        Args:
+            title (str): The title of the new page.
+            difficulty (str): The difficulty level of the content.
+            type_ (str): The type of content.
+            source (str): The source of the content.
+            ingredients (str): The ingredients required.
+            steps (str): The steps involved.
+            origin (str): The origin of the recipe or content.
+            date (str): The date for the entry.
+            force (bool, optional): If True, forces adding the page.
+            checked (bool, optional): If True, the title was already checked with
+                `is_title_used`, which is not called again.
+
+        Returns:
+            str: The ID of the new page.
+
+        Raises:
+            httpx.HTTPStatusError: If the request to add the new page or its blocks fails.
+        """
+        params = {
+            'title': title,
+            'difficulty': difficulty,
+            'type_': type_,
+            'source': source,
+            'ingredients': ingredients,
+            'steps': steps,
+            'origin': origin,
+            'date': date,
+        }
+
+        if not checked:
+            await self.is_title_used(title, source, force)
+        new_query = self._new_page_query(**params)
+        new_query['children'], pending = self._split_children(new_query['children'])
+        try:
+            logger.info(f'Adding new page with title: {title}')
+            logger.debug('Trying adding a new page with query {}', new_query)
+            response = await self._request(
+                'POST',
+                NOTION_PAGES_API_URL.format(self.api_url),
+                json=new_query,
+            )
+        except httpx.HTTPStatusError as e:
+            logger.error(
+                f'Error in creating a new page with query: {new_query} Error {e.response.text}',
+            )
+            raise
+        page = response.json()
+        if pending:
+            try:
+                await self._append_sections(page['id'], pending)
+            except httpx.HTTPStatusError as e:
+                logger.error(
+                    f'Page {page["id"]} was created without all its blocks, appending them '
+                    f'failed. Error {e.response.text}',
+                )
+                raise
+        logger.info('Page added.')
+        return page['id']
+
+    async def _append_sections(self, page_id: str, pending: list[tuple[int, list[dict]]]) -> None:
+        """
+        Appends the blocks left over by `_split_children` to a new page.
+
+        Args:
+            page_id (str): The ID of the new page.
+            pending (list[tuple[int, list[dict]]]): The blocks to append to each section.
+        """
+        response = await self._request(
+            'GET',
+            NOTION_BLOCK_CHILDREN_API_URL.format(self.api_url, page_id),
+            params={'page_size': NOTION_MAX_CHILDREN},
+        )
+        block_ids = [block['id'] for block in response.json()['results']]
+        logger.debug(f'Appending {sum(len(blocks) for _, blocks in pending)} blocks to {page_id}')
+        # One after another, Notion answers concurrent appends to a page with conflicts
+        for index, blocks in pending:
+            await self._append_children(page_id, blocks, block_ids[index])
+
+    async def _append_children(self, block_id: str, children: list[dict], after: str) -> None:
+        """
+        Appends blocks after a given child of a block, in requests of at most 100 blocks.
+
+        Args:
+            block_id (str): The ID of the parent block or page.
+            children (list[dict]): The blocks to append, in order.
+            after (str): The ID of the child the blocks are appended after.
+        """
+        for start in range(0, len(children), NOTION_MAX_CHILDREN):
+            response = await self._request(
+                'PATCH',
+                NOTION_BLOCK_CHILDREN_API_URL.format(self.api_url, block_id),
+                json={'children': children[start : start + NOTION_MAX_CHILDREN], 'after': after},
+            )
+            after = response.json()['results'][-1]['id']
+
+    async def dish_type(self) -> list[str]:
+        """
+        Retrieves the dish types allowed by the database.
+
+        Returns:
+            list[str]: The lowercase names of the allowed dish types.
+        """
+        return self._dish_types(await self.get_db_metadata())
@@ -0,0 +1,519 @@
+import json
+from glob import has_magic
+from pathlib import Path
+from typing import Annotated
+
+from typer import Argument, BadParameter, Exit, Option, Typer, echo
+
+from .constants import (
+    BATCH_IMAGE_SUFFIXES,
+    BATCH_MAX_WORKERS,
+    BATCH_NOTION_WORKERS,
+    BATCH_PREPARE_WORKERS,
+    BATCH_QUEUE_SIZE,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_MAX_EDGE,
+    TITLE_SIMILARITY_THRESHOLD,
+    DishDifficulty,
+    ImageDetail,
+)
+from .image_processing import ImageOptions
+from .journal import Job, JobStage, Journal
+from .logger import logger
+from .main import (
+    DetailOption,
+    GrayscaleOption,
+    MaxEdgeOption,
+    MetricsOption,
+    PreparedImage,
+    ProfileOption,
+    QualityOption,
+    _validate_country,
+    _validate_date,
+    _validate_dish_type,
+    _validate_image,
+    add_recipe,
+    extract_image,
+    get_notion_instance,
+    get_ocr_cache,
+    get_openai_instance,
+    prepare_image,
+    report_metrics,
+    start_metrics,
+)
+from .models import ExtractionResponse
+from .openai_batch import extract_to_cache
+from .pipeline import Pipeline, Stage
+from .title_index import TitleIndex
+
+SimilarityOption = Annotated[
+    float,
+    Option(
+        min=0,
+        max=1,
+        help='Similarity, from 0 to 1, above which an existing title is reported as a possible '
+        'duplicate, without blocking the upload. 1 disables the report.',
+    ),
+]
+
+app = Typer(
+    no_args_is_help=True,
+    rich_markup_mode='markdown',
+    context_settings={'help_option_names': ['-h', '--help']},
+    pretty_exceptions_enable=False,
+)
+
+
+def collect_images(inputs: list[Path]) -> list[tuple[Path, dict]]:
+    """
+    Expands the batch inputs into the list of images to process.
+
+    Each input can be a directory (all the JPEG files in it), a glob pattern, a single image or a
+    `.jsonl` manifest. Every manifest line is an object with an `image` key and optional
+    `source`, `difficulty`, `type`, `country` and `date` keys overriding the batch defaults.
+
+    Args:
+        inputs (list[Path]): The directories, globs, images or manifests to expand.
+
+    Returns:
+        list[tuple[Path, dict]]: The images with their per image overrides, in input order.
+
+    Raises:
+        BadParameter: If an input does not exist or a manifest line is not valid.
+    """
+    images = []
+    for input_ in inputs:
+        if has_magic(input_.as_posix()):
+            root = Path(input_.anchor or '.')
+            pattern = input_.relative_to(root).as_posix()
+            images.extend((path, {}) for path in sorted(root.glob(pattern)))
+        elif input_.is_dir():
+            images.extend(
+                (path, {})
+                for path in sorted(input_.iterdir())
+                if path.suffix.lower() in BATCH_IMAGE_SUFFIXES
+            )
+        elif input_.suffix == '.jsonl' and input_.is_file():
+            images.extend(_read_manifest(input_))
+        elif input_.is_file():
+            images.append((input_, {}))
+        else:
+            msg = f"The input '{input_}' does not exist."
+            logger.error(msg)
+            raise BadParameter(msg)
+    return images
+
+
+def _read_manifest(manifest: Path) -> list[tuple[Path, dict]]:
+    images = []
+    for line_number, line in enumerate(manifest.read_text().splitlines(), start=1):
+        if not line.strip():
+            continue
+        msg = f'Line {line_number} of {manifest} is not a valid manifest entry: {line}'
+        try:
+            overrides = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.error(msg)
+            raise BadParameter(msg) from e
+        if not isinstance(overrides, dict) or not isinstance(overrides.get('image'), str):
+            logger.error(msg)
+            raise BadParameter(msg)
+        image = Path(overrides.pop('image'))
+        images.append((image if image.is_absolute() else manifest.parent / image, overrides))
+    return images
+
+
+def _resolve_params(defaults: dict, overrides: dict) -> dict:
+    """
+    Merges the batch defaults with the manifest overrides of one image, validating the overrides.
+
+    Args:
+        defaults (dict): The page parameters given on the command line.
+        overrides (dict): The manifest values for the image.
+
+    Returns:
+        dict: The page parameters to use for the image.
+
+    Raises:
+        BadParameter: If an override is not valid or a required parameter is missing.
+    """
+    invalid = [key for key, value in overrides.items() if not isinstance(value, str)]
+    if invalid:
+        msg = f'The manifest values of {invalid} must be strings'
+        raise BadParameter(msg)
+
+    params = dict(defaults)
+    if 'source' in overrides:
+        params['source'] = overrides['source'].title()
+    if 'difficulty' in overrides:
+        try:
+            params['difficulty'] = DishDifficulty(overrides['difficulty'].title()).value
+        except ValueError as e:
+            msg = f'The difficulty {overrides["difficulty"]} is not valid'
+            raise BadParameter(msg) from e
+    if 'type' in overrides:
+        params['type_'] = _validate_dish_type(overrides['type'])
+    if 'country' in overrides:
+        params['origin'] = _validate_country(overrides['country'])
+    if 'date' in overrides:
+        params['date'] = _validate_date(overrides['date'])
+
+    missing = [key for key in ('source', 'difficulty', 'type_') if not params.get(key)]
+    if missing:
+        msg = f'Missing parameters {missing}. Pass them on the command line or in the manifest.'
+        raise BadParameter(msg)
+    return params
+
+
+def _check_images(images: list[tuple[Path, dict]], defaults: dict) -> dict[Path, str]:
+    """
+    Validates the images and their page parameters, before paying for their extraction.
+
+    Args:
+        images (list[tuple[Path, dict]]): The images with their per image overrides.
+        defaults (dict): The page parameters shared by all the images.
+
+    Returns:
+        dict[Path, str]: The error message of every invalid image.
+    """
+    failures = {}
+    for image_path, overrides in images:
+        try:
+            _validate_image(image_path)
+            _resolve_params(defaults, overrides)
+        except BadParameter as e:
+            failures[image_path] = str(e)
+    return failures
+
+
+def _validate_optional_dish_type(type_: str | None) -> str | None:
+    return _validate_dish_type(type_) if type_ else None
+
+
+def _advance(journal: Journal | None, image_path: Path, key: str, stage: JobStage) -> None:
+    if journal is not None:
+        journal.advance(key, image_path, stage)
+
+
+def _uploaded(done: Job | None) -> bool:
+    return done is not None and done.stage == JobStage.created
+
+
+def _previous_job(journal: Journal | None, image_path: Path, key: str) -> Job | None:
+    """
+    Returns the progress of an image in the previous runs.
+
+    A page created by a previous run is forgotten only when it was deleted from Notion since,
+    so that the image is uploaded again. Even with `--force`, which only bypasses the duplicate
+    title check, a rerun never creates the page of an image twice.
+
+    Args:
+        journal (Journal, optional): The batch journal.
+        image_path (Path): The image being uploaded.
+        key (str): The cache key of the image.
+
+    Returns:
+        Job | None: The progress of the image, or None to upload it from scratch.
+    """
+    done = journal.get(key) if journal is not None else None
+    if not _uploaded(done):
+        return done
+    if not get_notion_instance().page_exists(done.page_id):
+        logger.info(f'The page {done.page_id} of {image_path} was deleted, uploading it again')
+        return None
+    return done
+
+
+def _add_journaled(
+    journal: Journal,
+    image_path: Path,
+    key: str,
+    done: Job | None,
+    extraction: ExtractionResponse,
+    params: dict,
+) -> str:
+    """
+    Adds the page of an image unless a previous run did, recording the progress in the journal.
+
+    Args:
+        journal (Journal): The batch journal.
+        image_path (Path): The image being uploaded.
+        key (str): The cache key of the image.
+        done (Job, optional): The progress of the image before this run.
+        extraction (ExtractionResponse): The receipt returned by `extract_image`.
+        params (dict): The page parameters.
+
+    Returns:
+        str: The id of the page, the one created by a previous run if any.
+    """
+    if _uploaded(done):
+        logger.info(f'{image_path} was already uploaded as page {done.page_id}')
+        return done.page_id
+    notion_instance = get_notion_instance()
+    title = extraction.title.title()
+    if done is not None and done.stage == JobStage.deduped:
+        # The previous run stopped after the duplicate check, maybe after creating the page
+        page_ids = notion_instance.find_pages(title, params['source'])
+        if page_ids:
+            logger.info(f'{image_path} was already uploaded as page {page_ids[0]}')
+            journal.advance(key, image_path, JobStage.created, page_ids[0])
+            return page_ids[0]
+    notion_instance.is_title_used(title, params['source'], params['force'])
+    journal.advance(key, image_path, JobStage.deduped)
+    page_id = add_recipe(extraction, params, checked=True)
+    journal.advance(key, image_path, JobStage.created, page_id)
+    return page_id
+
+
+def run_batch(
+    images: list[tuple[Path, dict]],
+    defaults: dict,
+    workers: int,
+    image_options: ImageOptions | None = None,
+    prepare_workers: int = BATCH_PREPARE_WORKERS,
+    notion_workers: int = BATCH_NOTION_WORKERS,
+    queue_size: int = BATCH_QUEUE_SIZE,
+    journal: Journal | None = None,
+) -> dict[Path, str]:
+    """
+    Uploads many images, each one as a new page in the Notion database.
+
+    The images go through a pipeline of three stages: reading and encoding, extraction by the
+    vision model, and writing to Notion, the duplicate check included. Each stage has its own
+    workers and at most `queue_size` images wait in front of it, so the vision model is kept
+    busy while the encoded images in memory stay bounded.
+
+    With a journal, the images whose page was created by a previous run are skipped unless the
+    page was deleted since, even with `force`, and a page found with the same title and source is
+    adopted for the images interrupted between the duplicate check and the page creation, so
+    rerunning a crashed batch creates no duplicates.
+
+    Args:
+        images (list[tuple[Path, dict]]): The images to upload with their per image overrides.
+        defaults (dict): The page parameters shared by all the images.
+        workers (int): The maximum number of images in the vision model at the same time.
+        image_options (ImageOptions, optional): The pre-processing applied to the images.
+        prepare_workers (int, optional): The number of images read and encoded at the same time.
+        notion_workers (int, optional): The number of pages written to Notion at the same time.
+        queue_size (int, optional): The maximum number of images waiting in front of a stage.
+        journal (Journal, optional): Where the progress of every image is recorded.
+
+    Returns:
+        dict[Path, str]: The error message of every image that failed, empty on full success.
+    """
+    failures = {}
+    jobs = []
+    for image_path, overrides in images:
+        try:
+            jobs.append((image_path, _resolve_params(defaults, overrides)))
+        except BadParameter as e:
+            failures[image_path] = str(e)
+
+    def prepare(image_path: Path, params: dict) -> tuple[dict, PreparedImage, Job | None]:
+        _validate_image(image_path)
+        prepared = prepare_image(image_path, image_options, dedupe=not params['force'])
+        done = _previous_job(journal, image_path, prepared.cache_key)
+        _advance(journal, image_path, prepared.cache_key, JobStage.hashed)
+        return params, prepared, done
+
+    def extract(
+        image_path: Path,
+        job: tuple[dict, PreparedImage, Job | None],
+    ) -> tuple[dict, str, Job | None, object]:
+        params, prepared, done = job
+        if _uploaded(done):
+            return params, prepared.cache_key, done, None
+        extraction = extract_image(image_path, prepared)
+        _advance(journal, image_path, prepared.cache_key, JobStage.parsed)
+        return params, prepared.cache_key, done, extraction
+
+    def write(image_path: Path, job: tuple[dict, str, Job | None, object]) -> str:
+        params, key, done, extraction = job
+        if journal is None:
+            return add_recipe(extraction, params)
+        return _add_journaled(journal, image_path, key, done, extraction, params)
+
+    pipeline = Pipeline(
+        [
+            Stage('prepare', prepare, prepare_workers, queue_size),
+            Stage('extract', extract, workers, queue_size),
+            Stage('notion', write, notion_workers, queue_size),
+        ],
+    )
+    for image_path, result in pipeline.run(jobs):
+        if isinstance(result, Exception):
+            logger.error(f'Failed to upload {image_path}: {result}')
+            failures[image_path] = str(result) or type(result).__name__
+        else:
+            logger.info(f'Uploaded {image_path}')
+    return failures
+
+
+@app.command()
+def batch(
+    inputs: Annotated[
+        list[Path],
+        Argument(help='Directories, glob patterns, images or `.jsonl` manifests to process.'),
+    ],
+    source: Annotated[
+        str,
+        Option('--source', '-s', help='Source of the receipts, unless set in the manifest.'),
+    ] = None,
+    difficulty: Annotated[
+        DishDifficulty,
+        Option(case_sensitive=False, help='Difficulty of the dishes, unless set in the manifest.'),
+    ] = None,
+    type_: Annotated[
+        str,
+        Option(
+            '--type',
+            '-t',
+            help='Type of the receipts, unless set in the manifest.',
+            callback=_validate_optional_dish_type,
+        ),
+    ] = None,
+    country: Annotated[
+        str,
+        Option(
+            '--country',
+            '-c',
+            help='Country of origin of the receipts.',
+            callback=_validate_country,
+        ),
+    ] = None,
+    date: Annotated[
+        str,
+        Option(
+            '--date',
+            '-d',
+            help='Date where the receipts have been done. Example 20241231.',
+            callback=_validate_date,
+        ),
+    ] = None,
+    force: Annotated[
+        bool,
+        Option(
+            '--force',
+            '-f',
+            help='Force the name duplication if a title is already present, and the extraction '
+            'of photos looking like one already extracted',
+        ),
+    ] = False,
+    workers: Annotated[
+        int,
+        Option(
+            '--workers',
+            '-w',
+            min=1,
+            help='Maximum number of images in the vision model at the same time.',
+        ),
+    ] = BATCH_MAX_WORKERS,
+    prepare_workers: Annotated[
+        int,
+        Option(min=1, help='Number of images read and encoded at the same time.'),
+    ] = BATCH_PREPARE_WORKERS,
+    notion_workers: Annotated[
+        int,
+        Option(min=1, help='Number of pages written to Notion at the same time.'),
+    ] = BATCH_NOTION_WORKERS,
+    queue_size: Annotated[
+        int,
+        Option(min=1, help='Maximum number of images waiting in front of each stage.'),
+    ] = BATCH_QUEUE_SIZE,
+    openai_batch: Annotated[
+        bool,
+        Option(
+            '--openai-batch',
+            help='Extract the images with the OpenAI Batch API: cheaper and not rate limited, '
+            'but it can take up to 24 hours.',
+        ),
+    ] = False,
+    max_edge: MaxEdgeOption = IMAGE_MAX_EDGE,
+    quality: QualityOption = IMAGE_JPEG_QUALITY,
+    grayscale: GrayscaleOption = False,
+    detail: DetailOption = ImageDetail.auto,
+    similarity: SimilarityOption = TITLE_SIMILARITY_THRESHOLD,
+    journal: Annotated[
+        bool,
+        Option(
+            '--journal/--no-journal',
+            help='Record the progress of every image, so that a rerun skips the images already '
+            'uploaded.',
+        ),
+    ] = True,
+    profile: ProfileOption = False,
+    metrics_path: MetricsOption = None,
+):
+    """
+    Process many images at once, adding one entry per image to the Notion database.
+
+    The progress of every image is journaled, rerunning an interrupted batch uploads the
+    remaining images only. With `--profile` the p50 and p95 time of every stage and HTTP call is
+    printed at the end.
+    """
+    images = collect_images(inputs)
+    if not images:
+        logger.error('No images found in the given inputs.')
+        raise Exit(code=1)
+
+    defaults = {
+        'difficulty': difficulty.value.title() if difficulty else None,
+        'type_': type_,
+        'origin': country,
+        'date': date,
+        'source': source.title() if source else None,
+        'force': force,
+    }
+    logger.info(f'Uploading {len(images)} images with {workers} extraction workers')
+    # Duplicates are checked against a local index instead of one query per image
+    notion_instance = get_notion_instance()
+    notion_instance.title_index = TitleIndex(
+        notion_instance.db_id,
+        similarity_threshold=similarity,
+    )
+    metrics = start_metrics(profile, metrics_path)
+    try:
+        image_options = ImageOptions(
+            max_edge=max_edge,
+            quality=quality,
+            grayscale=grayscale,
+            detail=detail.value,
+        )
+        failures = {}
+        if openai_batch:
+            failures = _check_images(images, defaults)
+            failures |= extract_to_cache(
+                get_openai_instance(),
+                [image_path for image_path, _ in images if image_path not in failures],
+                get_ocr_cache(),
+                image_options,
+            )
+        pending = [
+            (image_path, overrides)
+            for image_path, overrides in images
+            if image_path not in failures
+        ]
+        failures |= run_batch(
+            pending,
+            defaults,
+            workers,
+            image_options,
+            prepare_workers,
+            notion_workers,
+            queue_size,
+            Journal(notion_instance.db_id) if journal else None,
+        )
+    finally:
+        notion_instance.title_index.save()
+        report_metrics(metrics, metrics_path)
+
+    echo(f'\n{len(images) - len(failures)} uploaded, {len(failures)} failed.')
+    for image_path, _ in images:
+        status = f'FAILED: {failures[image_path]}' if image_path in failures else 'OK'
+        echo(f'  {image_path}: {status}')
+    if failures:
+        raise Exit(code=1)
+
+
+if __name__ == '__main__':
+    app()  # pragma: no cover
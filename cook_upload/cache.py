@@ -0,0 +1,64 @@
+import json
+from os import environ
+from pathlib import Path
+from time import time
+
+from .constants import CACHE_DIR_ENV
+from .logger import logger
+
+
+def default_cache_dir() -> Path:
+    """
+    Returns the directory where cook_upload keeps its local caches.
+
+    The directory is `$COOK_UPLOAD_CACHE_DIR` if set, otherwise `cook_upload` inside
+    `$XDG_CACHE_HOME` (or `~/.cache`).
+
+    Returns:
+        Path: The cache directory. It is not created by this function.
+    """
+    if environ.get(CACHE_DIR_ENV):
+        return Path(environ[CACHE_DIR_ENV])
+    return Path(environ.get('XDG_CACHE_HOME') or Path.home() / '.cache') / 'cook_upload'
+
+
+def read_json_cache(path: Path, max_age: float) -> tuple[float, dict] | None:
+    """
+    Reads a JSON document written by `write_json_cache` if it is recent enough.
+
+    Args:
+        path (Path): The cache file.
+        max_age (float): The maximum age in seconds of the cached document.
+
+    Returns:
+        tuple[float, dict] | None: The time the document was stored and the document, or None
+            if the file is missing, unreadable or expired.
+    """
+    try:
+        cached = json.loads(path.read_text())
+        stored_at, data = cached['stored_at'], cached['data']
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if time() - stored_at > max_age:
+        logger.debug(f'Cache {path} expired')
+        return None
+    return stored_at, data
+
+
+def write_json_cache(path: Path, data: dict) -> float:
+    """
+    Atomically stores a JSON document together with the current time.
+
+    Args:
+        path (Path): The cache file. Missing parent directories are created.
+        data (dict): The document to store.
+
+    Returns:
+        float: The time the document was stored.
+    """
+    stored_at = time()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'{path.suffix}.tmp')
+    tmp_path.write_text(json.dumps({'stored_at': stored_at, 'data': data}))
+    tmp_path.replace(path)
+    return stored_at
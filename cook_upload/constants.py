@@ -1,11 +1,69 @@
-from enum import Enum
+from enum import Enum, StrEnum
 
 NOTION_API_KEY = 'NOTION_API_KEY'
 NOTION_DB_ID = 'NOTION_DB_ID'
 
 
-NOTION_DB_API_URL = 'https://api.notion.com/v1/databases/{}'
-NOTION_PAGES_API_URL = 'https://api.notion.com/v1/pages'
+NOTION_API_URL = 'https://api.notion.com/v1'
+# Points the clients to another server, like the fake one of `benchmarks.fake_api`
+NOTION_API_URL_ENV = 'COOK_UPLOAD_NOTION_URL'
+# Formatted with the API URL first
+NOTION_DB_API_URL = '{}/databases/{}'
+NOTION_PAGES_API_URL = '{}/pages'
+NOTION_BLOCK_CHILDREN_API_URL = '{}/blocks/{}/children'
+
+NOTION_TIMEOUT = (5, 30)  # (connect, read) seconds
+NOTION_POOL_SIZE = 10
+NOTION_MAX_RETRIES = 5
+NOTION_BACKOFF_FACTOR = 0.5
+NOTION_BACKOFF_JITTER = 0.5
+NOTION_RETRY_STATUSES = (429, 502, 503, 504)
+
+NOTION_METADATA_TTL = 24 * 60 * 60  # seconds
+# Metadata younger than this is trusted even when it does not know a dish type
+NOTION_METADATA_MIN_AGE = 30  # seconds
+
+NOTION_QUERY_PAGE_SIZE = 100  # Maximum allowed by Notion
+NOTION_MAX_CHILDREN = 100  # Maximum number of blocks Notion accepts in one request
+# The id of the title property is the same in every database
+NOTION_TITLE_PROPERTY_ID = 'title'
+TITLE_INDEX_SYNC_INTERVAL = 60  # seconds
+# Share of character trigrams two titles must have in common to be reported as near duplicates
+TITLE_SIMILARITY_THRESHOLD = 0.7
+TITLE_SIMILAR_LIMIT = 5
+
+# The vision model scales images to fit 2048px, then their short side to 768px, and works on
+# 512px tiles. `low` detail uses a single 512px image.
+IMAGE_MAX_EDGE = 2048
+IMAGE_MAX_SHORT_EDGE = 768
+IMAGE_LOW_DETAIL_EDGE = 512
+IMAGE_JPEG_QUALITY = 85
+IMAGE_DATA_URL_PREFIX = b'data:image/jpeg;base64,'
+IMAGE_ENCODE_CHUNK_SIZE = 3 * 256 * 1024  # Multiple of 3 so chunks encode without padding
+# Perceptual hashes of 24 x 24 bits: resized, re-compressed or re-exposed copies of a photo stay
+# within 30 bits, photos of different text pages are more than 60 apart. A page photographed
+# again from another angle or crop is not reliably within the distance.
+IMAGE_HASH_SIZE = 24
+IMAGE_HASH_MAX_DISTANCE = 40
+
+OCR_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+CACHE_DIR_ENV = 'COOK_UPLOAD_CACHE_DIR'
+# Level of the `cook.log` file, DEBUG also logs the request and response payloads
+LOG_LEVEL_ENV = 'COOK_UPLOAD_LOG_LEVEL'
+
+# Rate limits shared by every call of the process, overridable with the environment variables.
+# A limit of 0 disables it.
+NOTION_REQUESTS_PER_SECOND = 3
+NOTION_REQUESTS_PER_SECOND_ENV = 'COOK_UPLOAD_NOTION_RPS'
+OPENAI_REQUESTS_PER_MINUTE = 500
+OPENAI_REQUESTS_PER_MINUTE_ENV = 'COOK_UPLOAD_OPENAI_RPM'
+OPENAI_TOKENS_PER_MINUTE = 200_000
+OPENAI_TOKENS_PER_MINUTE_ENV = 'COOK_UPLOAD_OPENAI_TPM'
+# Estimated tokens of one extraction, counted against the tokens per minute before the call
+OPENAI_IMAGE_TOKENS = {'low': 85, 'auto': 765, 'high': 765}  # 768x1024 image, 4 tiles of 170
+OPENAI_PROMPT_TOKENS = 100
+OPENAI_OUTPUT_TOKENS = 1_000
 
 OPENAI_API_KEY = 'OPENAI_API_KEY'
 OPENAI_PROJECT_ID = 'OPENAI_PROJECT_ID'
@@ -17,6 +75,12 @@ class DishDifficulty(str, Enum):
     hard = 'Hard'
 
 
+class ImageDetail(StrEnum):
+    auto = 'auto'
+    low = 'low'
+    high = 'high'
+
+
 NEW_PAGE_QUERY_TEMPLATE = {
     'parent': {'database_id': ''},
     'properties': {
@@ -32,11 +96,25 @@ NEW_PAGE_QUERY_TEMPLATE = {
 
 DELIMITER = {'object': 'block', 'type': 'divider', 'divider': {}}
 
+OPENAI_MODEL = 'gpt-4o-mini'
+
+OPENAI_BATCH_ENDPOINT = '/v1/chat/completions'
+OPENAI_BATCH_COMPLETION_WINDOW = '24h'
+OPENAI_BATCH_POLL_INTERVAL = 30  # seconds
+# Limits of one batch input file
+OPENAI_BATCH_MAX_REQUESTS = 50_000
+OPENAI_BATCH_MAX_BYTES = 200 * 1024 * 1024
+
 OPENAI_TEXT = """The attached image is a receipt for a dish. Extract the title, the steps and the
 ingredients and return them, exactly as they are in the model provided.
 Do not change or translate the text.
 Use bullet points for the ingredients and numbered list for the steps. It is important that this list format is maintained."""
 
+# Appended to the prompt when a receipt spans several images
+OPENAI_PAGES_TEXT = """The attached images are consecutive pages of the same receipt, in order.
+Merge them into a single receipt: a page can continue the ingredients or the steps of the
+previous one."""
+
 OPENAI_MESSAGE = {
     'role': 'user',
     'content': [
@@ -49,5 +127,14 @@ OPENAI_MESSAGE = {
 }
 
 
+BATCH_IMAGE_SUFFIXES = ('.jpg', '.jpeg')
+BATCH_MAX_WORKERS = 4  # Images in the vision model at the same time
+BATCH_PREPARE_WORKERS = 2
+BATCH_NOTION_WORKERS = 2
+BATCH_QUEUE_SIZE = 4  # Images waiting in front of each stage
+
+WATCH_POLL_INTERVAL = 2.0  # seconds
+WATCH_SETTLE_TIME = 5.0  # seconds a new file must stay unchanged before it is uploaded
+
 DATETIME_STR = '%Y%m%d'
 DATETIME_FORMATTED = '%Y-%m-%d'
@@ -0,0 +1,232 @@
+import sqlite3
+from contextlib import closing
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+from typing import Any
+
+from .cache import default_cache_dir
+from .constants import IMAGE_HASH_MAX_DISTANCE, IMAGE_HASH_SIZE
+from .logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    key TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    image TEXT NOT NULL
+)
+"""
+
+
+class SimilarImageError(Exception):
+    """Exception raised when a photo looks like a photo already extracted."""
+
+    def __init__(self, image: str, match: str, distance: int):
+        """
+        Args:
+            image (str): The name of the new photo.
+            match (str): The name of the photo already extracted.
+            distance (int): The number of bits differing between their hashes.
+        """
+        self.image = image
+        self.match = match
+        self.distance = distance
+        super().__init__(self.__str__())
+
+    def __str__(self):
+        return (
+            f'{self.image} looks like {self.match}, already extracted: {self.distance} bits of '
+            'their hashes differ. Use the force flag to extract it anyway.'
+        )
+
+
+def dhash(data, size: int = IMAGE_HASH_SIZE) -> int | None:
+    """
+    Computes the difference hash of a photo, which barely changes when the photo is resized,
+    re-compressed or re-exposed.
+
+    The photo is shrunk to `size + 1` by `size` grayscale pixels, and every bit tells whether a
+    pixel is brighter than its right neighbour.
+
+    Pillow is an optional dependency (`pip install cook_upload[images]`).
+
+    Args:
+        data (bytes | mmap.mmap): The JPEG photo, as bytes or as a file mapping from `map_image`.
+        size (int, optional): The number of rows and columns of bits.
+
+    Returns:
+        int | None: The `size * size` bits hash, or None without Pillow or if Pillow cannot
+            read the photo.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+
+    try:
+        original = Image.open(data if hasattr(data, 'seek') else BytesIO(data))
+    except (OSError, ValueError):
+        return None
+
+    with original:
+        # JPEG photos are decoded at a fraction of their resolution, much faster
+        original.draft('L', (size * 8, size * 8))
+        image = ImageOps.exif_transpose(original).convert('L')
+        pixels = image.resize((size + 1, size), Image.Resampling.BOX).tobytes()
+
+    bits = 0
+    for row in range(size):
+        for column in range(size):
+            left = pixels[row * (size + 1) + column]
+            bits = bits << 1 | (left > pixels[row * (size + 1) + column + 1])
+    return bits
+
+
+def hamming(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree of hashes, finding the ones within a Hamming distance of a hash
+    without comparing it to all of them.
+    """
+
+    def __init__(self):
+        """Initializes an empty BKTree instance."""
+        # Every node is the hash, its value and its children keyed by their distance to it
+        self._root: tuple[int, Any, dict] | None = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, hash_: int, value: Any) -> None:
+        """
+        Adds a hash.
+
+        Args:
+            hash_ (int): The hash.
+            value (Any): What the hash identifies, returned by `search`.
+        """
+        self._size += 1
+        if self._root is None:
+            self._root = (hash_, value, {})
+            return
+        node = self._root
+        while True:
+            distance = hamming(hash_, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (hash_, value, {})
+                return
+            node = child
+
+    def search(self, hash_: int, max_distance: int) -> list[tuple[int, Any]]:
+        """
+        Finds the hashes within a distance of a hash.
+
+        Args:
+            hash_ (int): The hash to look for.
+            max_distance (int): The maximum number of differing bits.
+
+        Returns:
+            list[tuple[int, Any]]: The distance and value of every match, closest first.
+        """
+        matches = []
+        nodes = [self._root] if self._root is not None else []
+        while nodes:
+            node_hash, value, children = nodes.pop()
+            distance = hamming(hash_, node_hash)
+            if distance <= max_distance:
+                matches.append((distance, value))
+            # By the triangle inequality, only these children can hold matches
+            nodes.extend(
+                child
+                for child_distance, child in children.items()
+                if distance - max_distance <= child_distance <= distance + max_distance
+            )
+        return sorted(matches, key=lambda match: match[0])
+
+
+class ImageHashIndex:
+    """
+    Perceptual hashes of the photos already extracted, stored in SQLite.
+
+    Each hash maps to the OCR cache key and the name of the photo, so that a copy of a photo
+    already extracted is flagged before calling the vision model. The hashes are loaded in a
+    `BKTree` on first use.
+    """
+
+    def __init__(self, path: Path | None = None, max_distance: int = IMAGE_HASH_MAX_DISTANCE):
+        """
+        Initializes the ImageHashIndex instance.
+
+        Args:
+            path (Path, optional): The SQLite database file. Defaults to `image_hashes.sqlite3`
+                in `default_cache_dir()`, resolved on first use.
+            max_distance (int, optional): The maximum number of differing bits between the
+                hashes of two photos of the same page.
+        """
+        self._path = path
+        self.max_distance = max_distance
+        self._tree: BKTree | None = None
+        self._tree_path: Path | None = None
+        self._lock = Lock()
+
+    @property
+    def path(self) -> Path:
+        return self._path or default_cache_dir() / 'image_hashes.sqlite3'
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(_SCHEMA)
+        return connection
+
+    def _loaded_tree(self) -> BKTree:
+        # Reloaded when the cache directory changes, like between tests
+        if self._tree is None or self._tree_path != self.path:
+            tree = BKTree()
+            with closing(self._connect()) as connection:
+                for key, hash_, image in connection.execute('SELECT * FROM hashes'):
+                    tree.add(int(hash_, 16), (key, image))
+            self._tree, self._tree_path = tree, self.path
+            logger.debug(f'Loaded {len(tree)} image hashes from {self.path}')
+        return self._tree
+
+    def find(self, hash_: int) -> tuple[int, str, str] | None:
+        """
+        Finds the closest photo already extracted.
+
+        Args:
+            hash_ (int): The hash computed by `dhash`.
+
+        Returns:
+            tuple[int, str, str] | None: The distance, the OCR cache key and the name of the
+                closest photo within `max_distance`, or None.
+        """
+        with self._lock:
+            matches = self._loaded_tree().search(hash_, self.max_distance)
+        if not matches:
+            return None
+        distance, (key, image) = matches[0]
+        return distance, key, image
+
+    def add(self, hash_: int, key: str, image: str) -> None:
+        """
+        Records the hash of an extracted photo.
+
+        Args:
+            hash_ (int): The hash computed by `dhash`.
+            key (str): The OCR cache key of the extraction.
+            image (str): The name of the photo, for the logs.
+        """
+        with self._lock:
+            with closing(self._connect()) as connection, connection:
+                inserted = connection.execute(
+                    'INSERT OR IGNORE INTO hashes VALUES (?, ?, ?)',
+                    (key, f'{hash_:x}', image),
+                ).rowcount
+            if inserted and self._tree is not None and self._tree_path == self.path:
+                self._tree.add(hash_, (key, image))
@@ -0,0 +1,58 @@
+import mmap
+from binascii import b2a_base64
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from .constants import IMAGE_DATA_URL_PREFIX, IMAGE_ENCODE_CHUNK_SIZE
+
+
+@contextmanager
+def map_image(image_path: Path) -> Iterator[mmap.mmap | bytes]:
+    """
+    Maps an image file in memory instead of reading it into a bytes object.
+
+    The mapping supports the buffer protocol and the file interface, so it can be hashed,
+    opened with Pillow and encoded without a copy of the file contents.
+
+    Args:
+        image_path (Path): The image file.
+
+    Yields:
+        mmap.mmap | bytes: The read-only mapping, or empty bytes for an empty file.
+    """
+    with image_path.open('rb') as file:
+        if not image_path.stat().st_size:
+            yield b''
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def encode_data_url(image) -> str:
+    """
+    Encodes an image into the base64 `data:` URL sent to the vision model.
+
+    The image is encoded in chunks straight into one preallocated buffer, so the only full size
+    copies are that buffer and the returned string, compared with the bytes, base64 bytes,
+    decoded string and formatted URL of the naive approach.
+
+    Args:
+        image (bytes | mmap.mmap | memoryview): The JPEG image, any object supporting the buffer
+            protocol.
+
+    Returns:
+        str: The `data:image/jpeg;base64,...` URL.
+    """
+    with memoryview(image) as view:
+        prefix_size = len(IMAGE_DATA_URL_PREFIX)
+        buffer = bytearray(prefix_size + 4 * ((view.nbytes + 2) // 3))
+        buffer[:prefix_size] = IMAGE_DATA_URL_PREFIX
+
+        position = prefix_size
+        for start in range(0, view.nbytes, IMAGE_ENCODE_CHUNK_SIZE):
+            with view[start : start + IMAGE_ENCODE_CHUNK_SIZE] as chunk:
+                encoded = b2a_base64(chunk, newline=False)
+            buffer[position : position + len(encoded)] = encoded
+            position += len(encoded)
+    return buffer.decode('ascii')
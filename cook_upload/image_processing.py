@@ -0,0 +1,90 @@
+from io import BytesIO
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from .constants import (
+    IMAGE_JPEG_QUALITY,
+    IMAGE_LOW_DETAIL_EDGE,
+    IMAGE_MAX_EDGE,
+    IMAGE_MAX_SHORT_EDGE,
+)
+from .logger import logger
+
+
+class ImageOptions(BaseModel):
+    """Pre-processing applied to the photos before they are sent to the vision model."""
+
+    max_edge: int = Field(IMAGE_MAX_EDGE, gt=0)
+    quality: int = Field(IMAGE_JPEG_QUALITY, ge=1, le=95)
+    grayscale: bool = False
+    detail: Literal['auto', 'low', 'high'] = 'auto'
+
+    @property
+    def cache_variant(self) -> str:
+        """Identifies the options in the OCR cache key, as they change what the model sees."""
+        return f'{self.max_edge}:{self.quality}:{self.grayscale}:{self.detail}'
+
+
+def _target_size(width: int, height: int, max_edge: int, max_short_edge: int) -> tuple[int, int]:
+    scale = min(1, max_edge / max(width, height), max_short_edge / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def preprocess_image(data, options: ImageOptions | None = None):
+    """
+    Shrinks a photo to what the vision model actually uses before it is base64 encoded.
+
+    The EXIF orientation is applied, the image is downscaled so that its long edge is at most
+    `max_edge` and its short edge at most the 768px the model tiles at (512px on both edges for
+    `low` detail), optionally converted to grayscale, and re-encoded as JPEG.
+
+    Pillow is an optional dependency (`pip install cook_upload[images]`). Without it, or if
+    Pillow cannot read the photo, the photo is returned unchanged.
+
+    Args:
+        data (bytes | mmap.mmap): The JPEG photo, as bytes or as a file mapping from `map_image`.
+        options (ImageOptions, optional): The pre-processing options. Defaults to `ImageOptions()`.
+
+    Returns:
+        bytes | mmap.mmap: The processed JPEG image, or `data` itself if it was not processed.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning('Pillow is not installed, sending the image without pre-processing.')
+        return data
+
+    options = options or ImageOptions()
+    max_edge, max_short_edge = options.max_edge, IMAGE_MAX_SHORT_EDGE
+    if options.detail == 'low':
+        max_edge = max_short_edge = min(max_edge, IMAGE_LOW_DETAIL_EDGE)
+
+    try:
+        # A file mapping is read in place, bytes are wrapped without a copy
+        original = Image.open(data if hasattr(data, 'seek') else BytesIO(data))
+    except (OSError, ValueError):
+        # Pillow raises UnidentifiedImageError (an OSError), and a file mapping raises ValueError
+        # when a format probe seeks past its end
+        logger.warning('Could not read the image, sending it without pre-processing.')
+        return data
+
+    with original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('L' if options.grayscale else 'RGB')
+        size = _target_size(*image.size, max_edge, max_short_edge)
+        if size != image.size:
+            image = image.resize(size, Image.Resampling.LANCZOS)
+
+        output = BytesIO()
+        image.save(output, format='JPEG', quality=options.quality, optimize=True)
+
+    processed = output.getvalue()
+    logger.debug(
+        'Pre-processed image from {} {} bytes to {} {} bytes',
+        original.size,
+        len(data),
+        image.size,
+        len(processed),
+    )
+    return processed
@@ -0,0 +1,126 @@
+import sqlite3
+from contextlib import closing
+from enum import StrEnum
+from pathlib import Path
+from time import time
+from typing import NamedTuple
+
+from .cache import default_cache_dir
+from .logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    key TEXT PRIMARY KEY,
+    image TEXT NOT NULL,
+    stage INTEGER NOT NULL,
+    page_id TEXT,
+    updated REAL NOT NULL
+)
+"""
+
+
+class JobStage(StrEnum):
+    """The stages an image goes through, in order."""
+
+    hashed = 'hashed'
+    parsed = 'parsed'
+    deduped = 'deduped'
+    created = 'created'
+
+
+_STAGES = list(JobStage)
+
+
+class Job(NamedTuple):
+    """The last completed stage of an image, as returned by `Journal.get`."""
+
+    image: str
+    stage: JobStage
+    page_id: str | None
+
+
+class Journal:
+    """
+    Durable record of the progress of every batch image, stored in SQLite.
+
+    Every Notion database has its own journal. Jobs are keyed like the OCR cache, by the image
+    content and the pre-processing, and only move forward through `JobStage`. Each stage is
+    committed as soon as it completes, so a crashed or interrupted batch can be rerun: the
+    images whose page was created are skipped, and the ones stopped between the duplicate check
+    and the page creation are checked again against Notion instead of creating the page twice.
+    """
+
+    def __init__(self, db_id: str, path: Path | None = None):
+        """
+        Initializes the Journal instance.
+
+        Args:
+            db_id (str): The ID of the Notion database the pages are created in.
+            path (Path, optional): The SQLite database file. Defaults to `<db_id>.sqlite3` in
+                the `journals` folder of `default_cache_dir()`, resolved on first use.
+        """
+        self.db_id = db_id
+        self._path = path
+
+    @property
+    def path(self) -> Path:
+        return (
+            self._path
+            or default_cache_dir() / 'journals' / f'{self.db_id.replace("-", "")}.sqlite3'
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(_SCHEMA)
+        return connection
+
+    def get(self, key: str) -> Job | None:
+        """
+        Returns the progress of an image.
+
+        Args:
+            key (str): The cache key of the image, see `PreparedImage.cache_key`.
+
+        Returns:
+            Job | None: The last completed stage, or None if the image was never seen.
+        """
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                'SELECT image, stage, page_id FROM jobs WHERE key = ?',
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        image, stage, page_id = row
+        return Job(image, _STAGES[stage], page_id)
+
+    def advance(
+        self,
+        key: str,
+        image: Path | str,
+        stage: JobStage,
+        page_id: str | None = None,
+    ) -> None:
+        """
+        Records that an image completed a stage. A job never moves back to an earlier stage.
+
+        Args:
+            key (str): The cache key of the image, see `PreparedImage.cache_key`.
+            image (Path | str): The image, for the logs and `cook-batch` reruns.
+            stage (JobStage): The completed stage.
+            page_id (str, optional): The id of the Notion page, once created.
+        """
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                """
+                INSERT INTO jobs VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    image = excluded.image,
+                    stage = MAX(stage, excluded.stage),
+                    page_id = COALESCE(excluded.page_id, page_id),
+                    updated = excluded.updated
+                """,
+                (key, str(image), _STAGES.index(stage), page_id, time()),
+            )
+        logger.debug(f'Journal: {image} {stage}')
@@ -1,16 +1,23 @@
 import sys
+from os import environ
 from pathlib import Path
 
 from loguru import logger
 
+from .constants import LOG_LEVEL_ENV
+
+# The sinks write, rotate and compress from a background thread, so that logging does not
+# block the requests. Pass the payloads as arguments rather than in f-strings: loguru only
+# formats them when a sink accepts the level.
 logger.remove(handler_id=0)
-logger.add(sys.stderr, level='INFO')
+logger.add(sys.stderr, level='INFO', enqueue=True)
 logger.add(
     Path(__file__).parent / 'cook.log',
-    level='DEBUG',
+    level=environ.get(LOG_LEVEL_ENV, 'DEBUG'),
     rotation='10 MB',
     retention='10 days',
     compression='zip',
+    enqueue=True,
 )
 
 __all__ = ['logger']
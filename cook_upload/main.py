@@ -1,30 +1,40 @@
 import mimetypes
-from base64 import b64encode
+from contextlib import ExitStack
 from datetime import datetime
 from json import dumps
 from os import environ
 from pathlib import Path
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated, NamedTuple
 
-from dotenv import load_dotenv
-from iso3166 import countries
-from openai import OpenAI
-from typer import Argument, BadParameter, Option, Typer
+from typer import Argument, BadParameter, Option, Typer, echo
 
 from .constants import (
     DATETIME_FORMATTED,
     DATETIME_STR,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_MAX_EDGE,
     NOTION_API_KEY,
     NOTION_DB_ID,
+    NOTION_METADATA_MIN_AGE,
     OPENAI_API_KEY,
     OPENAI_PROJECT_ID,
     DishDifficulty,
+    ImageDetail,
 )
-from .logger import logger
-from .notion_actions import NotionActions
 from .openai_actions import parse_image
+from .singleton import singleton
 
-load_dotenv(Path(__file__).parent.parent / '.env', override=False)
+# Everything slow to import or to build is deferred to the code paths using it, so that `--help`
+# and invalid arguments return straight away.
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+    from .image_hash import ImageHashIndex
+    from .image_processing import ImageOptions
+    from .metrics import Metrics
+    from .models import ExtractionResponse
+    from .notion_actions import NotionActions
+    from .ocr_cache import OCRCache
 
 
 app = Typer(
@@ -34,15 +44,135 @@ app = Typer(
     pretty_exceptions_enable=False,
 )
 
-openai_instance = OpenAI(
-    api_key=environ.get(OPENAI_API_KEY),
-    project=environ.get(OPENAI_PROJECT_ID),
-)
 
-notion_instance = NotionActions(
-    api_key=environ.get(NOTION_API_KEY),
-    db_id=environ.get(NOTION_DB_ID),
-)
+@singleton
+def _load_env() -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent.parent / '.env', override=False)
+
+
+@singleton
+def get_openai_instance() -> 'OpenAI':
+    """Returns the OpenAI client, built on first use."""
+    from openai import OpenAI
+
+    _load_env()
+    return OpenAI(
+        api_key=environ.get(OPENAI_API_KEY),
+        project=environ.get(OPENAI_PROJECT_ID),
+    )
+
+
+@singleton
+def get_notion_instance() -> 'NotionActions':
+    """Returns the Notion client, built on first use."""
+    from .notion_actions import NotionActions
+
+    _load_env()
+    return NotionActions(
+        api_key=environ.get(NOTION_API_KEY),
+        db_id=environ.get(NOTION_DB_ID),
+    )
+
+
+@singleton
+def get_ocr_cache() -> 'OCRCache':
+    """Returns the extraction cache, built on first use."""
+    from .ocr_cache import OCRCache
+
+    _load_env()
+    return OCRCache()
+
+
+@singleton
+def get_image_hashes() -> 'ImageHashIndex':
+    """Returns the perceptual hashes of the extracted images, built on first use."""
+    from .image_hash import ImageHashIndex
+
+    return ImageHashIndex()
+
+
+_INSTANCES = {
+    'openai_instance': get_openai_instance,
+    'notion_instance': get_notion_instance,
+    'ocr_cache': get_ocr_cache,
+}
+
+
+def __getattr__(name: str):
+    """Keeps `openai_instance`, `notion_instance` and `ocr_cache` available as attributes."""
+    if name not in _INSTANCES:
+        msg = f'module {__name__!r} has no attribute {name!r}'
+        raise AttributeError(msg)
+    return _INSTANCES[name]()
+
+
+MaxEdgeOption = Annotated[
+    int,
+    Option('--max-edge', min=1, help='Longest edge in pixels the image is downscaled to.'),
+]
+QualityOption = Annotated[
+    int,
+    Option('--quality', min=1, max=95, help='JPEG quality of the re-encoded image.'),
+]
+GrayscaleOption = Annotated[
+    bool,
+    Option('--grayscale', help='Convert the image to grayscale before sending it.'),
+]
+DetailOption = Annotated[
+    ImageDetail,
+    Option('--detail', case_sensitive=False, help='Detail level used by the vision model.'),
+]
+ProfileOption = Annotated[
+    bool,
+    Option('--profile', help='Print the time spent in every stage and HTTP call.'),
+]
+MetricsOption = Annotated[
+    Path,
+    Option(
+        '--metrics',
+        dir_okay=False,
+        writable=True,
+        help='Write the timings of every stage and HTTP call as JSON, implies `--profile`.',
+    ),
+]
+
+
+def start_metrics(profile: bool, metrics_path: Path | None) -> 'Metrics | None':
+    """
+    Starts recording the timing spans if `--profile` or `--metrics` is given.
+
+    Args:
+        profile (bool): Whether to print the timings.
+        metrics_path (Path | None): Where to write the timings as JSON.
+
+    Returns:
+        Metrics | None: The collector to pass to `report_metrics`, None when not profiling.
+    """
+    if not profile and not metrics_path:
+        return None
+    from .metrics import start_profiling
+
+    return start_profiling()
+
+
+def report_metrics(metrics: 'Metrics | None', metrics_path: Path | None) -> None:
+    """
+    Stops recording the timing spans, then prints them and writes them to `metrics_path`.
+
+    Args:
+        metrics (Metrics | None): The collector returned by `start_metrics`.
+        metrics_path (Path | None): Where to write the timings as JSON.
+    """
+    if metrics is None:
+        return
+    from .metrics import stop_profiling
+
+    stop_profiling()
+    echo(metrics.report())
+    if metrics_path:
+        metrics.write_json(metrics_path)
 
 
 def _validate_country(country: str | None) -> str | None:
@@ -60,9 +190,14 @@ def _validate_country(country: str | None) -> str | None:
     """
     if not country:
         return
+
+    from iso3166 import countries
+
     try:
         return countries.get(country.lower()).name
     except KeyError as e:
+        from .logger import logger
+
         msg = f'The country {country} is not valid'
         logger.error(msg)
         raise BadParameter(msg) from e
@@ -78,8 +213,15 @@ def _validate_dish_type(type_: str) -> str:
     Returns:
         str: The validated dish type.
     """
+    notion_instance = get_notion_instance()
     valid_types = notion_instance.dish_type
     if type_.lower() not in valid_types:
+        # The type may have just been added in Notion, check against fresh metadata
+        notion_instance.get_db_metadata(max_age=NOTION_METADATA_MIN_AGE)
+        valid_types = notion_instance.dish_type
+    if type_.lower() not in valid_types:
+        from .logger import logger
+
         msg = f'The type {type_} is not allowed. The valid types are {dumps(sorted(valid_types), indent=4)}. Add it in Notion first.'
         logger.error(msg)
         raise BadParameter(msg)
@@ -104,12 +246,30 @@ def _validate_image(image_path: Path) -> Path:
         or not image_path.is_file()
         or 'image/jpeg' not in mimetypes.guess_type(image_path)
     ):
+        from .logger import logger
+
         msg = f"The file '{image_path}' does not exist or is not a valid file."
         logger.error(msg)
         raise BadParameter(msg)
     return image_path
 
 
+def _validate_images(image_paths: list[Path]) -> list[Path]:
+    """
+    Validates the images of a receipt, see `_validate_image`.
+
+    Args:
+        image_paths (list[Path]): The paths to the image files, in page order.
+
+    Returns:
+        list[Path]: The validated image paths.
+
+    Raises:
+        BadParameter: If a file does not exist or is not a valid JPEG image.
+    """
+    return [_validate_image(image_path) for image_path in image_paths]
+
+
 def _validate_date(date: str | None) -> str | None:
     """
     Validates the date string and formats it if valid.
@@ -132,6 +292,8 @@ def _validate_date(date: str | None) -> str | None:
             try:
                 return datetime.strptime(date, DATETIME_STR).strftime(DATETIME_FORMATTED)
             except ValueError as e:
+                from .logger import logger
+
                 msg = f'Date {date} does not match the correct format of YYYYMMDD'
                 logger.error(msg)
                 raise BadParameter(msg) from e
@@ -139,13 +301,14 @@ def _validate_date(date: str | None) -> str | None:
 
 @app.command()
 def main(
-    image_path: Annotated[
-        Path,
+    image_paths: Annotated[
+        list[Path],
         Argument(
-            help='The image name or path to process.',
+            help='The images to process, several in page order for a receipt spanning pages.',
             exists=True,
             readable=True,
-            callback=_validate_image,
+            callback=_validate_images,
+            show_default=False,
         ),
     ],
     difficulty: Annotated[
@@ -185,26 +348,47 @@ def main(
     ] = None,
     force: Annotated[
         bool,
-        Option('--force', '-f', help='Force the name duplication if a title is already present'),
+        Option(
+            '--force',
+            '-f',
+            help='Force the name duplication if a title is already present, and the extraction '
+            'of photos looking like one already extracted',
+        ),
     ] = False,
+    max_edge: MaxEdgeOption = IMAGE_MAX_EDGE,
+    quality: QualityOption = IMAGE_JPEG_QUALITY,
+    grayscale: GrayscaleOption = False,
+    detail: DetailOption = ImageDetail.auto,
+    profile: ProfileOption = False,
+    metrics_path: MetricsOption = None,
 ):
     """
     Main command to process an image and add an entry to the Notion database.
 
+    The images of a receipt spanning several pages are extracted together by a single request
+    and added as a single page.
+
     Args:
-        image_path (Path): The path to the image file to be processed.
+        image_paths (list[Path]): The paths to the image files to be processed, in page order.
         difficulty (DishDifficulty): The difficulty of the dish.
         source (str): The source of the recipe.
         type_ (str): The type of the recipe.
         country (str, optional): The country of origin of the recipe.
         date (str, optional): The date of creation of the recipe in YYYYMMDD format.
         force (bool, optional): If True, allows adding a recipe even if a duplicate title exists.
+        max_edge (int, optional): The longest edge the image is downscaled to.
+        quality (int, optional): The JPEG quality of the re-encoded image.
+        grayscale (bool, optional): If True, the image is converted to grayscale.
+        detail (ImageDetail, optional): The detail level used by the vision model.
+        profile (bool, optional): If True, the time spent in every stage is printed.
+        metrics_path (Path, optional): Where to write the timings as JSON.
     """
+    from .image_processing import ImageOptions
+    from .logger import logger
+
     titled_difficulty = difficulty.value.title()
     source = source.title()
 
-    image = b64encode(image_path.read_bytes()).decode('utf-8')
-
     params = {
         'difficulty': titled_difficulty,
         'type_': type_,
@@ -214,17 +398,197 @@ def main(
         'force': force,
     }
     logger.info(f'Parameters used:\n{dumps(params, indent=4)}')
-    logger.info('Starting page extraction')
-    title, ingredients, steps = parse_image(openai_instance, base64_image=image)
+    image_options = ImageOptions(
+        max_edge=max_edge,
+        quality=quality,
+        grayscale=grayscale,
+        detail=detail.value,
+    )
+    metrics = start_metrics(profile, metrics_path)
+    try:
+        upload_image(image_paths, params, image_options)
+    finally:
+        report_metrics(metrics, metrics_path)
+
+
+class PreparedImage(NamedTuple):
+    """An image ready to be extracted, as returned by `prepare_image`."""
+
+    cache_key: str
+    cached: 'ExtractionResponse | None'
+    data_url: str | list[str] | None
+    detail: str
+    image_hash: int | None = None
 
-    params['title'] = title.title()
-    params['ingredients'] = ingredients
-    params['steps'] = steps
+
+def _pages(image_path: Path | list[Path]) -> list[Path]:
+    return image_path if isinstance(image_path, list) else [image_path]
+
+
+def _names(image_path: Path | list[Path]) -> str:
+    return ', '.join(path.name for path in _pages(image_path))
+
+
+def _hash_image(image, image_path: Path) -> int | None:
+    """
+    Computes the perceptual hash of a photo, flagging the copies of the photos already extracted.
+
+    Args:
+        image (bytes | mmap.mmap): The photo.
+        image_path (Path): The path to the photo, for the error.
+
+    Returns:
+        int | None: The hash of the photo, None without Pillow.
+
+    Raises:
+        SimilarImageError: If the hash is close to the hash of a photo already extracted.
+    """
+    from .image_hash import SimilarImageError, dhash
+    from .logger import logger
+    from .metrics import span
+
+    with span('hash'):
+        image_hash = dhash(image)
+    match = get_image_hashes().find(image_hash) if image_hash is not None else None
+    if match is not None:
+        distance, _, name = match
+        error = SimilarImageError(image_path.name, name, distance)
+        logger.error(str(error))
+        raise error
+    return image_hash
+
+
+def prepare_image(
+    image_path: Path | list[Path],
+    image_options: 'ImageOptions | None' = None,
+    dedupe: bool = True,
+) -> PreparedImage:
+    """
+    Looks up the extraction of an image in the OCR cache, or encodes the image to extract it.
+
+    When `dedupe` is set, a photo that is a resized, re-compressed or re-exposed copy of a
+    photo already extracted is flagged before calling the vision model.
+
+    Args:
+        image_path (Path | list[Path]): The path to the image file to be processed, or the
+            paths to the images of a receipt spanning several pages, in page order.
+        image_options (ImageOptions, optional): The pre-processing applied to the images.
+        dedupe (bool, optional): Look for copies of the photos already extracted, single
+            images only.
+
+    Returns:
+        PreparedImage: The cached extraction, or the data URL of the pre-processed image. A
+            list of data URLs, in page order, for several images.
+
+    Raises:
+        SimilarImageError: If the image looks like a photo already extracted.
+    """
+    from .image_payload import encode_data_url, map_image
+    from .image_processing import ImageOptions, preprocess_image
+    from .logger import logger
+    from .metrics import span
+
+    ocr_cache = get_ocr_cache()
+    image_options = image_options or ImageOptions()
+    with ExitStack() as stack:
+        with span('read') as timing:
+            images = [stack.enter_context(map_image(path)) for path in _pages(image_path)]
+            timing.request_bytes = sum(len(image) for image in images)
+            cache_key = ocr_cache.pages_key(images, variant=image_options.cache_variant)
+            cached = ocr_cache.get(cache_key)
+            timing.status = 'cached' if cached else 'ok'
+        if cached:
+            logger.info(f'Using the cached extraction of {_names(image_path)}')
+            return PreparedImage(cache_key, cached, None, image_options.detail)
+        image_hash = None
+        if dedupe and len(images) == 1:
+            image_hash = _hash_image(images[0], _pages(image_path)[0])
+        with span('encode') as timing:
+            data_urls = [
+                encode_data_url(preprocess_image(image, image_options)) for image in images
+            ]
+            timing.response_bytes = sum(len(data_url) for data_url in data_urls)
+    data_url = data_urls if len(data_urls) > 1 else data_urls[0]
+    return PreparedImage(cache_key, None, data_url, image_options.detail, image_hash)
+
+
+def extract_image(image_path: Path | list[Path], prepared: PreparedImage) -> 'ExtractionResponse':
+    """
+    Extracts the receipt from a prepared image with the vision model, unless already cached.
+
+    Args:
+        image_path (Path | list[Path]): The path to the image file being processed, or the
+            paths to the images of the receipt.
+        prepared (PreparedImage): The image returned by `prepare_image`.
+
+    Returns:
+        ExtractionResponse: The title, ingredients and steps of the receipt.
+
+    Raises:
+        ValueError: If the GPT response is invalid or a refusal occurs.
+    """
+    from .logger import logger
+    from .metrics import span
+    from .models import ExtractionResponse
+
+    if prepared.cached:
+        return prepared.cached
+
+    logger.info(f'Starting page extraction of {_names(image_path)}')
+    with span('extract'):
+        title, ingredients, steps = parse_image(
+            get_openai_instance(),
+            base64_image=prepared.data_url,
+            detail=prepared.detail,
+        )
+    extraction = ExtractionResponse(title=title, ingredients=ingredients, steps=steps)
+    get_ocr_cache().set(prepared.cache_key, extraction)
+    if prepared.image_hash is not None:
+        get_image_hashes().add(prepared.image_hash, prepared.cache_key, _names(image_path))
+    return extraction
+
+
+def add_recipe(extraction: 'ExtractionResponse', params: dict, checked: bool = False) -> str:
+    """
+    Adds an extracted receipt as a new page to the Notion database.
+
+    Args:
+        extraction (ExtractionResponse): The receipt returned by `extract_image`.
+        params (dict): The page parameters (difficulty, type_, origin, date, source and force).
+        checked (bool, optional): If True, the title was already checked with `is_title_used`.
+
+    Returns:
+        str: The id of the new page.
+    """
+    from .logger import logger
+    from .metrics import span
+
+    title, ingredients, steps = extraction.title, extraction.ingredients, extraction.steps
+    params = {**params, 'title': title.title(), 'ingredients': ingredients, 'steps': steps}
     logger.info('GPT returned with:')
     logger.info(f'\tTitle: {title}')
     logger.info(f'\tIngredients:\n{ingredients}')
     logger.info(f'\tSteps:\n{steps}')
-    notion_instance.add_entry(**params)
+    with span('notion'):
+        return get_notion_instance().add_entry(**params, checked=checked)
+
+
+def upload_image(
+    image_path: Path | list[Path],
+    params: dict,
+    image_options: 'ImageOptions | None' = None,
+) -> None:
+    """
+    Extracts the receipt from an image and adds it as a new page to the Notion database.
+
+    Args:
+        image_path (Path | list[Path]): The path to the image file to be processed, or the
+            paths to the images of a receipt spanning several pages, in page order.
+        params (dict): The page parameters (difficulty, type_, origin, date, source and force).
+        image_options (ImageOptions, optional): The pre-processing applied to the image.
+    """
+    prepared = prepare_image(image_path, image_options, dedupe=not params.get('force'))
+    add_recipe(extract_image(image_path, prepared), params)
 
 
 if __name__ == '__main__':
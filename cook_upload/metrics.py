@@ -0,0 +1,214 @@
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from math import ceil
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from urllib.parse import urlsplit
+
+
+class Span:
+    """The timing of one stage or HTTP call, filled in while it runs."""
+
+    __slots__ = ('duration', 'name', 'request_bytes', 'response_bytes', 'status')
+
+    def __init__(self, name: str):
+        """
+        Initializes the Span instance.
+
+        Args:
+            name (str): The stage or endpoint, spans with the same name are aggregated.
+        """
+        self.name = name
+        self.duration = 0.0
+        self.status: int | str | None = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    # Nearest rank on the sorted values
+    index = max(0, min(len(values) - 1, ceil(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Metrics:
+    """Collects the spans of a run, from any thread, and summarizes them per name."""
+
+    def __init__(self):
+        """Initializes the Metrics instance."""
+        self.spans: list[Span] = []
+        self._lock = Lock()
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> dict[str, dict]:
+        """
+        Aggregates the spans by name, in the order each name was first recorded.
+
+        Returns:
+            dict[str, dict]: The count, total, p50, p95 and max durations in milliseconds, the
+                request and response bytes and the statuses of every name.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        by_name: dict[str, list[Span]] = {}
+        for span in spans:
+            by_name.setdefault(span.name, []).append(span)
+
+        summary = {}
+        for name, group in by_name.items():
+            durations = sorted(span.duration * 1000 for span in group)
+            statuses = {}
+            for span in group:
+                statuses[str(span.status)] = statuses.get(str(span.status), 0) + 1
+            summary[name] = {
+                'count': len(group),
+                'total_ms': sum(durations),
+                'p50_ms': _percentile(durations, 50),
+                'p95_ms': _percentile(durations, 95),
+                'max_ms': durations[-1],
+                'request_bytes': sum(span.request_bytes for span in group),
+                'response_bytes': sum(span.response_bytes for span in group),
+                'statuses': statuses,
+            }
+        return summary
+
+    def report(self) -> str:
+        """
+        Formats the summary as a table, see `format_summary`.
+
+        Returns:
+            str: One line per span name.
+        """
+        return format_summary(self.summary())
+
+    def write_json(self, path: Path) -> None:
+        """
+        Writes the summary and every span to a JSON file.
+
+        Args:
+            path (Path): The file to write.
+        """
+        with self._lock:
+            spans = [span.as_dict() for span in self.spans]
+        data = {'summary': self.summary(), 'spans': spans}
+        path.write_text(json.dumps(data, indent=4))
+
+
+def format_summary(summary: dict[str, dict]) -> str:
+    """
+    Formats a summary as a table.
+
+    Args:
+        summary (dict[str, dict]): The summary returned by `Metrics.summary`, or read back from
+            the JSON metrics.
+
+    Returns:
+        str: One line per span name.
+    """
+    width = max((len(name) for name in summary), default=0) + 2
+    lines = [
+        (
+            f'{"stage":<{width}}{"count":>6}{"total":>11}{"p50":>10}{"p95":>10}{"max":>10}'
+            f'{"sent":>11}{"received":>11}'
+        ),
+    ]
+    for name, stats in summary.items():
+        lines.append(
+            f'{name:<{width}}{stats["count"]:>6}{stats["total_ms"]:>9.1f}ms'
+            f'{stats["p50_ms"]:>8.1f}ms{stats["p95_ms"]:>8.1f}ms{stats["max_ms"]:>8.1f}ms'
+            f'{_size(stats["request_bytes"]):>11}{_size(stats["response_bytes"]):>11}',
+        )
+    return '\n'.join(lines)
+
+
+def _size(size: float) -> str:
+    if size < 1024:
+        return f'{size:.0f}B'
+    if size < 1024**2:
+        return f'{size / 1024:.1f}KB'
+    return f'{size / 1024**2:.1f}MB'
+
+
+_metrics: Metrics | None = None
+
+
+def start_profiling() -> Metrics:
+    """
+    Starts recording the spans of the process.
+
+    Returns:
+        Metrics: The collector the spans are recorded in.
+    """
+    global _metrics
+    _metrics = Metrics()
+    return _metrics
+
+
+def stop_profiling() -> None:
+    """Stops recording the spans."""
+    global _metrics
+    _metrics = None
+
+
+@contextmanager
+def span(name: str) -> Iterator[Span]:
+    """
+    Times the enclosed block as a span, when profiling is on.
+
+    The span is yielded so the block can set its status and sizes. A block raising an exception
+    is recorded with the name of the exception as status, unless it set one.
+
+    Args:
+        name (str): The stage or endpoint.
+
+    Yields:
+        Span: The span being timed.
+    """
+    current = Span(name)
+    if _metrics is None:
+        yield current
+        return
+
+    metrics, start = _metrics, perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = current.status or type(e).__name__
+        raise
+    finally:
+        current.duration = perf_counter() - start
+        if current.status is None:
+            current.status = 'ok'
+        metrics.record(current)
+
+
+def endpoint(method: str, url: str) -> str:
+    """
+    Names the span of an HTTP call after its endpoint, without the ids.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The URL of the request.
+
+    Returns:
+        str: The span name, like `notion POST databases/query`.
+    """
+    split = urlsplit(url)
+    host = split.hostname or ''
+    # api.notion.com is named notion, other hosts like a local server keep their full name
+    service = host.split('.')[1] if host.startswith('api.') else host
+    parts = [part for part in split.path.split('/') if part and part != 'v1' and not _is_id(part)]
+    return f'{service} {method.upper()} {"/".join(parts)}'
+
+
+def _is_id(part: str) -> bool:
+    digits = part.replace('-', '')
+    return len(digits) == 32 and all(char in '0123456789abcdef' for char in digits.lower())
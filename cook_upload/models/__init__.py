@@ -1,4 +1,5 @@
 from .notion_dbmetdata_model import NotionDBMetadata
 from .notion_dbnewpage_model import NotionNewPage
 from .notion_dbsearch_model import NotionDBSearch
+from .notion_title_model import NotionTitleSearch, TitleResult
 from .openai_models import ExtractionResponse, ImageRequest
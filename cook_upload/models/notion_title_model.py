@@ -0,0 +1,47 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class PlainText(BaseModel):
+    plain_text: str
+
+
+class TitleProperty(BaseModel):
+    title: list[PlainText] = []
+
+
+class SourceProperty(BaseModel):
+    rich_text: list[PlainText] = []
+
+
+class TitleProperties(BaseModel):
+    name: TitleProperty = Field(alias='Name', default_factory=TitleProperty)
+    source: SourceProperty = Field(alias='Source', default_factory=SourceProperty)
+
+
+class TitleResult(BaseModel):
+    """The fields of a page read by the duplicate checks, the others are ignored."""
+
+    id_: str = Field(alias='id')
+    url: str
+    last_edited_time: datetime
+    archived: bool = False
+    in_trash: bool = False
+    properties: TitleProperties
+
+    @property
+    def title(self) -> str:
+        return ''.join(text.plain_text for text in self.properties.name.title)
+
+    @property
+    def source(self) -> str:
+        return ''.join(text.plain_text for text in self.properties.source.rich_text)
+
+
+class NotionTitleSearch(BaseModel):
+    """Database query response projected on `TitleResult`."""
+
+    results: list[TitleResult]
+    next_cursor: str | None = None
+    has_more: bool
@@ -1,8 +1,11 @@
+from typing import Literal
+
 from pydantic import BaseModel
 
 
 class Url(BaseModel):
     url: str
+    detail: Literal['auto', 'low', 'high'] | None = None
 
 
 class Content(BaseModel):
@@ -1,16 +1,47 @@
+from collections.abc import Callable, Iterable, Iterator
+from http import HTTPStatus
+from os import environ
+from pathlib import Path
+from threading import Lock
+from time import time
+
 import requests
 from pydantic import validate_call
+from requests.adapters import HTTPAdapter
 from requests.models import HTTPError
+from urllib3.util.retry import Retry
 
+from .cache import default_cache_dir, read_json_cache, write_json_cache
 from .constants import (
     DELIMITER,
-    NEW_PAGE_QUERY_TEMPLATE,
+    NOTION_API_URL,
+    NOTION_API_URL_ENV,
+    NOTION_BACKOFF_FACTOR,
+    NOTION_BACKOFF_JITTER,
+    NOTION_BLOCK_CHILDREN_API_URL,
     NOTION_DB_API_URL,
+    NOTION_MAX_CHILDREN,
+    NOTION_MAX_RETRIES,
+    NOTION_METADATA_TTL,
     NOTION_PAGES_API_URL,
+    NOTION_POOL_SIZE,
+    NOTION_QUERY_PAGE_SIZE,
+    NOTION_RETRY_STATUSES,
+    NOTION_TIMEOUT,
+    NOTION_TITLE_PROPERTY_ID,
 )
 from .logger import logger
-from .models import NotionDBMetadata, NotionDBSearch, NotionNewPage
-from .models.notion_dbnewpage_model import BulletListItem, Delimiter, Heading2Block, SelectModel
+from .metrics import endpoint, span
+from .models import (
+    NotionDBMetadata,
+    NotionDBSearch,
+    NotionNewPage,
+    NotionTitleSearch,
+    TitleResult,
+)
+from .models.notion_dbsearch_model import Result
+from .rate_limit import RateLimiter, notion_rate_limiter
+from .title_index import TitleIndex
 
 
 class PageAlreadyCreatedError(Exception):
@@ -34,17 +65,132 @@ class PageAlreadyCreatedError(Exception):
         return msg
 
 
-class NotionActions:
-    def __init__(self, api_key, db_id):
+def _rich_text(content: str) -> list[dict]:
+    return [{'type': 'text', 'text': {'content': content}}]
+
+
+def _section(title: str, items: list[str]) -> list[dict]:
+    blocks = [
+        {
+            'object': 'block',
+            'type': 'heading_2',
+            'heading_2': {'rich_text': _rich_text(title)},
+        },
+    ]
+    blocks.extend(
+        {
+            'object': 'block',
+            'type': 'bulleted_list_item',
+            'bulleted_list_item': {'rich_text': _rich_text(item)},
+        }
+        for item in items
+    )
+    blocks.append({**DELIMITER, 'divider': {}})
+    return blocks
+
+
+def _page_payload(
+    db_id: str,
+    *,
+    title: str,
+    difficulty: str,
+    type_: str,
+    source: str,
+    ingredients: str,
+    steps: str,
+    origin: str,
+    date: str = None,
+) -> dict:
+    """
+    Builds the JSON body of a new page of the database, without going through the models.
+
+    Args:
+        db_id (str): The ID of the Notion database.
+        title (str): The title of the page.
+        difficulty (str): The difficulty level of the content.
+        type_ (str): The type of content.
+        source (str): The source of the content.
+        ingredients (str): The ingredients required.
+        steps (str): The steps involved.
+        origin (str): The origin of the recipe or content.
+        date (str): The date for the entry.
+
+    Returns:
+        dict: The body, in the format of `NotionNewPage` dumped by alias without None values.
+    """
+    properties = {
+        'Name': {'title': [{'text': {'content': title}}]},
+        'Type': {'select': {'name': type_}},
+        'Difficulty': {'select': {'name': difficulty}},
+        'Source': {'rich_text': [{'text': {'content': source}}]},
+    }
+    if origin:
+        properties['Origin'] = {'select': {'name': origin}}
+    if date:
+        properties['Date'] = {'date': {'start': date}}
+
+    children = [
+        *_section('Ingredients', [i.strip('- ') for i in ingredients.strip().split('\n')]),
+        *_section('Steps', [i.strip('- ') for i in steps.strip().split('\n')]),
+        # The below features are not supported yet but added to maintain the layout of the page
+        *_section('Tips', []),
+        *_section('Images', []),
+    ]
+    return {'parent': {'database_id': db_id}, 'properties': properties, 'children': children}
+
+
+class _NotionRetry(Retry):
+    """
+    Retry policy that also retries the throttled requests of the non idempotent methods.
+
+    Notion does not process a throttled (429) request, so resending it cannot create a page or
+    append blocks twice, unlike a request that timed out or hit an unavailable gateway.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class BaseNotionActions:
+    """Request building and response handling shared by the sync and async Notion clients."""
+
+    def __init__(
+        self,
+        api_key,
+        db_id,
+        cache_dir: Path | None = None,
+        metadata_ttl: float = NOTION_METADATA_TTL,
+        validate_payloads: bool = False,
+        rate_limiter: RateLimiter | None = None,
+        api_url: str | None = None,
+    ):
         """
-        Initializes the NotionActions instance.
+        Initializes the Notion actions instance.
 
         Args:
             api_key (str): The API key for authenticating with the Notion API.
             db_id (str): The ID of the Notion database to interact with.
+            cache_dir (Path, optional): Where the database metadata is cached between runs.
+                Defaults to `default_cache_dir()`, resolved on first use.
+            metadata_ttl (float, optional): Seconds after which the cached metadata is refetched.
+            validate_payloads (bool, optional): Validate the new page bodies against the models
+                before sending them, for debugging.
+            rate_limiter (RateLimiter, optional): The limiter every request waits for. Defaults
+                to the one shared by all the Notion clients of the process.
+            api_url (str, optional): The base URL of the API. Defaults to the
+                `COOK_UPLOAD_NOTION_URL` environment variable, then to the Notion API.
         """
         self.api_key = api_key
         self.db_id = db_id
+        self.api_url = (api_url or environ.get(NOTION_API_URL_ENV) or NOTION_API_URL).rstrip('/')
+        self.cache_dir = cache_dir
+        self.metadata_ttl = metadata_ttl
+        self.validate_payloads = validate_payloads
+        self.rate_limiter = rate_limiter or notion_rate_limiter()
+        self._metadata: tuple[float, NotionDBMetadata] | None = None
+        self._metadata_lock = Lock()
 
         self.headers = {
             'Authorization': f'Bearer {self.api_key}',
@@ -52,30 +198,322 @@ class NotionActions:
             'Content-Type': 'application/json',
         }
 
-    def get_db_metadata(self) -> NotionDBMetadata:
+    @property
+    def _metadata_cache_path(self) -> Path:
+        return (self.cache_dir or default_cache_dir()) / 'metadata' / f'{self.db_id}.json'
+
+    def _cached_metadata(self, max_age: float) -> NotionDBMetadata | None:
+        """
+        Returns the metadata kept in memory or on disk if it is recent enough.
+
+        Args:
+            max_age (float): The maximum age in seconds of the cached metadata.
+
+        Returns:
+            NotionDBMetadata | None: The cached metadata, or None if it has to be fetched.
+        """
+        if self._metadata is None:
+            cached = read_json_cache(self._metadata_cache_path, max_age)
+            if cached is None:
+                return None
+            stored_at, data = cached
+            self._metadata = stored_at, NotionDBMetadata.model_validate(data)
+            logger.debug(f'Loaded database metadata from {self._metadata_cache_path}')
+
+        stored_at, metadata = self._metadata
+        return metadata if time() - stored_at <= max_age else None
+
+    def _cache_metadata(self, data: dict) -> NotionDBMetadata:
+        with span('notion validate metadata'):
+            metadata = NotionDBMetadata.model_validate(data)
+        try:
+            stored_at = write_json_cache(self._metadata_cache_path, data)
+        except OSError as e:
+            logger.warning(f'Could not cache the database metadata: {e}')
+            stored_at = time()
+        self._metadata = stored_at, metadata
+        return metadata
+
+    @staticmethod
+    def _title_filter(title: str) -> dict:
+        return {'property': 'Name', 'title': {'equals': title}}
+
+    @staticmethod
+    def _query_payload(
+        filter_: dict | None = None,
+        sorts: list[dict] | None = None,
+        page_size: int = NOTION_QUERY_PAGE_SIZE,
+    ) -> dict:
+        body = {'page_size': page_size}
+        if filter_ is not None:
+            body['filter'] = filter_
+        if sorts is not None:
+            body['sorts'] = sorts
+        return body
+
+    @staticmethod
+    def _merge_pages(pages: list[NotionDBSearch]) -> NotionDBSearch:
+        return pages[-1].model_copy(
+            update={'results': [result for page in pages for result in page.results]},
+        )
+
+    @staticmethod
+    def _dish_types(data: NotionDBMetadata) -> list[str]:
+        return [option.name.lower() for option in data.properties.type_.select.options]
+
+    @staticmethod
+    def _title_properties(metadata: NotionDBMetadata | None = None) -> list[str]:
+        """
+        Lists the properties returned by the title queries.
+
+        Args:
+            metadata (NotionDBMetadata, optional): The database metadata, to also return the
+                source, whose property id differs between databases.
+
+        Returns:
+            list[str]: The `filter_properties` of the query.
+        """
+        if metadata is None:
+            return [NOTION_TITLE_PROPERTY_ID]
+        return [NOTION_TITLE_PROPERTY_ID, metadata.properties.source.id_]
+
+    @staticmethod
+    def _filter_properties(properties: list[str]) -> str:
+        # The property ids are already URL encoded by Notion, like `uv%5DN`
+        return '&'.join(f'filter_properties={property_id}' for property_id in properties)
+
+    @staticmethod
+    def _matching_urls(results: Iterable[TitleResult], title: str) -> list:
+        lower_title = title.lower()
+        return [result.url for result in results if result.title.lower() == lower_title]
+
+    @staticmethod
+    def _check_title(matching_urls: list, title: str, source: str, force: bool) -> None:
+        """
+        Checks if any page already uses the given title.
+
+        Args:
+            matching_urls (list): The URLs of the pages with the same title.
+            title (str): The title to check for.
+            source (str): The source associated with the title.
+            force (bool): If True, allows page to be added even if the title and sources
+                pair already exists.
+
+        Raises:
+            PageAlreadyCreatedError: If the title has already been used and `force` is False.
+        """
+        if matching_urls:
+            if force:
+                logger.warning(
+                    f'Title {title} and {source} already added, but proceeding due to force flag.',
+                )
+            else:
+                logger.warning(
+                    f'{title} and {source} already added. Upload blocked unless force flag used.',
+                )
+                urls = ', '.join(str(url) for url in matching_urls)
+                msg = f'Title "{title}" with source "{source}" has already been used. See: {urls}'
+                logger.error(msg)
+                raise PageAlreadyCreatedError(title, source, matching_urls)
+
+    def _new_page_query(self, **params) -> dict:
+        """
+        Builds the body of the request creating a new page.
+
+        The body is built as the plain dict sent on the wire. With `validate_payloads` it is also
+        validated against `NotionNewPage`, which is slow on long recipes and meant for debugging.
+
+        Args:
+            **params: The page parameters accepted by `_create_new_page`.
+
+        Returns:
+            dict: The JSON body to send to the pages endpoint.
+
+        Raises:
+            pydantic.ValidationError: If `validate_payloads` is set and the body is invalid.
+        """
+        new_query = _page_payload(self.db_id, **params)
+        if self.validate_payloads:
+            NotionNewPage.model_validate(new_query)
+        return new_query
+
+    @staticmethod
+    def _split_children(
+        children: list[dict],
+        limit: int = NOTION_MAX_CHILDREN,
+    ) -> tuple[list[dict], list[tuple[int, list[dict]]]]:
+        """
+        Splits the blocks of a new page between its creation and later appends.
+
+        The page is created with every section heading and divider, so that the layout is in
+        place, and as many items as fit in `limit`. The items left over are appended to each
+        section after the last of its blocks already created, so sections can be completed
+        independently.
+
+        Args:
+            children (list[dict]): The blocks of the page, sections starting with a heading.
+            limit (int, optional): The maximum number of blocks sent with the page.
+
+        Returns:
+            tuple[list[dict], list[tuple[int, list[dict]]]]: The blocks sent with the page, and
+                for each incomplete section the index in them of the block to append after and
+                the blocks to append.
+        """
+        if len(children) <= limit:
+            return children, []
+
+        sections = []
+        for block in children:
+            if block['type'] == 'heading_2' or not sections:
+                sections.append([])
+            sections[-1].append(block)
+
+        budget = limit - 2 * len(sections)
+        first, pending = [], []
+        for heading, *items, divider in sections:
+            included = min(len(items), max(budget, 0))
+            budget -= included
+            first.extend([heading, *items[:included]])
+            if included < len(items):
+                pending.append((len(first) - 1, items[included:]))
+            first.append(divider)
+        return first, pending
+
+    def _create_new_page(self, **params) -> NotionNewPage:
+        """
+        Creates a new page model for adding to the Notion database.
+
+        Args:
+            **params: The page parameters accepted by `_page_payload`.
+
+        Returns:
+            NotionNewPage: The validated model of the new page to be added.
+        """
+        return NotionNewPage.model_validate(_page_payload(self.db_id, **params))
+
+
+class NotionActions(BaseNotionActions):
+    def __init__(self, api_key, db_id, title_index: TitleIndex | None = None, **kwargs):
+        """
+        Initializes the NotionActions instance.
+
+        Args:
+            api_key (str): The API key for authenticating with the Notion API.
+            db_id (str): The ID of the Notion database to interact with.
+            title_index (TitleIndex, optional): If given, duplicate titles are looked up in this
+                local index instead of querying the database for every new page.
+            **kwargs: The metadata cache options accepted by `BaseNotionActions`.
+        """
+        super().__init__(api_key, db_id, **kwargs)
+        self.title_index = title_index
+        self.session = self._create_session()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Closes the pooled connections of the session."""
+        self.session.close()
+
+    def _create_session(self) -> requests.Session:
+        """
+        Creates the keep-alive session shared by all the calls to the Notion API.
+
+        Throttled (429) responses are retried with exponential backoff and jitter, waiting for
+        the `Retry-After` header when Notion sends it. Unavailable (502, 503, 504) responses and
+        read timeouts are only retried for the idempotent methods and the database queries: the
+        page creations and block appends may have been processed before the gateway gave up.
+
+        Returns:
+            requests.Session: The session with the pooled and retrying adapters mounted.
+        """
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = self._create_adapter(Retry.DEFAULT_ALLOWED_METHODS)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # The database queries are POST requests that only read
+        session.mount(NOTION_DB_API_URL.format(self.api_url, ''), self._create_adapter(None))
+        return session
+
+    @staticmethod
+    def _create_adapter(allowed_methods: Iterable[str] | None) -> HTTPAdapter:
+        retry = _NotionRetry(
+            total=NOTION_MAX_RETRIES,
+            backoff_factor=NOTION_BACKOFF_FACTOR,
+            backoff_jitter=NOTION_BACKOFF_JITTER,
+            status_forcelist=NOTION_RETRY_STATUSES,
+            allowed_methods=allowed_methods,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        return HTTPAdapter(pool_maxsize=NOTION_POOL_SIZE, max_retries=retry)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request through the pooled session and raises for error statuses.
+
+        The request first waits for the rate limiter, and is recorded as a span when profiling.
+
+        Args:
+            method (str): The HTTP method of the request.
+            url (str): The URL of the request.
+            **kwargs: Extra arguments forwarded to `requests.Session.request`.
+
+        Returns:
+            requests.Response: The successful response.
+
+        Raises:
+            requests.HTTPError: If the response has an error status after all the retries.
+        """
+        self.rate_limiter.acquire()
+        with span(endpoint(method, url)) as timing:
+            response = self.session.request(method, url, timeout=NOTION_TIMEOUT, **kwargs)
+            timing.status = response.status_code
+            timing.request_bytes = len(response.request.body or b'')
+            timing.response_bytes = len(response.content)
+            response.raise_for_status()
+        return response
+
+    def get_db_metadata(self, max_age: float | None = None) -> NotionDBMetadata:
         """
         Retrieves metadata for the Notion database.
 
+        The metadata is cached in memory and on disk, and only fetched again once it is older
+        than `max_age`.
+
+        Args:
+            max_age (float, optional): The maximum age in seconds of the cached metadata.
+                Defaults to the instance `metadata_ttl`, 0 always fetches it.
+
         Returns:
             NotionDBMetadata: The metadata of the Notion database.
 
         Raises:
             requests.HTTPError: If the request to retrieve the metadata fails.
         """
-        try:
-            response = requests.get(NOTION_DB_API_URL.format(self.db_id), headers=self.headers)
-            response.raise_for_status()
-        except requests.HTTPError as e:
-            msg = f'Failed to get database metadata. Error {e.response.text}'
-            logger.error(msg)
-            raise
-        return NotionDBMetadata.model_validate(response.json())
+        with self._metadata_lock:
+            metadata = self._cached_metadata(self.metadata_ttl if max_age is None else max_age)
+            if metadata is not None:
+                return metadata
+            try:
+                response = self._request('GET', NOTION_DB_API_URL.format(self.api_url, self.db_id))
+            except requests.HTTPError as e:
+                msg = f'Failed to get database metadata. Error {e.response.text}'
+                logger.error(msg)
+                raise
+            return self._cache_metadata(response.json())
 
     @validate_call
     def get_entry(self, title: str = '') -> NotionDBSearch:
         """
         Retrieves an entry from the Notion database.
 
+        Every page of results is fetched, use `iter_entries` to stream large result sets.
+
         Args:
             title (str, optional): The title of the page to search for. If empty,
                 the entire database will be returned.
@@ -83,27 +521,151 @@ class NotionActions:
         Returns:
             NotionDBSearch: The search result containing the pages that match the title.
         """
-        data = {'filter': {'property': 'Name', 'title': {'equals': title}}}
+        return self._merge_pages(
+            list(self._iter_pages(self._query_payload(self._title_filter(title)))),
+        )
+
+    def iter_entries(
+        self,
+        filter_: dict | None = None,
+        sorts: list[dict] | None = None,
+        page_size: int = NOTION_QUERY_PAGE_SIZE,
+    ) -> Iterator[Result]:
+        """
+        Lazily iterates over the pages of the Notion database matching a query.
+
+        The results are fetched one page of `page_size` at a time, following the query cursors,
+        so memory does not grow with the size of the database.
+
+        Args:
+            filter_ (dict, optional): The Notion filter object. All the pages if not given.
+            sorts (list[dict], optional): The Notion sort objects.
+            page_size (int, optional): The number of results fetched per request, at most 100.
+
+        Yields:
+            Result: The matching pages.
+        """
+        for data in self._iter_pages(self._query_payload(filter_, sorts, page_size)):
+            yield from data.results
+
+    def iter_titles(
+        self,
+        filter_: dict | None = None,
+        sorts: list[dict] | None = None,
+        page_size: int = NOTION_QUERY_PAGE_SIZE,
+        sources: bool = True,
+    ) -> Iterator[TitleResult]:
+        """
+        Lazily iterates over the titles of the pages of the Notion database matching a query.
+
+        Like `iter_entries`, but Notion only returns the title and source properties, and the
+        pages are validated into the minimal `TitleResult`, much cheaper to download and parse.
+
+        Args:
+            filter_ (dict, optional): The Notion filter object. All the pages if not given.
+            sorts (list[dict], optional): The Notion sort objects.
+            page_size (int, optional): The number of results fetched per request, at most 100.
+            sources (bool, optional): Also return the sources, which needs the database
+                metadata.
+
+        Yields:
+            TitleResult: The matching pages.
+        """
+        properties = self._title_properties(self.get_db_metadata() if sources else None)
+        body = self._query_payload(filter_, sorts, page_size)
+        for data in self._iter_pages(body, lambda body: self.query_titles(body, properties)):
+            yield from data.results
+
+    def _iter_pages(
+        self,
+        body: dict,
+        query: Callable[[dict], NotionDBSearch | NotionTitleSearch] | None = None,
+    ) -> Iterator[NotionDBSearch | NotionTitleSearch]:
+        query = query or self.query
+        while True:
+            data = query(body)
+            yield data
+            if not data.has_more:
+                return
+            body = {**body, 'start_cursor': data.next_cursor}
+
+    def query(self, body: dict) -> NotionDBSearch:
+        """
+        Queries the Notion database.
+
+        Args:
+            body (dict): The query body, with the optional `filter`, `sorts`, `start_cursor`
+                and `page_size` keys.
+
+        Returns:
+            NotionDBSearch: One page of the pages matching the query.
+
+        Raises:
+            requests.HTTPError: If the query fails.
+        """
         try:
-            response = requests.post(
-                f'{NOTION_DB_API_URL.format(self.db_id)}/query',
-                headers=self.headers,
-                json=data,
+            response = self._request(
+                'POST',
+                f'{NOTION_DB_API_URL.format(self.api_url, self.db_id)}/query',
+                json=body,
             )
-            response.raise_for_status()
         except HTTPError as e:
             msg = f'Failed to get page. Error {e.response.text}'
             logger.error(msg)
             raise
 
-        logger.debug(f'Validated page with {title} and got {response.json()}')
-        return NotionDBSearch.model_validate(response.json())
+        data = response.json()
+        logger.debug('Validated query {} and got {}', body, data)
+        with span('notion validate query'):
+            return NotionDBSearch.model_validate(data)
+
+    def query_titles(self, body: dict, properties: list[str]) -> NotionTitleSearch:
+        """
+        Queries the Notion database for some properties of the pages only.
+
+        The raw response is validated straight into `NotionTitleSearch`, without building the
+        full `Result` models.
+
+        Args:
+            body (dict): The query body, like for `query`.
+            properties (list[str]): The ids of the properties Notion returns.
+
+        Returns:
+            NotionTitleSearch: One page of the pages matching the query.
+
+        Raises:
+            requests.HTTPError: If the query fails.
+        """
+        try:
+            response = self._request(
+                'POST',
+                f'{NOTION_DB_API_URL.format(self.api_url, self.db_id)}/query'
+                f'?{self._filter_properties(properties)}',
+                json=body,
+            )
+        except HTTPError as e:
+            msg = f'Failed to get page. Error {e.response.text}'
+            logger.error(msg)
+            raise
+
+        logger.opt(lazy=True).debug(
+            'Queried titles {} and got {}',
+            lambda: body,
+            lambda: response.text,
+        )
+        with span('notion validate titles'):
+            return NotionTitleSearch.model_validate_json(response.content)
 
     @validate_call
     def is_title_used(self, title: str, source: str, force: bool = False) -> None:
         """
         Checks if a title has already been used in the Notion database.
 
+        With a title index, the titles similar to the given one above the similarity threshold
+        of the index are logged as possible duplicates, without blocking the upload. The pages
+        found in the index are checked against Notion before blocking the upload, since the
+        index does not learn about the pages deleted since they were indexed.
+
         Args:
             title (str): The title to check for.
             source (str): The source associated with the title.
@@ -113,28 +675,78 @@ class NotionActions:
         Raises:
             PageAlreadyCreatedError: If the title has already been used and `force` is False.
         """
-        data = self.get_entry(title)
-        lower_title = title.lower()
-        matching_urls = [
-            result.url
-            for result in data.results
-            for notion_title in result.properties.name.title
-            if notion_title.plain_text.lower() == lower_title
-        ]
-
-        if matching_urls:
-            if force:
+        if self.title_index is not None:
+            self.title_index.ensure_synced(self)
+            matching_urls = self.title_index.lookup(title)
+            self._warn_similar(title, matching_urls)
+            if matching_urls:
+                results = list(self.iter_titles(self._title_filter(title), sources=False))
+                self.title_index.retain(title, (result.id_ for result in results))
+                matching_urls = self._matching_urls(results, title)
+        else:
+            titles = self.iter_titles(self._title_filter(title), sources=False)
+            matching_urls = self._matching_urls(titles, title)
+        self._check_title(matching_urls, title, source, force)
+
+    def _warn_similar(self, title: str, matching_urls: list[str]) -> None:
+        if self.title_index.similarity_threshold >= 1:
+            return
+        for score, page in self.title_index.similar(title):
+            if page['url'] not in matching_urls:
                 logger.warning(
-                    f'Title {title} and {source} already added, but proceeding due to force flag.',
+                    f'{title} is {score:.0%} similar to {page["title"]}, check it is not a '
+                    f'duplicate: {page["url"]}',
                 )
-            else:
-                logger.warning(
-                    f'{title} and {source} already added. Upload blocked unless force flag used.',
-                )
-                urls = ', '.join(str(url) for url in matching_urls)
-                msg = f'Title "{title}" with source "{source}" has already been used. See: {urls}'
-                logger.error(msg)
-                raise PageAlreadyCreatedError(title, source, matching_urls)
+
+    def find_pages(self, title: str, source: str) -> list[str]:
+        """
+        Returns the ids of the pages with the given title and source.
+
+        The database is always queried, so pages created moments ago by another process are
+        found even when a title index is set.
+
+        Args:
+            title (str): The title to look for, compared case insensitively.
+            source (str): The source to look for, compared case insensitively.
+
+        Returns:
+            list[str]: The ids of the matching pages.
+        """
+        lower_title, lower_source = title.lower(), source.lower()
+        return [
+            result.id_
+            for result in self.iter_titles(self._title_filter(title))
+            if result.title.lower() == lower_title and result.source.lower() == lower_source
+        ]
+
+    def page_exists(self, page_id: str) -> bool:
+        """
+        Checks that a page was not deleted, dropping it from the title index if it was.
+
+        Args:
+            page_id (str): The id of the page.
+
+        Returns:
+            bool: False if the page is missing, archived or in the trash.
+
+        Raises:
+            requests.HTTPError: If the request fails for another reason than a missing page.
+        """
+        try:
+            response = self._request(
+                'GET',
+                f'{NOTION_PAGES_API_URL.format(self.api_url)}/{page_id}',
+            )
+        except requests.HTTPError as e:
+            if e.response.status_code != HTTPStatus.NOT_FOUND:
+                raise
+            page = {'archived': True}
+        else:
+            page = response.json()
+        exists = not page.get('archived') and not page.get('in_trash')
+        if not exists and self.title_index is not None:
+            self.title_index.discard(page_id)
+        return exists
 
     def add_entry(
         self,
@@ -147,10 +759,15 @@ class NotionActions:
         origin: str,
         date: str,
         force: bool = False,
-    ):
+        checked: bool = False,
+    ) -> str:
         """
         Adds a new entry to the Notion database.
 
+        Pages with more blocks than Notion accepts in one request are created with the first
+        blocks of each section, and the rest is appended section by section. The appends are
+        sent one after another: Notion answers concurrent appends to a page with conflicts.
+
         Args:
             title (str): The title of the new page.
             difficulty (str): The difficulty level of the content.
@@ -161,9 +778,14 @@ class NotionActions:
             origin (str): The origin of the recipe or content.
             date (str): The date for the entry.
             force (bool, optional): If True, forces adding the page.
+            checked (bool, optional): If True, the title was already checked with
+                `is_title_used`, which is not called again.
+
+        Returns:
+            str: The ID of the new page.
 
         Raises:
-            requests.HTTPError: If the request to add the new page fails.
+            requests.HTTPError: If the request to add the new page or its blocks fails.
         """
         params = {
             'title': title,
@@ -176,98 +798,73 @@ class NotionActions:
             'date': date,
         }
 
-        self.is_title_used(title, source, force)
-        new_query = self._create_new_page(**params)
-        new_query = new_query.model_dump(by_alias=True, exclude_none=True)
-
-        # Not sure why model_dump does not exclude it if is not empy
-        if not date:
-            del new_query['properties']['Date']
+        if not checked:
+            self.is_title_used(title, source, force)
+        new_query = self._new_page_query(**params)
+        new_query['children'], pending = self._split_children(new_query['children'])
         try:
             logger.info(f'Adding new page with title: {title}')
-            logger.debug(f'Trying adding a new page with query {new_query}')
-            response = requests.post(NOTION_PAGES_API_URL, headers=self.headers, json=new_query)
-            response.raise_for_status()
-            logger.info('Page added.')
+            logger.debug('Trying adding a new page with query {}', new_query)
+            response = self._request(
+                'POST',
+                NOTION_PAGES_API_URL.format(self.api_url),
+                json=new_query,
+            )
         except requests.HTTPError as e:
             logger.error(
-                f'Error in creating a new page with query: {new_query} Error {e.response.json()}',
+                f'Error in creating a new page with query: {new_query} Error {e.response.text}',
             )
             raise
+        page = response.json()
+        if self.title_index is not None:
+            self.title_index.add(TitleResult.model_validate(page))
+        if pending:
+            try:
+                self._append_sections(page['id'], pending)
+            except requests.HTTPError as e:
+                logger.error(
+                    f'Page {page["id"]} was created without all its blocks, appending them '
+                    f'failed. Error {e.response.text}',
+                )
+                raise
+        logger.info('Page added.')
+        return page['id']
 
-    def _create_new_page(
-        self,
-        *,
-        title: str,
-        difficulty: str,
-        type_: str,
-        source: str,
-        ingredients: str,
-        steps: str,
-        origin: str,
-        date: str = None,
-    ):
+    def _append_sections(self, page_id: str, pending: list[tuple[int, list[dict]]]) -> None:
         """
-        Creates a new page model for adding to the Notion database.
+        Appends the blocks left over by `_split_children` to a new page.
 
         Args:
-            title (str): The title of the page.
-            difficulty (str): The difficulty level of the content.
-            type_ (str): The type of content.
-            source (str): The source of the content.
-            ingredients (str): The ingredients required.
-            steps (str): The steps involved.
-            origin (str): The origin of the recipe or content.
-            date (str): The date for the entry.
-
-        Returns:
-            NotionNewPage: The validated model of the new page to be added.
+            page_id (str): The ID of the new page.
+            pending (list[tuple[int, list[dict]]]): The blocks to append to each section.
         """
-        model = NotionNewPage.model_validate(NEW_PAGE_QUERY_TEMPLATE)
-        model.parent.database_id = self.db_id
-        model.properties.name.title[0].text.content = title
-        model.properties.type_.select.name = type_
-        if origin:
-            model.properties.origin = SelectModel.model_validate({'select': {'name': origin}})
-        model.properties.difficulty.select.name = difficulty
-        model.properties.source.rich_text[0].text.content = source
-        if date:
-            model.properties.date.date.start = date
-
-        ingredients_list = [i.strip('- ') for i in ingredients.strip().split('\n')]
-        steps_list = [i.strip('- ') for i in steps.strip().split('\n')]
-
-        self._add_child(model, ingredients_list, 'Ingredients')
-        self._add_child(model, steps_list, 'Steps')
-
-        # The below features are not supported yet but added to maintain the layout of the page
-        self._add_child(model, [], 'Tips')
-        self._add_child(model, [], 'Images')
-        return NotionNewPage.model_validate_json(
-            model.model_dump_json(by_alias=True, exclude_none=True),
+        response = self._request(
+            'GET',
+            NOTION_BLOCK_CHILDREN_API_URL.format(self.api_url, page_id),
+            params={'page_size': NOTION_MAX_CHILDREN},
         )
+        block_ids = [block['id'] for block in response.json()['results']]
+        logger.debug(f'Appending {sum(len(blocks) for _, blocks in pending)} blocks to {page_id}')
+        for index, blocks in pending:
+            self._append_children(page_id, blocks, block_ids[index])
 
-    def _add_child(self, model, child_list, title_text):
-        child_title = Heading2Block(
-            object='block',
-            type='heading_2',
-            heading_2={'rich_text': [{'type': 'text', 'text': {'content': title_text}}]},
-        )
-        model.children.append(child_title)
-
-        for item in child_list:
-            item_model = BulletListItem(
-                object='block',
-                type='bulleted_list_item',
-                bulleted_list_item={
-                    'rich_text': [{'type': 'text', 'text': {'content': item}}],
-                },
-            )
-            model.children.append(item_model)
+    def _append_children(self, block_id: str, children: list[dict], after: str) -> None:
+        """
+        Appends blocks after a given child of a block, in requests of at most 100 blocks.
 
-        model.children.append(Delimiter(**DELIMITER))
+        Args:
+            block_id (str): The ID of the parent block or page.
+            children (list[dict]): The blocks to append, in order.
+            after (str): The ID of the child the blocks are appended after.
+        """
+        for start in range(0, len(children), NOTION_MAX_CHILDREN):
+            response = self._request(
+                'PATCH',
+                NOTION_BLOCK_CHILDREN_API_URL.format(self.api_url, block_id),
+                json={'children': children[start : start + NOTION_MAX_CHILDREN], 'after': after},
+            )
+            after = response.json()['results'][-1]['id']
 
     @property
     def dish_type(self) -> list[str]:
-        data = self.get_db_metadata()
-        return [option.name.lower() for option in data.properties.type_.select.options]
+        return self._dish_types(self.get_db_metadata())
@@ -0,0 +1,146 @@
+import sqlite3
+from contextlib import closing
+from hashlib import sha256
+from pathlib import Path
+from time import time
+
+from .cache import default_cache_dir
+from .constants import OCR_CACHE_MAX_BYTES, OPENAI_MODEL, OPENAI_TEXT
+from .logger import logger
+from .models import ExtractionResponse
+from .openai_actions import prompt_text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+class OCRCache:
+    """
+    Content addressed cache of the image extractions, stored in SQLite.
+
+    Entries are keyed by the SHA-256 of the image bytes, the prompt and the model, so a rerun
+    on the same photo skips the vision call. The least recently used entries are evicted once
+    the cached responses exceed `max_bytes`.
+    """
+
+    def __init__(self, path: Path | None = None, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        """
+        Initializes the OCRCache instance.
+
+        Args:
+            path (Path, optional): The SQLite database file. Defaults to `ocr.sqlite3` in
+                `default_cache_dir()`, resolved on first use.
+            max_bytes (int, optional): The maximum total size of the cached responses.
+        """
+        self._path = path
+        self.max_bytes = max_bytes
+
+    @property
+    def path(self) -> Path:
+        return self._path or default_cache_dir() / 'ocr.sqlite3'
+
+    @staticmethod
+    def key(
+        image: bytes,
+        prompt: str = OPENAI_TEXT,
+        model: str = OPENAI_MODEL,
+        variant: str = '',
+    ) -> str:
+        """
+        Computes the cache key of an extraction.
+
+        Args:
+            image (bytes): The raw image bytes.
+            prompt (str, optional): The prompt sent with the image.
+            model (str, optional): The model doing the extraction.
+            variant (str, optional): Anything else changing what the model sees, like the image
+                pre-processing options.
+
+        Returns:
+            str: The hex digest identifying the extraction.
+        """
+        digest = sha256(image)
+        for part in (prompt, model, variant):
+            digest.update(b'\0')
+            digest.update(part.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def pages_key(images: list[bytes], variant: str = '') -> str:
+        """
+        Computes the cache key of the extraction of a receipt spanning several images.
+
+        Args:
+            images (list[bytes]): The raw bytes of every image, in page order.
+            variant (str, optional): Anything else changing what the model sees.
+
+        Returns:
+            str: The hex digest identifying the extraction.
+        """
+        if len(images) == 1:
+            return OCRCache.key(images[0], variant=variant)
+        pages = b''.join(sha256(image).digest() for image in images)
+        return OCRCache.key(pages, prompt=prompt_text(len(images)), variant=variant)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(_SCHEMA)
+        return connection
+
+    def get(self, key: str) -> ExtractionResponse | None:
+        """
+        Returns the cached extraction for a key, marking it as recently used.
+
+        Args:
+            key (str): The key computed by `OCRCache.key`.
+
+        Returns:
+            ExtractionResponse | None: The cached extraction, or None on a miss.
+        """
+        with closing(self._connect()) as connection, connection:
+            row = connection.execute(
+                'SELECT response FROM extractions WHERE key = ?',
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE extractions SET last_used = ? WHERE key = ?', (time(), key))
+        logger.debug(f'OCR cache hit for {key}')
+        return ExtractionResponse.model_validate_json(row[0])
+
+    def set(self, key: str, response: ExtractionResponse) -> None:
+        """
+        Stores an extraction, evicting the least recently used ones if the cache is full.
+
+        Args:
+            key (str): The key computed by `OCRCache.key`.
+            response (ExtractionResponse): The extraction to store.
+        """
+        data = response.model_dump_json()
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?)',
+                (key, data, len(data), time()),
+            )
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM extractions').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = connection.execute('SELECT key, size FROM extractions ORDER BY last_used').fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            connection.execute('DELETE FROM extractions WHERE key = ?', (key,))
+            total -= size
+            evicted += 1
+        logger.debug(f'Evicted {evicted} entries from the OCR cache')
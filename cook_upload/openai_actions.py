@@ -1,19 +1,80 @@
-from copy import deepcopy
+from typing import TYPE_CHECKING
 
-from openai import OpenAI
+from .constants import (
+    IMAGE_DATA_URL_PREFIX,
+    OPENAI_IMAGE_TOKENS,
+    OPENAI_MESSAGE,
+    OPENAI_MODEL,
+    OPENAI_OUTPUT_TOKENS,
+    OPENAI_PAGES_TEXT,
+    OPENAI_PROMPT_TOKENS,
+)
 
-from .constants import OPENAI_MESSAGE
-from .logger import logger
-from .models import ExtractionResponse, ImageRequest
+# openai, pydantic, loguru and the rate limiter are imported when an image is parsed, this module
+# is imported by the CLI on startup.
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
+    from .metrics import Span
+    from .models import ImageRequest
 
-def parse_image(client: OpenAI, base64_image: str) -> tuple[str, str, str]:
+_SPAN_NAME = 'openai POST chat/completions'
+
+
+def parse_image(
+    client: 'OpenAI',
+    base64_image: str | list[str],
+    detail: str = 'auto',
+) -> tuple[str, str, str]:
     """
     Parses an image using the OpenAI API to extract relevant information.
 
+    A receipt spanning several pages is sent as a list of images, in page order, and extracted
+    as one receipt by a single request. The call first waits for the OpenAI rate limiter shared
+    by the process.
+
     Args:
         client (OpenAI): An instance of the OpenAI client to communicate with the OpenAI API.
-        base64_image (str): The base64 encoded string of the image to be parsed.
+        base64_image (str | list[str]): The base64 encoded string of the image to be parsed, or
+            its full `data:` URL as built by `encode_data_url`. A list for several pages.
+        detail (str, optional): The vision detail level, `auto`, `low` or `high`.
+
+    Returns:
+        tuple[str, str, str]: tuple with the extracted title, ingredients, and steps from the image.
+
+    Raises:
+        ValueError: If the GPT response is invalid or a refusal occurs.
+    """
+    from .metrics import span
+    from .models import ExtractionResponse
+    from .rate_limit import openai_rate_limiter
+
+    openai_rate_limiter().acquire(_estimated_tokens(base64_image, detail))
+    with span(_SPAN_NAME) as timing:
+        response = client.beta.chat.completions.parse(
+            model=OPENAI_MODEL,
+            messages=[_image_message(base64_image, detail)],
+            response_format=ExtractionResponse,
+        )
+        _measure(timing, base64_image, response)
+    return _extraction(response)
+
+
+async def aparse_image(
+    client: 'AsyncOpenAI',
+    base64_image: str | list[str],
+    detail: str = 'auto',
+) -> tuple[str, str, str]:
+    """
+    Parses an image using the async OpenAI API to extract relevant information.
+
+    The call first waits, without blocking the event loop, for the shared OpenAI rate limiter.
+
+    Args:
+        client (AsyncOpenAI): An instance of the async OpenAI client.
+        base64_image (str | list[str]): The base64 encoded string of the image to be parsed, or
+            its full `data:` URL as built by `encode_data_url`. A list for several pages.
+        detail (str, optional): The vision detail level, `auto`, `low` or `high`.
 
     Returns:
         tuple[str, str, str]: tuple with the extracted title, ingredients, and steps from the image.
@@ -21,14 +82,80 @@ def parse_image(client: OpenAI, base64_image: str) -> tuple[str, str, str]:
     Raises:
         ValueError: If the GPT response is invalid or a refusal occurs.
     """
-    message = deepcopy(OPENAI_MESSAGE)
-    message['content'][1]['image_url']['url'] = f'data:image/jpeg;base64,{base64_image}'
-    message = ImageRequest.model_validate(message)
-    response = client.beta.chat.completions.parse(
-        model='gpt-4o-mini',
-        messages=[message],
-        response_format=ExtractionResponse,
+    from .metrics import span
+    from .models import ExtractionResponse
+    from .rate_limit import openai_rate_limiter
+
+    await openai_rate_limiter().aacquire(_estimated_tokens(base64_image, detail))
+    with span(_SPAN_NAME) as timing:
+        response = await client.beta.chat.completions.parse(
+            model=OPENAI_MODEL,
+            messages=[_image_message(base64_image, detail)],
+            response_format=ExtractionResponse,
+        )
+        _measure(timing, base64_image, response)
+    return _extraction(response)
+
+
+def _measure(timing: 'Span', base64_image: str | list[str], response) -> None:
+    # The sizes of the images and of the answer, the rest of the request and response is small
+    images = base64_image if isinstance(base64_image, list) else [base64_image]
+    timing.request_bytes = sum(len(image) for image in images)
+    timing.response_bytes = len(response.choices[0].message.content or '')
+
+
+def _estimated_tokens(base64_image: str | list[str], detail: str) -> int:
+    pages = len(base64_image) if isinstance(base64_image, list) else 1
+    return OPENAI_PROMPT_TOKENS + pages * OPENAI_IMAGE_TOKENS.get(detail, 0) + OPENAI_OUTPUT_TOKENS
+
+
+def prompt_text(pages: int = 1) -> str:
+    """
+    Returns the text of the extraction prompt.
+
+    Args:
+        pages (int, optional): The number of images the receipt spans.
+
+    Returns:
+        str: The prompt sent along the images.
+    """
+    text = OPENAI_MESSAGE['content'][0]['text']
+    return text if pages == 1 else f'{text}\n{OPENAI_PAGES_TEXT}'
+
+
+def _image_url(base64_image: str) -> str:
+    if isinstance(base64_image, str) and base64_image.startswith('data:'):
+        return base64_image
+    return f'{IMAGE_DATA_URL_PREFIX.decode()}{base64_image}'
+
+
+def _image_message(base64_image: str | list[str], detail: str) -> 'ImageRequest':
+    from .models import ImageRequest
+    from .models.openai_models import Content, Url
+
+    images = base64_image if isinstance(base64_image, list) else [base64_image]
+
+    # Built without validation, the image URLs can be several megabytes and are only copied once
+    # more when the request is serialized.
+    text, _ = OPENAI_MESSAGE['content']
+    return ImageRequest.model_construct(
+        role=OPENAI_MESSAGE['role'],
+        content=[
+            Content.model_construct(type=text['type'], text=prompt_text(len(images))),
+            *(
+                Content.model_construct(
+                    type='image_url',
+                    image_url=Url.model_construct(url=_image_url(image), detail=detail),
+                )
+                for image in images
+            ),
+        ],
     )
+
+
+def _extraction(response) -> tuple[str, str, str]:
+    from .logger import logger
+
     response = response.choices[0].message
 
     if not response.parsed or response.refusal:
@@ -37,5 +164,5 @@ def parse_image(client: OpenAI, base64_image: str) -> tuple[str, str, str]:
         raise ValueError(msg)
 
     data = response.parsed
-    logger.debug(f'GPT responded with {data}')
+    logger.debug('GPT responded with {}', data)
     return data.title, data.ingredients, data.steps
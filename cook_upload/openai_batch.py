@@ -0,0 +1,287 @@
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import monotonic, sleep
+from typing import TYPE_CHECKING
+
+from .constants import (
+    OPENAI_BATCH_COMPLETION_WINDOW,
+    OPENAI_BATCH_ENDPOINT,
+    OPENAI_BATCH_MAX_BYTES,
+    OPENAI_BATCH_MAX_REQUESTS,
+    OPENAI_BATCH_POLL_INTERVAL,
+    OPENAI_MODEL,
+)
+from .image_payload import encode_data_url, map_image
+from .image_processing import ImageOptions, preprocess_image
+from .logger import logger
+from .models import ExtractionResponse
+from .ocr_cache import OCRCache
+from .openai_actions import _image_message
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from openai.types import Batch
+
+BATCH_FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class BatchFailedError(Exception):
+    """Exception raised when a batch job ends without results."""
+
+    def __init__(self, batch: 'Batch'):
+        """
+        Args:
+            batch (Batch): The batch job that failed.
+        """
+        self.batch = batch
+        super().__init__(self.__str__())
+
+    def __str__(self):
+        errors = self.batch.errors.data if self.batch.errors and self.batch.errors.data else []
+        details = '; '.join(error.message or error.code or '' for error in errors)
+        return f'Batch {self.batch.id} ended with status {self.batch.status}. {details}'.strip()
+
+
+def _response_format() -> dict:
+    schema = ExtractionResponse.model_json_schema()
+    return {
+        'type': 'json_schema',
+        'json_schema': {
+            'name': schema['title'],
+            'schema': {**schema, 'additionalProperties': False},
+            'strict': True,
+        },
+    }
+
+
+def batch_request(custom_id: str, data_url: str, detail: str = 'auto') -> dict:
+    """
+    Builds one line of a batch input file, the same extraction `parse_image` requests.
+
+    Args:
+        custom_id (str): The identifier of the request, returned with its result.
+        data_url (str): The image, as built by `encode_data_url`.
+        detail (str, optional): The vision detail level, `auto`, `low` or `high`.
+
+    Returns:
+        dict: The batch request.
+    """
+    return {
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': OPENAI_BATCH_ENDPOINT,
+        'body': {
+            'model': OPENAI_MODEL,
+            'messages': [_image_message(data_url, detail).model_dump(exclude_unset=True)],
+            'response_format': _response_format(),
+        },
+    }
+
+
+def write_batch_files(requests: Iterable[dict], directory: Path) -> list[Path]:
+    """
+    Writes batch requests as JSONL files, starting a new file whenever one is full.
+
+    Args:
+        requests (Iterable[dict]): The requests built by `batch_request`.
+        directory (Path): Where the files are written.
+
+    Returns:
+        list[Path]: The input files, each within the limits of a single batch.
+    """
+    paths = []
+    file, count, size = None, 0, 0
+    try:
+        for request in requests:
+            line = (json.dumps(request) + '\n').encode()
+            if (
+                file is None
+                or count == OPENAI_BATCH_MAX_REQUESTS
+                or (size + len(line) > OPENAI_BATCH_MAX_BYTES)
+            ):
+                if file is not None:
+                    file.close()
+                paths.append(directory / f'batch-{len(paths)}.jsonl')
+                file, count, size = paths[-1].open('wb'), 0, 0
+            file.write(line)
+            count += 1
+            size += len(line)
+    finally:
+        if file is not None:
+            file.close()
+    return paths
+
+
+def submit_batch(client: 'OpenAI', path: Path) -> str:
+    """
+    Uploads a batch input file and starts the batch job.
+
+    Args:
+        client (OpenAI): The OpenAI client.
+        path (Path): The JSONL file written by `write_batch_files`.
+
+    Returns:
+        str: The ID of the batch job.
+    """
+    with path.open('rb') as file:
+        input_file = client.files.create(file=file, purpose='batch')
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=OPENAI_BATCH_ENDPOINT,
+        completion_window=OPENAI_BATCH_COMPLETION_WINDOW,
+    )
+    logger.info(f'Submitted batch {batch.id} from {path.name}')
+    return batch.id
+
+
+def wait_for_batch(
+    client: 'OpenAI',
+    batch_id: str,
+    poll_interval: float = OPENAI_BATCH_POLL_INTERVAL,
+    timeout: float | None = None,
+) -> 'Batch':
+    """
+    Polls a batch job until it ends.
+
+    Args:
+        client (OpenAI): The OpenAI client.
+        batch_id (str): The ID of the batch job.
+        poll_interval (float, optional): Seconds between two polls.
+        timeout (float, optional): Seconds after which to stop waiting. Defaults to no limit.
+
+    Returns:
+        Batch: The completed batch job.
+
+    Raises:
+        BatchFailedError: If the batch job failed, expired or was cancelled.
+        TimeoutError: If the batch job is still running after `timeout`.
+    """
+    deadline = None if timeout is None else monotonic() + timeout
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in BATCH_FINAL_STATUSES:
+            break
+        if deadline is not None and monotonic() >= deadline:
+            msg = f'Batch {batch_id} is still {batch.status} after {timeout} seconds'
+            raise TimeoutError(msg)
+        logger.debug(f'Batch {batch_id} is {batch.status}')
+        sleep(poll_interval)
+
+    # An expired batch keeps the results of the requests completed in time
+    if batch.status == 'completed' or (batch.status == 'expired' and batch.output_file_id):
+        return batch
+    raise BatchFailedError(batch)
+
+
+def _result(line: dict) -> ExtractionResponse | str:
+    if line.get('error'):
+        return line['error'].get('message') or str(line['error'])
+    response = line['response']
+    if response['status_code'] != 200:
+        return f'Request failed with status {response["status_code"]}: {response["body"]}'
+    message = response['body']['choices'][0]['message']
+    if message.get('refusal') or not message.get('content'):
+        return f'Something went wrong with the GPT response. {message}'
+    return ExtractionResponse.model_validate_json(message['content'])
+
+
+def read_batch_results(client: 'OpenAI', batch: 'Batch') -> dict[str, ExtractionResponse | str]:
+    """
+    Downloads the results of a batch job.
+
+    Args:
+        client (OpenAI): The OpenAI client.
+        batch (Batch): The ended batch job.
+
+    Returns:
+        dict[str, ExtractionResponse | str]: The extraction, or the error message, of every
+            request by custom ID.
+    """
+    results = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if line.strip():
+                result = json.loads(line)
+                results[result['custom_id']] = _result(result)
+    return results
+
+
+def _requests(
+    images: dict[str, tuple[Path, str]],
+    image_options: ImageOptions,
+) -> Iterator[dict]:
+    for custom_id, (image_path, _) in images.items():
+        with map_image(image_path) as image:
+            data_url = encode_data_url(preprocess_image(image, image_options))
+        yield batch_request(custom_id, data_url, image_options.detail)
+
+
+def extract_to_cache(
+    client: 'OpenAI',
+    image_paths: list[Path],
+    ocr_cache: OCRCache,
+    image_options: ImageOptions | None = None,
+    poll_interval: float = OPENAI_BATCH_POLL_INTERVAL,
+    timeout: float | None = None,
+) -> dict[Path, str]:
+    """
+    Extracts many images through the Batch API and stores the extractions in the OCR cache.
+
+    Images already in the cache are skipped. The batch jobs are billed at batch pricing and do
+    not count towards the per minute rate limits, but can take up to 24 hours. Once this returns
+    `upload_image` finds the extractions in the cache and only adds the pages.
+
+    Args:
+        client (OpenAI): The OpenAI client.
+        image_paths (list[Path]): The images to extract.
+        ocr_cache (OCRCache): The cache the extractions are stored in.
+        image_options (ImageOptions, optional): The pre-processing applied to the images.
+        poll_interval (float, optional): Seconds between two polls of a batch job.
+        timeout (float, optional): Seconds to wait for each batch job. Defaults to no limit.
+
+    Returns:
+        dict[Path, str]: The error message of every image that could not be extracted.
+
+    Raises:
+        BatchFailedError: If a batch job failed, expired or was cancelled.
+        TimeoutError: If a batch job is still running after `timeout`.
+    """
+    image_options = image_options or ImageOptions()
+    images = {}
+    failures = {}
+    for image_path in image_paths:
+        try:
+            with map_image(image_path) as image:
+                cache_key = ocr_cache.key(image, variant=image_options.cache_variant)
+        except OSError as e:
+            logger.error(f'Failed to read {image_path}: {e}')
+            failures[image_path] = str(e)
+            continue
+        if ocr_cache.get(cache_key) is None:
+            images[f'image-{len(images)}'] = (image_path, cache_key)
+    logger.info(f'{len(image_paths) - len(images) - len(failures)} images already extracted')
+    if not images:
+        return failures
+
+    with TemporaryDirectory() as directory:
+        paths = write_batch_files(_requests(images, image_options), Path(directory))
+        batch_ids = [submit_batch(client, path) for path in paths]
+
+    for batch_id in batch_ids:
+        batch = wait_for_batch(client, batch_id, poll_interval, timeout)
+        for custom_id, result in read_batch_results(client, batch).items():
+            image_path, cache_key = images.pop(custom_id)
+            if isinstance(result, ExtractionResponse):
+                ocr_cache.set(cache_key, result)
+            else:
+                logger.error(f'Failed to extract {image_path}: {result}')
+                failures[image_path] = result
+
+    # Requests without a result, like the ones not run before the batch expired
+    for image_path, _ in images.values():
+        failures[image_path] = 'The batch ended without a result for this image'
+    return failures
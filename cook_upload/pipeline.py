@@ -0,0 +1,128 @@
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from queue import Queue
+from threading import Lock, Thread
+from typing import Any, NamedTuple
+
+from .logger import logger
+
+_DONE = object()
+
+
+class Stage(NamedTuple):
+    """
+    One step of a `Pipeline`.
+
+    `func` is called with the key of an item and the value returned by the previous stage, and
+    returns the value passed to the next one.
+    """
+
+    name: str
+    func: Callable[[Hashable, Any], Any]
+    workers: int = 1
+    queue_size: int = 1
+
+
+class Pipeline:
+    """
+    Runs items through stages connected by bounded queues, each stage with its own threads.
+
+    While an item is in a stage the following items can already be in the earlier ones, so a
+    slow stage is kept busy as long as the earlier stages keep up. The queue in front of each
+    stage holds at most `queue_size` items: once it is full the earlier stage waits, which bounds
+    the number of items in memory.
+    """
+
+    def __init__(self, stages: list[Stage]):
+        """
+        Initializes the Pipeline instance.
+
+        Args:
+            stages (list[Stage]): The stages, in order.
+        """
+        self.stages = stages
+
+    def run(self, items: Iterable[tuple[Hashable, Any]]) -> Iterator[tuple[Hashable, Any]]:
+        """
+        Runs items through all the stages.
+
+        An item failing in a stage skips the following ones, its result is the exception.
+
+        Args:
+            items (Iterable[tuple[Hashable, Any]]): The key and initial value of every item.
+                `items` is consumed as the first stage has room for more.
+
+        Yields:
+            tuple[Hashable, Any]: The key and the value returned by the last stage, or the
+                raised exception, of every item in completion order.
+        """
+        results = Queue()
+        inputs = [Queue(stage.queue_size) for stage in self.stages]
+        outputs = [*inputs[1:], results]
+        next_workers = [stage.workers for stage in self.stages[1:]] + [1]
+
+        threads = [Thread(target=self._feed, args=(items, inputs[0]), daemon=True)]
+        for stage, input_, output, closing in zip(
+            self.stages,
+            inputs,
+            outputs,
+            next_workers,
+            strict=True,
+        ):
+            countdown = _Countdown(stage.workers)
+            threads.extend(
+                Thread(
+                    target=self._work,
+                    args=(stage, input_, output, results, countdown, closing),
+                    name=f'{stage.name}-{worker}',
+                    daemon=True,
+                )
+                for worker in range(stage.workers)
+            )
+        for thread in threads:
+            thread.start()
+
+        while (result := results.get()) is not _DONE:
+            yield result
+
+    def _feed(self, items: Iterable[tuple[Hashable, Any]], queue: Queue) -> None:
+        try:
+            for item in items:
+                queue.put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queue.put(_DONE)
+
+    @staticmethod
+    def _work(
+        stage: Stage,
+        input_: Queue,
+        output: Queue,
+        results: Queue,
+        countdown: '_Countdown',
+        closing: int,
+    ) -> None:
+        while (item := input_.get()) is not _DONE:
+            key, value = item
+            try:
+                value = stage.func(key, value)
+            except Exception as e:  # noqa: BLE001 - reported as the result of the item
+                logger.debug(f'{key} failed in the {stage.name} stage: {e}')
+                results.put((key, e))
+            else:
+                output.put((key, value))
+
+        # The last worker of a stage to finish closes the next one
+        if countdown.done():
+            for _ in range(closing):
+                output.put(_DONE)
+
+
+class _Countdown:
+    def __init__(self, count: int):
+        self.count = count
+        self._lock = Lock()
+
+    def done(self) -> bool:
+        with self._lock:
+            self.count -= 1
+            return not self.count
@@ -0,0 +1,140 @@
+import asyncio
+from os import environ
+from threading import Lock
+from time import monotonic, sleep
+
+from .constants import (
+    NOTION_REQUESTS_PER_SECOND,
+    NOTION_REQUESTS_PER_SECOND_ENV,
+    OPENAI_REQUESTS_PER_MINUTE,
+    OPENAI_REQUESTS_PER_MINUTE_ENV,
+    OPENAI_TOKENS_PER_MINUTE,
+    OPENAI_TOKENS_PER_MINUTE_ENV,
+)
+from .logger import logger
+from .singleton import singleton
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at a constant rate, safe to share between threads and asyncio tasks.
+
+    Taking tokens never blocks while holding the lock: the tokens are reserved, possibly driving
+    the bucket below zero, and the caller then sleeps until the refill covers its reservation.
+    Callers are therefore served in the order they arrive.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        """
+        Initializes the TokenBucket instance.
+
+        Args:
+            rate (float): The tokens added per second.
+            capacity (float, optional): The maximum tokens stored, the size of a burst.
+                Defaults to one second worth of tokens.
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        """
+        Takes tokens from the bucket.
+
+        Args:
+            amount (float, optional): The tokens to take.
+
+        Returns:
+            float: The seconds to wait before the tokens are actually available.
+        """
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+
+class RateLimiter:
+    """Requests and tokens budgets, all of which a call waits for before being sent."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_second: float = 0,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+    ):
+        """
+        Initializes the RateLimiter instance.
+
+        Args:
+            name (str): The name of the limited service, used in the logs.
+            requests_per_second (float, optional): The maximum requests per second, 0 for none.
+            requests_per_minute (float, optional): The maximum requests per minute, 0 for none.
+            tokens_per_minute (float, optional): The maximum tokens per minute, 0 for none.
+        """
+        self.name = name
+        self._requests = [
+            TokenBucket(requests_per_second) if requests_per_second else None,
+            TokenBucket(requests_per_minute / 60, requests_per_minute)
+            if requests_per_minute
+            else None,
+        ]
+        self._tokens = (
+            TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute else None
+        )
+
+    def _delay(self, tokens: float) -> float:
+        delays = [bucket.reserve() for bucket in self._requests if bucket]
+        if self._tokens and tokens:
+            delays.append(self._tokens.reserve(tokens))
+        delay = max(delays, default=0.0)
+        if delay:
+            logger.debug(f'Waiting {delay:.2f}s for the {self.name} rate limit')
+        return delay
+
+    def acquire(self, tokens: float = 0) -> None:
+        """
+        Blocks the thread until a request, and its tokens, fit in the limits.
+
+        Args:
+            tokens (float, optional): The tokens the request is expected to use.
+        """
+        if delay := self._delay(tokens):
+            sleep(delay)
+
+    async def aacquire(self, tokens: float = 0) -> None:
+        """
+        Waits, without blocking the event loop, until a request and its tokens fit in the limits.
+
+        Args:
+            tokens (float, optional): The tokens the request is expected to use.
+        """
+        if delay := self._delay(tokens):
+            await asyncio.sleep(delay)
+
+
+def _env_limit(name: str, default: float) -> float:
+    return float(environ.get(name) or default)
+
+
+@singleton
+def notion_rate_limiter() -> RateLimiter:
+    """Returns the limiter shared by every Notion call, Notion allows about 3 requests/second."""
+    return RateLimiter(
+        'Notion',
+        requests_per_second=_env_limit(NOTION_REQUESTS_PER_SECOND_ENV, NOTION_REQUESTS_PER_SECOND),
+    )
+
+
+@singleton
+def openai_rate_limiter() -> RateLimiter:
+    """Returns the limiter shared by every OpenAI call, sized on the project RPM and TPM caps."""
+    return RateLimiter(
+        'OpenAI',
+        requests_per_minute=_env_limit(OPENAI_REQUESTS_PER_MINUTE_ENV, OPENAI_REQUESTS_PER_MINUTE),
+        tokens_per_minute=_env_limit(OPENAI_TOKENS_PER_MINUTE_ENV, OPENAI_TOKENS_PER_MINUTE),
+    )
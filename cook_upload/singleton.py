@@ -0,0 +1,29 @@
+from collections.abc import Callable
+from functools import cache, wraps
+from threading import Lock
+
+
+def singleton(factory: Callable) -> Callable:
+    """
+    Caches the object built by a factory without arguments, like `functools.cache`.
+
+    Unlike `functools.cache`, the object is built once even when the first calls come from
+    several threads at the same time, like the workers of a `Pipeline`.
+
+    Args:
+        factory (Callable): The function building the shared object.
+
+    Returns:
+        Callable: The factory returning the same object on every call, with a
+            `cache_clear` method to build it again on the next call.
+    """
+    cached = cache(factory)
+    lock = Lock()
+
+    @wraps(factory)
+    def get():
+        with lock:
+            return cached()
+
+    get.cache_clear = cached.cache_clear
+    return get
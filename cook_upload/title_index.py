@@ -0,0 +1,302 @@
+from collections import Counter
+from collections.abc import Iterable
+from pathlib import Path
+from threading import RLock
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from .cache import default_cache_dir, read_json_cache, write_json_cache
+from .constants import TITLE_INDEX_SYNC_INTERVAL, TITLE_SIMILAR_LIMIT, TITLE_SIMILARITY_THRESHOLD
+from .logger import logger
+from .models.notion_title_model import TitleResult
+
+if TYPE_CHECKING:
+    from .notion_actions import NotionActions
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalizes a title for duplicate detection: case folded with collapsed whitespace.
+
+    Args:
+        title (str): The title to normalize.
+
+    Returns:
+        str: The normalized title.
+    """
+    return ' '.join(title.casefold().split())
+
+
+def title_grams(title: str) -> set[str]:
+    """
+    Splits a normalized title into its character trigrams, the word boundaries included.
+
+    Args:
+        title (str): The normalized title.
+
+    Returns:
+        set[str]: The trigrams of the title.
+    """
+    padded = f' {title} '
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    Local index of the titles in a Notion database, used to detect duplicates without a query
+    per upload.
+
+    The index maps each normalized title to the sources and URLs of its pages. It is persisted
+    under the cache directory and kept up to date by fetching only the pages edited since the
+    last sync. An inverted index of the title trigrams finds the near duplicates, like the
+    same recipe read differently by the vision model.
+    """
+
+    def __init__(
+        self,
+        db_id: str,
+        cache_dir: Path | None = None,
+        sync_interval: float = TITLE_INDEX_SYNC_INTERVAL,
+        similarity_threshold: float = TITLE_SIMILARITY_THRESHOLD,
+    ):
+        """
+        Initializes the TitleIndex instance, loading the persisted index if any.
+
+        Args:
+            db_id (str): The ID of the Notion database the index is built from.
+            cache_dir (Path, optional): Where the index is persisted. Defaults to
+                `default_cache_dir()`.
+            sync_interval (float, optional): Seconds during which a synced index is considered
+                up to date by `ensure_synced`.
+            similarity_threshold (float, optional): The minimum similarity, from 0 to 1, of the
+                titles returned by `similar`. 1 disables the near duplicate detection.
+        """
+        self.db_id = db_id
+        self.path = (cache_dir or default_cache_dir()) / 'titles' / f'{db_id}.json'
+        self.sync_interval = sync_interval
+        self.similarity_threshold = similarity_threshold
+        self.last_edited_time: str | None = None
+        self._pages: dict[str, dict] = {}
+        self._titles: dict[str, set[str]] = {}
+        # Trigram to normalized titles, and the number of trigrams of every title
+        self._grams: dict[str, set[str]] = {}
+        self._gram_counts: dict[str, int] = {}
+        self._synced_at: float | None = None
+        self._lock = RLock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def _load(self) -> None:
+        cached = read_json_cache(self.path, max_age=float('inf'))
+        if cached is None:
+            return
+        _, data = cached
+        self.last_edited_time = data['last_edited_time']
+        for page_id, page in data['pages'].items():
+            self._set(page_id, page)
+        logger.debug(f'Loaded {len(self)} titles from {self.path}')
+
+    def save(self) -> None:
+        """Persists the index under the cache directory."""
+        with self._lock:
+            data = {'last_edited_time': self.last_edited_time, 'pages': self._pages}
+        write_json_cache(self.path, data)
+
+    def _set(self, page_id: str, page: dict) -> None:
+        self._discard(page_id)
+        self._pages[page_id] = page
+        title = normalize_title(page['title'])
+        if title not in self._titles:
+            grams = title_grams(title)
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(title)
+            self._gram_counts[title] = len(grams)
+        self._titles.setdefault(title, set()).add(page_id)
+
+    def _discard(self, page_id: str) -> None:
+        page = self._pages.pop(page_id, None)
+        if page is None:
+            return
+        title = normalize_title(page['title'])
+        page_ids = self._titles.get(title, set())
+        page_ids.discard(page_id)
+        if not page_ids:
+            self._titles.pop(title, None)
+            self._gram_counts.pop(title, None)
+            for gram in title_grams(title):
+                self._grams.get(gram, set()).discard(title)
+
+    def update(self, results: Iterable[TitleResult]) -> None:
+        """
+        Adds or refreshes pages returned by a database query. Archived or trashed pages are
+        removed.
+
+        Args:
+            results (Iterable[TitleResult]): The pages returned by the query.
+        """
+        with self._lock:
+            for result in results:
+                last_edited_time = result.last_edited_time.isoformat()
+                if self.last_edited_time is None or last_edited_time > self.last_edited_time:
+                    self.last_edited_time = last_edited_time
+                self.add(result)
+
+    def add(self, result: TitleResult) -> None:
+        """
+        Adds a single page, for example one just created.
+
+        Unlike `update`, the sync position is not moved, so pages edited by others since the
+        last sync are still fetched by the next one.
+
+        Args:
+            result (TitleResult): The page to add.
+        """
+        with self._lock:
+            if result.archived or result.in_trash:
+                self._discard(result.id_)
+                return
+            self._set(
+                result.id_,
+                {'title': result.title, 'source': result.source, 'url': result.url},
+            )
+
+    def discard(self, page_id: str) -> None:
+        """
+        Removes a page known to be deleted.
+
+        Args:
+            page_id (str): The id of the page.
+        """
+        with self._lock:
+            self._discard(page_id)
+
+    def retain(self, title: str, page_ids: Iterable[str]) -> None:
+        """
+        Drops the pages with the given title that are not among `page_ids`, like the pages
+        deleted in Notion, which the incremental syncs never return.
+
+        Args:
+            title (str): The title, compared after normalization.
+            page_ids (Iterable[str]): The ids of the pages with this title still in Notion.
+        """
+        page_ids = set(page_ids)
+        with self._lock:
+            for page_id in self._titles.get(normalize_title(title), set()) - page_ids:
+                logger.info(f'Dropping the deleted page {page_id} from the title index')
+                self._discard(page_id)
+
+    def sync(self, notion: 'NotionActions', full: bool = False) -> int:
+        """
+        Fetches the pages edited since the last sync and persists the updated index.
+
+        Args:
+            notion (NotionActions): The client used to query the database.
+            full (bool, optional): If True, the index is rebuilt from the whole database, which
+                also drops pages deleted in Notion.
+
+        Returns:
+            int: The number of pages fetched.
+        """
+        with self._lock:
+            if full:
+                self._pages.clear()
+                self._titles.clear()
+                self._grams.clear()
+                self._gram_counts.clear()
+                self.last_edited_time = None
+
+            filter_ = None
+            if self.last_edited_time:
+                # Notion timestamps have minute precision, so pages edited in the same minute as
+                # the last sync are fetched again.
+                filter_ = {
+                    'timestamp': 'last_edited_time',
+                    'last_edited_time': {'on_or_after': self.last_edited_time},
+                }
+
+            fetched = 0
+            for result in notion.iter_titles(
+                filter_,
+                sorts=[{'timestamp': 'last_edited_time', 'direction': 'ascending'}],
+            ):
+                self.update([result])
+                fetched += 1
+
+            self._synced_at = monotonic()
+            self.save()
+        logger.info(f'Title index synced, {fetched} pages fetched, {len(self)} indexed')
+        return fetched
+
+    def ensure_synced(self, notion: 'NotionActions') -> None:
+        """
+        Syncs the index unless it has been synced within the sync interval.
+
+        Args:
+            notion (NotionActions): The client used to query the database.
+        """
+        with self._lock:
+            if self._synced_at is None or monotonic() - self._synced_at > self.sync_interval:
+                self.sync(notion)
+
+    def lookup(self, title: str, source: str | None = None) -> list[str]:
+        """
+        Returns the URLs of the pages with the given title.
+
+        Args:
+            title (str): The title to look for, compared after normalization.
+            source (str, optional): If given, only the pages with this source are returned.
+
+        Returns:
+            list[str]: The URLs of the matching pages.
+        """
+        with self._lock:
+            pages = [
+                self._pages[page_id] for page_id in self._titles.get(normalize_title(title), ())
+            ]
+        return [
+            page['url']
+            for page in pages
+            if source is None or page['source'].casefold() == source.casefold()
+        ]
+
+    def similar(
+        self,
+        title: str,
+        threshold: float | None = None,
+        limit: int = TITLE_SIMILAR_LIMIT,
+    ) -> list[tuple[float, dict]]:
+        """
+        Returns the pages whose title is similar to the given one, most similar first.
+
+        The similarity is the Jaccard index of the title trigrams, 1 for the same title. Only
+        the titles sharing a trigram with the given one are scored.
+
+        Args:
+            title (str): The title to compare.
+            threshold (float, optional): The minimum similarity. Defaults to the
+                `similarity_threshold` of the index.
+            limit (int, optional): The maximum number of titles returned, with all their pages.
+
+        Returns:
+            list[tuple[float, dict]]: The similarity and the title, source and URL of every
+                matching page.
+        """
+        threshold = self.similarity_threshold if threshold is None else threshold
+        grams = title_grams(normalize_title(title))
+        with self._lock:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._grams.get(gram, ()))
+            scores = []
+            for candidate, count in shared.items():
+                score = count / (len(grams) + self._gram_counts[candidate] - count)
+                if score >= threshold:
+                    scores.append((score, candidate))
+            scores.sort(key=lambda item: (-item[0], item[1]))
+            return [
+                (score, self._pages[page_id])
+                for score, candidate in scores[:limit]
+                for page_id in sorted(self._titles[candidate])
+            ]
@@ -0,0 +1,229 @@
+import os
+from pathlib import Path
+from time import monotonic, sleep
+from typing import Annotated
+
+from typer import Argument, Option, Typer, echo
+
+from .batch import SimilarityOption, run_batch
+from .constants import (
+    BATCH_IMAGE_SUFFIXES,
+    BATCH_MAX_WORKERS,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_MAX_EDGE,
+    TITLE_SIMILARITY_THRESHOLD,
+    WATCH_POLL_INTERVAL,
+    WATCH_SETTLE_TIME,
+    DishDifficulty,
+    ImageDetail,
+)
+from .image_processing import ImageOptions
+from .journal import Journal
+from .logger import logger
+from .main import (
+    DetailOption,
+    GrayscaleOption,
+    MaxEdgeOption,
+    QualityOption,
+    _validate_country,
+    _validate_date,
+    _validate_dish_type,
+    get_notion_instance,
+    get_openai_instance,
+)
+from .title_index import TitleIndex
+
+app = Typer(
+    no_args_is_help=True,
+    rich_markup_mode='markdown',
+    context_settings={'help_option_names': ['-h', '--help']},
+    pretty_exceptions_enable=False,
+)
+
+
+class FolderWatcher:
+    """
+    Polls a folder for new or replaced JPEG files.
+
+    A file is reported once its size and modification time stayed the same for `settle`
+    seconds, so the photos still being written by a sync client are skipped until complete.
+    Each version of a file is reported once.
+    """
+
+    def __init__(self, folder: Path, settle: float = WATCH_SETTLE_TIME):
+        """
+        Initializes the FolderWatcher instance.
+
+        Args:
+            folder (Path): The folder to watch, its sub folders are ignored.
+            settle (float, optional): The seconds a file must stay unchanged to be reported.
+        """
+        self.folder = folder
+        self.settle = settle
+        # The size and modification time of every file, with when they were first seen
+        self._pending: dict[Path, tuple[tuple[int, int], float]] = {}
+        self._reported: dict[Path, tuple[int, int]] = {}
+
+    def poll(self, now: float | None = None) -> list[Path]:
+        """
+        Scans the folder once.
+
+        Args:
+            now (float, optional): The current `time.monotonic()`.
+
+        Returns:
+            list[Path]: The files complete since the previous scans, sorted by name.
+        """
+        now = monotonic() if now is None else now
+        found = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith('.') or Path(name).suffix.lower() not in BATCH_IMAGE_SUFFIXES:
+                    continue
+                if entry.is_file():
+                    stat = entry.stat()
+                    found[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+
+        ready = []
+        for path, signature in found.items():
+            if self._reported.get(path) == signature:
+                continue
+            first_seen = self._pending.get(path)
+            if first_seen is None or first_seen[0] != signature:
+                self._pending[path] = (signature, now)
+            elif signature[0] and now - first_seen[1] >= self.settle:
+                del self._pending[path]
+                self._reported[path] = signature
+                ready.append(path)
+
+        for known in (self._pending, self._reported):
+            for path in known.keys() - found.keys():
+                del known[path]
+        return sorted(ready)
+
+
+@app.command()
+def watch(
+    folder: Annotated[
+        Path,
+        Argument(exists=True, file_okay=False, help='The folder the photos are synced to.'),
+    ],
+    source: Annotated[str, Option('--source', '-s', help='Source of the receipts.')],
+    difficulty: Annotated[
+        DishDifficulty,
+        Option(case_sensitive=False, help='Difficulty of the dishes.'),
+    ],
+    type_: Annotated[
+        str,
+        Option(
+            '--type',
+            '-t',
+            help='Type of the receipts.',
+            callback=_validate_dish_type,
+        ),
+    ],
+    country: Annotated[
+        str,
+        Option(
+            '--country',
+            '-c',
+            help='Country of origin of the receipts.',
+            callback=_validate_country,
+        ),
+    ] = None,
+    date: Annotated[
+        str,
+        Option(
+            '--date',
+            '-d',
+            help='Date where the receipts have been done. Example 20241231.',
+            callback=_validate_date,
+        ),
+    ] = None,
+    force: Annotated[
+        bool,
+        Option(
+            '--force',
+            '-f',
+            help='Force the name duplication if a title is already present, and the extraction '
+            'of photos looking like one already extracted',
+        ),
+    ] = False,
+    interval: Annotated[
+        float,
+        Option(min=0.1, help='Seconds between two scans of the folder.'),
+    ] = WATCH_POLL_INTERVAL,
+    settle: Annotated[
+        float,
+        Option(min=0, help='Seconds a new photo must stay unchanged before it is uploaded.'),
+    ] = WATCH_SETTLE_TIME,
+    workers: Annotated[
+        int,
+        Option(
+            '--workers',
+            '-w',
+            min=1,
+            help='Maximum number of images in the vision model at the same time.',
+        ),
+    ] = BATCH_MAX_WORKERS,
+    similarity: SimilarityOption = TITLE_SIMILARITY_THRESHOLD,
+    max_edge: MaxEdgeOption = IMAGE_MAX_EDGE,
+    quality: QualityOption = IMAGE_JPEG_QUALITY,
+    grayscale: GrayscaleOption = False,
+    detail: DetailOption = ImageDetail.auto,
+):
+    """
+    Watch a folder and add every new photo to the Notion database, until interrupted.
+
+    The clients, the caches and the title index stay loaded between photos. The photos are
+    journaled like with `cook-batch`, so the ones already uploaded are skipped on restart.
+    """
+    defaults = {
+        'difficulty': difficulty.value.title(),
+        'type_': type_,
+        'origin': country,
+        'date': date,
+        'source': source.title(),
+        'force': force,
+    }
+    image_options = ImageOptions(
+        max_edge=max_edge,
+        quality=quality,
+        grayscale=grayscale,
+        detail=detail.value,
+    )
+    notion_instance = get_notion_instance()
+    notion_instance.title_index = TitleIndex(
+        notion_instance.db_id,
+        similarity_threshold=similarity,
+    )
+    get_openai_instance()
+    journal = Journal(notion_instance.db_id)
+    watcher = FolderWatcher(folder, settle)
+
+    logger.info(f'Watching {folder} for new photos')
+    try:
+        while True:
+            ready = watcher.poll()
+            if ready:
+                failures = run_batch(
+                    [(image_path, {}) for image_path in ready],
+                    defaults,
+                    workers,
+                    image_options,
+                    journal=journal,
+                )
+                for image_path in ready:
+                    status = f'FAILED: {failures[image_path]}' if image_path in failures else 'OK'
+                    echo(f'{image_path}: {status}')
+                notion_instance.title_index.save()
+            sleep(interval)
+    except KeyboardInterrupt:
+        logger.info(f'Stopped watching {folder}')
+    finally:
+        notion_instance.title_index.save()
+
+
+if __name__ == '__main__':
+    app()  # pragma: no cover
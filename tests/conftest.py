@@ -1,10 +1,25 @@
+import json
 import os
+from pathlib import Path
 
 import pytest
 from openai import OpenAI
 
 from cook_upload import NotionActions
-from cook_upload.constants import NOTION_API_KEY, NOTION_DB_ID, OPENAI_API_KEY, OPENAI_PROJECT_ID
+from cook_upload.constants import (
+    CACHE_DIR_ENV,
+    NOTION_API_KEY,
+    NOTION_DB_ID,
+    NOTION_REQUESTS_PER_SECOND_ENV,
+    OPENAI_API_KEY,
+    OPENAI_PROJECT_ID,
+    OPENAI_REQUESTS_PER_MINUTE_ENV,
+    OPENAI_TOKENS_PER_MINUTE_ENV,
+)
+from cook_upload.main import get_notion_instance
+from cook_upload.rate_limit import notion_rate_limiter, openai_rate_limiter
+
+STATIC_DIR = Path(__file__).parent / 'static'
 
 
 @pytest.fixture(scope='session')
@@ -14,6 +29,46 @@ def vcr_config():
     }
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch) -> Path:
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setenv(CACHE_DIR_ENV, cache_dir.as_posix())
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def _no_rate_limits(monkeypatch):
+    """Cassettes are replayed instantly, the shared rate limits would only slow the tests down."""
+    for name in (
+        NOTION_REQUESTS_PER_SECOND_ENV,
+        OPENAI_REQUESTS_PER_MINUTE_ENV,
+        OPENAI_TOKENS_PER_MINUTE_ENV,
+    ):
+        monkeypatch.setenv(name, '0')
+    notion_rate_limiter.cache_clear()
+    openai_rate_limiter.cache_clear()
+    yield
+    notion_rate_limiter.cache_clear()
+    openai_rate_limiter.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_notion_instance():
+    """The batch commands attach a title index to the shared client, keep it to one test."""
+    yield
+    get_notion_instance.cache_clear()
+
+
+@pytest.fixture
+def metadata_payload() -> dict:
+    return json.loads((STATIC_DIR / 'metadata.json').read_text())
+
+
+@pytest.fixture
+def page_payload() -> dict:
+    return json.loads((STATIC_DIR / 'page.json').read_text())
+
+
 @pytest.fixture
 def notion() -> NotionActions:
     return NotionActions(os.getenv(NOTION_API_KEY), os.getenv(NOTION_DB_ID))
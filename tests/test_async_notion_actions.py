@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from cook_upload import AsyncNotionActions, NotionDBMetadata, PageAlreadyCreatedError
+from cook_upload.constants import NOTION_API_KEY, NOTION_DB_ID
+from tests.test_notion_actions import UNPROJECTED_CASSETTE
+
+
+@pytest.fixture
+async def async_notion():
+    async with AsyncNotionActions(os.getenv(NOTION_API_KEY), os.getenv(NOTION_DB_ID)) as notion:
+        yield notion
+
+
+def _drop_content_encoding(response):
+    # Cassettes store the decoded body, which httpx would otherwise try to decompress again.
+    response['headers'].pop('Content-Encoding', None)
+    return response
+
+
+@pytest.fixture(scope='module')
+def vcr_config():
+    return {
+        'filter_headers': [('Authorization', 'dummy')],
+        'before_record_response': _drop_content_encoding,
+    }
+
+
+@pytest.fixture
+def vcr_cassette_name(request):
+    # The async client replays the cassettes recorded for the sync one.
+    return f'Test_NotionActions.{request.node.name}'
+
+
+class Test_AsyncNotionActions:
+    @pytest.mark.vcr
+    async def test_get_db_data(self, async_notion: AsyncNotionActions):
+        data = await async_notion.get_db_metadata()
+        assert isinstance(data, NotionDBMetadata)
+
+    @pytest.mark.vcr
+    async def test_query_db_same_title(self, async_notion: AsyncNotionActions):
+        assert len((await async_notion.get_entry(title='Baklava')).results) == 1
+
+    @UNPROJECTED_CASSETTE
+    async def test_is_title_already_used(self, async_notion: AsyncNotionActions):
+        with pytest.raises(PageAlreadyCreatedError, match='Baklava'):
+            await async_notion.is_title_used(title='Baklava', source='Lebanon Cookbookp pg 413')
+
+    @UNPROJECTED_CASSETTE
+    async def test_is_title_used_not_used(self, async_notion: AsyncNotionActions):
+        assert await async_notion.is_title_used(title='Moise', source='moise') is None
+
+    @pytest.mark.vcr
+    async def test_dish_type(self, async_notion: AsyncNotionActions):
+        data = await async_notion.dish_type()
+        assert all(x in data for x in ['pasta', 'dough', 'poultry', 'meat', 'pancakes'])
@@ -0,0 +1,258 @@
+import json
+
+import pytest
+from typer import BadParameter
+from typer.testing import CliRunner
+
+from cook_upload import ExtractionResponse
+from cook_upload.batch import _resolve_params, app, collect_images, run_batch
+from cook_upload.journal import JobStage, Journal
+from cook_upload.main import PreparedImage
+
+runner = CliRunner()
+
+DEFAULTS = {
+    'difficulty': 'Easy',
+    'type_': 'Meat',
+    'origin': None,
+    'date': None,
+    'source': 'Leith',
+    'force': False,
+}
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = [tmp_path / f'page{i}.jpg' for i in range(3)]
+    for path in paths:
+        path.write_bytes(b'\xff\xd8\xff')
+    (tmp_path / 'notes.txt').write_text('not an image')
+    return paths
+
+
+def test_collect_images_from_directory(tmp_path, images):
+    assert collect_images([tmp_path]) == [(path, {}) for path in images]
+
+
+def test_collect_images_from_glob(tmp_path, images):
+    assert collect_images([tmp_path / 'page[01].jpg']) == [(path, {}) for path in images[:2]]
+
+
+def test_collect_images_from_manifest(tmp_path, images):
+    manifest = tmp_path / 'manifest.jsonl'
+    manifest.write_text(
+        '\n'.join(
+            [
+                json.dumps({'image': images[0].name, 'source': 'Leith p.56'}),
+                '',
+                json.dumps({'image': images[1].as_posix()}),
+            ],
+        ),
+    )
+    assert collect_images([manifest]) == [(images[0], {'source': 'Leith p.56'}), (images[1], {})]
+
+
+@pytest.mark.parametrize(
+    'entry',
+    [{'source': 'Leith p.56'}, ['page0.jpg'], {'image': 3}, 'page0.jpg'],
+)
+def test_collect_images_bad_manifest(tmp_path, entry):
+    manifest = tmp_path / 'manifest.jsonl'
+    manifest.write_text(json.dumps(entry))
+    with pytest.raises(BadParameter):
+        collect_images([manifest])
+
+
+def test_collect_images_missing_input(tmp_path):
+    with pytest.raises(BadParameter):
+        collect_images([tmp_path / 'missing.jpg'])
+
+
+def test_resolve_params_overrides():
+    params = _resolve_params(DEFAULTS, {'source': 'leith p.56', 'difficulty': 'hard'})
+    assert params == {**DEFAULTS, 'source': 'Leith P.56', 'difficulty': 'Hard'}
+
+
+def test_resolve_params_not_string():
+    with pytest.raises(BadParameter, match='difficulty'):
+        _resolve_params(DEFAULTS, {'difficulty': 3})
+
+
+def test_run_batch_reports_bad_overrides(images, mocker):
+    mocker.patch('cook_upload.batch.prepare_image')
+    mocker.patch('cook_upload.batch.extract_image')
+    mocked_add = mocker.patch('cook_upload.batch.add_recipe')
+    failures = run_batch(
+        [(images[0], {'difficulty': 3}), (images[1], {})],
+        DEFAULTS,
+        workers=1,
+    )
+
+    assert list(failures) == [images[0]]
+    mocked_add.assert_called_once()
+
+
+def test_resolve_params_missing_source():
+    with pytest.raises(BadParameter, match='source'):
+        _resolve_params({**DEFAULTS, 'source': None}, {})
+
+
+def test_run_batch_reports_failures(images, mocker):
+    def extract(image_path, *_args):
+        if image_path == images[1]:
+            raise ValueError('Refused')
+
+    mocker.patch('cook_upload.batch.prepare_image')
+    mocked = mocker.patch('cook_upload.batch.extract_image', side_effect=extract)
+    mocked_add = mocker.patch('cook_upload.batch.add_recipe')
+    failures = run_batch([(path, {}) for path in images], DEFAULTS, workers=2)
+
+    assert failures == {images[1]: 'Refused'}
+    assert mocked.call_count == 3
+    assert mocked_add.call_count == 2
+
+
+@pytest.mark.usefixtures('images')
+def test_batch_command_summary(tmp_path, mocker):
+    mocker.patch('cook_upload.batch.prepare_image')
+    results = runner.invoke(app, [tmp_path.as_posix(), '-s', 'Leith', '--difficulty', 'easy'])
+
+    assert results.exit_code == 1
+    assert '0 uploaded, 3 failed.' in results.output
+    assert "Missing parameters ['type_']" in results.output
+
+
+def test_batch_command_openai_batch(tmp_path, images, mocker):
+    mocker.patch('cook_upload.batch._validate_dish_type', return_value='Meat')
+    mocked_extract = mocker.patch(
+        'cook_upload.batch.extract_to_cache',
+        return_value={images[0]: 'Refused'},
+    )
+    mocked_prepare = mocker.patch('cook_upload.batch.prepare_image')
+    mocker.patch('cook_upload.batch.extract_image')
+    mocker.patch('cook_upload.batch.add_recipe')
+    results = runner.invoke(
+        app,
+        [
+            tmp_path.as_posix(),
+            '-s',
+            'Leith',
+            '--difficulty',
+            'easy',
+            '-t',
+            'meat',
+            '--openai-batch',
+            '--no-journal',
+        ],
+    )
+
+    assert mocked_extract.call_args[0][1] == images
+    assert sorted(call[0][0] for call in mocked_prepare.call_args_list) == images[1:]
+    assert '2 uploaded, 1 failed.' in results.output
+    assert f'{images[0]}: FAILED: Refused' in results.output
+
+
+def test_batch_command_openai_batch_checks_images_first(tmp_path, images, mocker):
+    manifest = tmp_path / 'manifest.jsonl'
+    manifest.write_text(
+        '\n'.join(
+            json.dumps(entry)
+            for entry in [
+                {'image': 'page0.jpg'},
+                {'image': 'missing.jpg'},
+                {'image': 'notes.txt'},
+                {'image': 'page1.jpg', 'difficulty': 'impossible'},
+            ]
+        ),
+    )
+    mocker.patch('cook_upload.batch._validate_dish_type', return_value='Meat')
+    mocked_extract = mocker.patch('cook_upload.batch.extract_to_cache', return_value={})
+    mocker.patch('cook_upload.batch.prepare_image')
+    mocker.patch('cook_upload.batch.extract_image')
+    mocker.patch('cook_upload.batch.add_recipe')
+    args = [manifest.as_posix(), '-s', 'Leith', '--difficulty', 'easy', '-t', 'meat']
+    results = runner.invoke(app, [*args, '--openai-batch', '--no-journal'])
+
+    assert mocked_extract.call_args[0][1] == [images[0]]
+    assert '1 uploaded, 3 failed.' in results.output
+    assert f'{tmp_path / "missing.jpg"}: FAILED' in results.output
+
+
+@pytest.fixture
+def journal():
+    return Journal('database')
+
+
+@pytest.fixture
+def prepared(mocker):
+    def prepare(image_path, *_args, **_kwargs):
+        extraction = ExtractionResponse(title=image_path.stem, ingredients='- egg', steps='1. Mix')
+        return PreparedImage(image_path.stem, extraction, None, 'auto')
+
+    return mocker.patch('cook_upload.batch.prepare_image', side_effect=prepare)
+
+
+@pytest.mark.usefixtures('prepared')
+def test_run_batch_journals_pages(images, journal, mocker):
+    mocker.patch('cook_upload.batch.get_notion_instance')
+    mocker.patch(
+        'cook_upload.batch.add_recipe',
+        side_effect=lambda extraction, _, **__: extraction.title,
+    )
+    assert run_batch([(path, {}) for path in images], DEFAULTS, 2, journal=journal) == {}
+
+    for path in images:
+        assert journal.get(path.stem) == (str(path), JobStage.created, path.stem)
+
+
+@pytest.mark.usefixtures('prepared')
+def test_run_batch_resumes(images, journal, mocker):
+    journal.advance('page0', images[0], JobStage.created, 'page-0')
+    journal.advance('page1', images[1], JobStage.deduped)
+    journal.advance('page2', images[2], JobStage.deduped)
+    notion = mocker.patch('cook_upload.batch.get_notion_instance').return_value
+    notion.find_pages.side_effect = lambda title, _: ['page-1'] if title == 'Page1' else []
+    mocked_extract = mocker.patch(
+        'cook_upload.batch.extract_image',
+        side_effect=lambda _, prepared: prepared.cached,
+    )
+    mocked_add = mocker.patch('cook_upload.batch.add_recipe', return_value='page-2')
+
+    assert run_batch([(path, {}) for path in images], DEFAULTS, 2, journal=journal) == {}
+    assert mocked_extract.call_count == 2
+    mocked_add.assert_called_once()
+    assert mocked_add.call_args.kwargs == {'checked': True}
+    notion.is_title_used.assert_called_once_with('Page2', 'Leith', False)
+    assert journal.get('page0').page_id == 'page-0'
+    assert journal.get('page1').page_id == 'page-1'
+    assert journal.get('page2') == (str(images[2]), JobStage.created, 'page-2')
+    notion.page_exists.assert_called_once_with('page-0')
+
+
+@pytest.mark.usefixtures('prepared')
+@pytest.mark.parametrize('force', [False, True])
+def test_run_batch_uploads_deleted_pages_again(images, journal, mocker, force):
+    journal.advance('page0', images[0], JobStage.created, 'page-0')
+    notion = mocker.patch('cook_upload.batch.get_notion_instance').return_value
+    notion.page_exists.return_value = False
+    mocker.patch('cook_upload.batch.extract_image', side_effect=lambda _, prepared: prepared.cached)
+    mocked_add = mocker.patch('cook_upload.batch.add_recipe', return_value='page-new')
+
+    assert run_batch([(images[0], {})], {**DEFAULTS, 'force': force}, 1, journal=journal) == {}
+    mocked_add.assert_called_once()
+    notion.is_title_used.assert_called_once_with('Page0', 'Leith', force)
+    assert journal.get('page0').page_id == 'page-new'
+
+
+@pytest.mark.usefixtures('prepared')
+def test_run_batch_force_skips_uploaded_pages(images, journal, mocker):
+    journal.advance('page0', images[0], JobStage.created, 'page-0')
+    notion = mocker.patch('cook_upload.batch.get_notion_instance').return_value
+    notion.page_exists.return_value = True
+    mocked_extract = mocker.patch('cook_upload.batch.extract_image')
+    mocked_add = mocker.patch('cook_upload.batch.add_recipe')
+
+    assert run_batch([(images[0], {})], {**DEFAULTS, 'force': True}, 1, journal=journal) == {}
+    mocked_extract.assert_not_called()
+    mocked_add.assert_not_called()
+    assert journal.get('page0').page_id == 'page-0'
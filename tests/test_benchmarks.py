@@ -0,0 +1,64 @@
+import pytest
+from openai import OpenAI
+
+from benchmarks.fake_api import FakeAPI
+from benchmarks.fixtures import DB_ID, metadata, search_response
+from benchmarks.hot_paths import CASES, regressions
+from cook_upload import NotionActions, PageAlreadyCreatedError, parse_image
+from cook_upload.constants import NOTION_API_URL_ENV
+from cook_upload.models import NotionDBMetadata, NotionDBSearch
+from tests.test_notion_actions import LONG_RECIPE
+
+
+def test_fixtures_match_the_models():
+    assert len(NotionDBSearch.model_validate(search_response(10)).results) == 10
+    assert len(NotionDBMetadata.model_validate(metadata(10)).properties.type_.select.options) == 10
+
+
+@pytest.mark.parametrize('name', CASES)
+def test_cases_run(name):
+    assert CASES[name](1)() is not None
+
+
+def test_regressions():
+    baseline = {'search[10]': 1.0, 'encode[10]': 1.0}
+    timings = {'search[10]': 1.2, 'encode[10]': 1.5, 'metadata[10]': 9.0}
+    assert regressions(timings, baseline, threshold=1.3) == {'encode[10]': 1.5}
+
+
+@pytest.fixture
+def fake_api():
+    with FakeAPI() as api:
+        yield api
+
+
+def test_fake_api_keeps_the_created_pages(fake_api, cache_dir):
+    notion = NotionActions('fake', DB_ID, cache_dir=cache_dir, api_url=fake_api.url)
+    assert 'meat' in notion.dish_type
+    for i in range(5):
+        notion.add_entry(**{**LONG_RECIPE, 'title': f'Recipe {i}', 'date': None})
+
+    assert len(list(notion.iter_entries(page_size=2))) == 5
+    assert fake_api.requests['POST databases/query'] == 5 + 3
+    # The blocks above the 100 of the creation request are appended in order
+    params = {**LONG_RECIPE, 'title': 'Recipe 0', 'date': None}
+    expected = notion._new_page_query(**params)['children']
+    blocks = fake_api.blocks[fake_api.pages[0]['id']]
+    assert [{k: v for k, v in block.items() if k != 'id'} for block in blocks] == expected
+    with pytest.raises(PageAlreadyCreatedError):
+        notion.add_entry(**{**LONG_RECIPE, 'title': 'Recipe 3', 'date': None})
+
+
+def test_fake_api_throttles(cache_dir, monkeypatch):
+    with FakeAPI(requests_per_second=1) as api:
+        monkeypatch.setenv(NOTION_API_URL_ENV, api.url)
+        notion = NotionActions('fake', DB_ID, cache_dir=cache_dir)
+        notion.get_db_metadata()
+        notion.get_db_metadata(max_age=0)
+    assert api.throttled >= 1
+    assert api.requests['GET databases'] == 2 + api.throttled
+
+
+def test_fake_vision(fake_api):
+    client = OpenAI(api_key='fake', base_url=fake_api.url)
+    assert parse_image(client, 'abcd') == ('Recipe 0', '- 1 egg', '1. Cook it')
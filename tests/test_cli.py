@@ -1,12 +1,17 @@
+import json
 import os
+import subprocess
+import sys
 from datetime import datetime
 from pathlib import Path
+from unittest.mock import PropertyMock
 
 import pytest
 from dotenv import load_dotenv
 from typer.testing import CliRunner
 
 from cook_upload.main import app
+from tests.test_notion_actions import UNPROJECTED_CASSETTE
 
 load_dotenv(dotenv_path=Path(__file__).parent.parent / '.env')
 
@@ -28,7 +33,7 @@ commands = [
     commands,
     ids=['all_params', 'lowercase_diff', 'no_date', 'no_country'],
 )
-@pytest.mark.vcr
+@UNPROJECTED_CASSETTE
 def test_app_invoke_works(commands, mocker):
     mocker.patch('cook_upload.main.parse_image', return_value=('string1', 'string2', 'string3'))
     results = runner.invoke(app, commands, env=os.environ.copy(), catch_exceptions=False)
@@ -127,6 +132,7 @@ dates = [
 def test_date_param_is_as_expected(mocker, date, expected_date):
     commands = [IMAGE_PATH, 'Easy', '-s', 'Source1', '-t', 'Meat', '-c', 'Italy']
     expected_params = {
+        'checked': False,
         'difficulty': 'Easy',
         'force': False,
         'ingredients': 'string2',
@@ -146,3 +152,65 @@ def test_date_param_is_as_expected(mocker, date, expected_date):
 
     args = mocked_action.call_args
     assert dict(args[1]) == expected_params
+
+
+def test_pages_are_extracted_together(tmp_path, mocker):
+    pages = [tmp_path / 'page1.jpg', tmp_path / 'page2.jpg']
+    for i, page in enumerate(pages):
+        page.write_bytes(b'\xff\xd8\xff' + bytes([i]))
+    mocker.patch(
+        'cook_upload.notion_actions.NotionActions.dish_type',
+        new_callable=PropertyMock,
+        return_value=['meat'],
+    )
+    mocked_parse = mocker.patch(
+        'cook_upload.main.parse_image',
+        return_value=('string1', 'string2', 'string3'),
+    )
+    mocked_action = mocker.patch('cook_upload.main.notion_instance.add_entry')
+
+    commands = [page.as_posix() for page in pages] + ['Easy', '-s', 'Source1', '-t', 'Meat']
+    results = runner.invoke(app, commands, catch_exceptions=False)
+
+    assert results.exit_code == 0
+    data_urls = mocked_parse.call_args[1]['base64_image']
+    assert len(data_urls) == 2
+    assert data_urls[0] != data_urls[1]
+    mocked_action.assert_called_once()
+
+
+def test_profile_writes_metrics(tmp_path, mocker):
+    image_path = tmp_path / 'page.jpg'
+    image_path.write_bytes(b'\xff\xd8\xff')
+    mocker.patch(
+        'cook_upload.notion_actions.NotionActions.dish_type',
+        new_callable=PropertyMock,
+        return_value=['meat'],
+    )
+    mocker.patch('cook_upload.main.parse_image', return_value=('string1', 'string2', 'string3'))
+    mocker.patch('cook_upload.main.notion_instance.add_entry')
+    metrics_path = tmp_path / 'metrics.json'
+
+    commands = [image_path.as_posix(), 'Easy', '-s', 'Source1', '-t', 'Meat']
+    results = runner.invoke(app, [*commands, '--metrics', metrics_path.as_posix()])
+
+    assert results.exit_code == 0
+    stages = json.loads(metrics_path.read_text())['summary']
+    assert list(stages) == ['read', 'hash', 'encode', 'extract', 'notion']
+    assert stages['encode']['response_bytes'] > 0
+    assert 'p95' in results.stdout
+
+
+def test_startup_defers_heavy_imports():
+    code = (
+        'import sys, cook_upload.main; '
+        "print(*sorted({m.split('.')[0] for m in sys.modules} & "
+        "{'loguru', 'openai', 'pydantic', 'requests'}))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == ''
@@ -0,0 +1,151 @@
+import random
+from io import BytesIO
+from itertools import combinations
+
+import pytest
+
+from cook_upload import SimilarImageError
+from cook_upload.constants import IMAGE_HASH_MAX_DISTANCE
+from cook_upload.image_hash import BKTree, ImageHashIndex, dhash, hamming
+from cook_upload.main import get_image_hashes, upload_image
+from cook_upload.models import ExtractionResponse
+
+RESPONSE = ExtractionResponse(title='Baklava', ingredients='- Filo', steps='1. Bake')
+
+WORDS = ['flour', 'butter', 'sugar', 'eggs', 'salt', 'onion', 'simmer', 'bake', 'whisk', 'lemon']
+
+
+def _page(seed: int, layout: int | None = None):
+    """Renders a cookbook page: a title, an optional picture and paragraphs of text."""
+    image_module = pytest.importorskip('PIL.Image')
+    from PIL import ImageDraw, ImageFont
+
+    words = random.Random(seed)
+    shape = random.Random(seed if layout is None else layout)
+    page = image_module.new('L', (600, 800), 245)
+    draw = ImageDraw.Draw(page)
+    title = ' '.join(words.choice(WORDS).title() for _ in range(shape.randint(2, 4)))
+    draw.text((40, 40), title, fill=20, font=ImageFont.load_default(size=28))
+    font = ImageFont.load_default(size=13)
+    y = 100
+    if shape.random() < 0.5:
+        bottom = y + shape.randint(100, 250)
+        draw.rectangle((40, y, 40 + shape.randint(200, 500), bottom), fill=words.randint(60, 160))
+        y = bottom + 25
+    while y < 750:
+        for _ in range(shape.randint(2, 8)):
+            line = ' '.join(words.choice(WORDS) for _ in range(shape.randint(3, 11)))
+            draw.text((40 + shape.choice([0, 0, 20]), y), line, fill=30, font=font)
+            y += 18
+        y += shape.randint(10, 30)
+    return page
+
+
+def _photo(page, size: tuple[int, int] | None = None, brightness: float = 1.0) -> bytes:
+    from PIL import ImageEnhance
+
+    photo = ImageEnhance.Brightness(page).enhance(brightness)
+    output = BytesIO()
+    photo.resize(size or page.size).convert('RGB').save(output, 'JPEG', quality=85)
+    return output.getvalue()
+
+
+def test_bk_tree_matches_brute_force():
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree()
+    for index, hash_ in enumerate(hashes):
+        tree.add(hash_, index)
+    assert len(tree) == len(hashes)
+
+    for hash_ in hashes[:20]:
+        query = hash_ ^ rng.getrandbits(8)
+        expected = sorted(
+            (hamming(query, other), index)
+            for index, other in enumerate(hashes)
+            if hamming(query, other) <= 28
+        )
+        assert sorted(tree.search(query, 28)) == expected
+
+
+def test_bk_tree_empty():
+    assert BKTree().search(0, 10) == []
+
+
+@pytest.mark.parametrize('layout', [None, 0], ids=['any_layout', 'same_layout'])
+def test_dhash_separates_text_pages(layout):
+    pages = [_page(seed, layout) for seed in range(8)]
+    hashes = [dhash(_photo(page)) for page in pages]
+    assert all(hash_ is not None and hash_.bit_length() <= 24 * 24 for hash_ in hashes)
+
+    for page, hash_ in zip(pages, hashes, strict=True):
+        for copy in (
+            _photo(page, size=(300, 400)),
+            _photo(page, brightness=0.85),
+            _photo(page, size=(450, 600), brightness=1.15),
+        ):
+            assert hamming(hash_, dhash(copy)) <= IMAGE_HASH_MAX_DISTANCE
+    for first, second in combinations(hashes, 2):
+        assert hamming(first, second) > IMAGE_HASH_MAX_DISTANCE
+
+
+def test_dhash_unreadable():
+    pytest.importorskip('PIL.Image')
+    assert dhash(b'\xff\xd8\xff') is None
+
+
+def test_index_persists(cache_dir):
+    index = ImageHashIndex()
+    assert index.path == cache_dir / 'image_hashes.sqlite3'
+    assert index.find(0) is None
+
+    index.add(0b1011, 'key', 'page.jpg')
+    index.add(0b1011, 'key', 'page.jpg')
+    assert index.find(0b1001) == (1, 'key', 'page.jpg')
+
+    reloaded = ImageHashIndex(max_distance=0)
+    assert reloaded.find(0b1011) == (0, 'key', 'page.jpg')
+    assert reloaded.find(0b1001) is None
+    assert len(reloaded._loaded_tree()) == 1
+
+
+@pytest.fixture
+def copies(tmp_path):
+    page = _page(1)
+    first, second, other = tmp_path / 'first.jpg', tmp_path / 'second.jpg', tmp_path / 'other.jpg'
+    first.write_bytes(_photo(page))
+    second.write_bytes(_photo(page, size=(300, 400), brightness=1.15))
+    other.write_bytes(_photo(_page(2)))
+    return first, second, other
+
+
+def test_upload_image_flags_copies(copies, mocker):
+    first, second, other = copies
+    mocked_parse = mocker.patch(
+        'cook_upload.main.parse_image',
+        return_value=(RESPONSE.title, RESPONSE.ingredients, RESPONSE.steps),
+    )
+    mocked_add = mocker.patch('cook_upload.main.notion_instance.add_entry')
+
+    upload_image(first, {'source': 'Leith'})
+    with pytest.raises(SimilarImageError, match='second.jpg looks like first.jpg'):
+        upload_image(second, {'source': 'Leith'})
+    upload_image(other, {'source': 'Leith'})
+
+    assert mocked_parse.call_count == 2
+    assert mocked_add.call_count == 2
+    assert get_image_hashes().find(dhash(first.read_bytes()))[2] == 'first.jpg'
+
+
+def test_upload_image_force_extracts_copies(copies, mocker):
+    first, second, _ = copies
+    mocked_parse = mocker.patch(
+        'cook_upload.main.parse_image',
+        return_value=(RESPONSE.title, RESPONSE.ingredients, RESPONSE.steps),
+    )
+    mocker.patch('cook_upload.main.notion_instance.add_entry')
+
+    upload_image(first, {'source': 'Leith'})
+    upload_image(second, {'source': 'Leith', 'force': True})
+
+    assert mocked_parse.call_count == 2
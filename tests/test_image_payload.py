@@ -0,0 +1,37 @@
+from base64 import b64encode
+
+import pytest
+
+from cook_upload.image_payload import encode_data_url, map_image
+from cook_upload.openai_actions import _image_message
+
+
+@pytest.mark.parametrize('size', [0, 1, 2, 3, 1024 * 1024 + 1])
+def test_encode_data_url(monkeypatch, size):
+    monkeypatch.setattr('cook_upload.image_payload.IMAGE_ENCODE_CHUNK_SIZE', 3 * 1024)
+    image = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    assert encode_data_url(image) == f'data:image/jpeg;base64,{b64encode(image).decode()}'
+
+
+def test_map_image(tmp_path):
+    image_path = tmp_path / 'image.jpg'
+    image_path.write_bytes(b'\xff\xd8\xff')
+    with map_image(image_path) as image:
+        assert encode_data_url(image) == encode_data_url(image_path.read_bytes())
+
+
+def test_map_empty_image(tmp_path):
+    image_path = tmp_path / 'image.jpg'
+    image_path.touch()
+    with map_image(image_path) as image:
+        assert encode_data_url(image) == 'data:image/jpeg;base64,'
+
+
+def test_image_message_keeps_the_data_url():
+    data_url = encode_data_url(b'\xff\xd8\xff')
+    message = _image_message(data_url, 'low')
+    assert message.content[1].image_url.url is data_url
+    assert message.model_dump(exclude_unset=True)['content'][1] == {
+        'type': 'image_url',
+        'image_url': {'url': data_url, 'detail': 'low'},
+    }
@@ -0,0 +1,63 @@
+import sys
+from io import BytesIO
+
+import pytest
+
+from cook_upload.image_processing import ImageOptions, preprocess_image
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def _jpeg(width: int, height: int, orientation: int | None = None) -> bytes:
+    image = Image.new('RGB', (width, height), (200, 100, 50))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    output = BytesIO()
+    image.save(output, format='JPEG', exif=exif)
+    return output.getvalue()
+
+
+def _size(data: bytes) -> tuple[int, int]:
+    with Image.open(BytesIO(data)) as image:
+        return image.size
+
+
+def test_downscales_to_the_model_tiling():
+    assert _size(preprocess_image(_jpeg(3000, 4000))) == (768, 1024)
+
+
+def test_max_edge_is_configurable():
+    assert _size(preprocess_image(_jpeg(3000, 4000), ImageOptions(max_edge=800))) == (600, 800)
+
+
+def test_low_detail_fits_a_single_tile():
+    assert _size(preprocess_image(_jpeg(3000, 4000), ImageOptions(detail='low'))) == (384, 512)
+
+
+def test_small_images_are_not_upscaled():
+    assert _size(preprocess_image(_jpeg(300, 400))) == (300, 400)
+
+
+def test_exif_orientation_is_applied():
+    assert _size(preprocess_image(_jpeg(400, 300, orientation=6))) == (300, 400)
+
+
+def test_grayscale():
+    data = preprocess_image(_jpeg(300, 400), ImageOptions(grayscale=True))
+    with Image.open(BytesIO(data)) as image:
+        assert image.mode == 'L'
+
+
+def test_unreadable_image_is_returned_unchanged():
+    assert preprocess_image(b'not an image') == b'not an image'
+
+
+def test_without_pillow_image_is_returned_unchanged(monkeypatch):
+    data = _jpeg(3000, 4000)
+    monkeypatch.setitem(sys.modules, 'PIL', None)
+    assert preprocess_image(data) == data
+
+
+def test_options_change_the_cache_variant():
+    assert ImageOptions().cache_variant != ImageOptions(detail='low').cache_variant
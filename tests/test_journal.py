@@ -0,0 +1,34 @@
+import pytest
+
+from cook_upload.journal import JobStage, Journal
+
+
+@pytest.fixture
+def journal() -> Journal:
+    return Journal('database')
+
+
+def test_default_path(cache_dir):
+    assert Journal('1234-abcd').path == cache_dir / 'journals' / '1234abcd.sqlite3'
+
+
+def test_journals_are_per_database(journal: Journal):
+    journal.advance('key', 'page.jpg', JobStage.created, 'page-id')
+    assert Journal('other').get('key') is None
+
+
+def test_advance_and_get(journal: Journal, tmp_path):
+    image = tmp_path / 'page.jpg'
+    assert journal.get('key') is None
+
+    journal.advance('key', image, JobStage.hashed)
+    assert journal.get('key') == (str(image), JobStage.hashed, None)
+
+    journal.advance('key', image, JobStage.created, 'page-id')
+    assert Journal('database').get('key') == (str(image), JobStage.created, 'page-id')
+
+
+def test_advance_never_goes_back(journal: Journal):
+    journal.advance('key', 'page.jpg', JobStage.created, 'page-id')
+    journal.advance('key', 'page.jpg', JobStage.hashed)
+    assert journal.get('key') == ('page.jpg', JobStage.created, 'page-id')
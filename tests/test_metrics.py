@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from cook_upload.metrics import Metrics, Span, endpoint, span, start_profiling, stop_profiling
+
+
+@pytest.fixture
+def metrics():
+    yield start_profiling()
+    stop_profiling()
+
+
+def test_spans_are_not_recorded_by_default():
+    with span('read') as timing:
+        timing.status = 200
+    assert timing.duration == 0
+
+
+def test_span_records_duration_and_sizes(metrics):
+    with span('notion POST pages') as timing:
+        timing.status = 200
+        timing.request_bytes = 10
+        timing.response_bytes = 20
+
+    (recorded,) = metrics.spans
+    assert recorded is timing
+    assert recorded.duration > 0
+    assert (recorded.status, recorded.request_bytes, recorded.response_bytes) == (200, 10, 20)
+
+
+def test_span_records_failures(metrics):
+    with pytest.raises(ValueError), span('extract'):
+        raise ValueError
+    assert metrics.spans[0].status == 'ValueError'
+
+
+def test_summary_percentiles():
+    metrics = Metrics()
+    for i in range(1, 101):
+        recorded = Span('encode')
+        recorded.duration, recorded.status = i / 1000, 'ok'
+        metrics.record(recorded)
+
+    stats = metrics.summary()['encode']
+    assert stats['count'] == 100
+    assert stats['p50_ms'] == pytest.approx(50)
+    assert stats['p95_ms'] == pytest.approx(95)
+    assert stats['max_ms'] == pytest.approx(100)
+    assert stats['statuses'] == {'ok': 100}
+    assert 'encode' in metrics.report()
+
+
+def test_write_json(metrics, tmp_path):
+    with span('read'):
+        pass
+    metrics.write_json(tmp_path / 'metrics.json')
+    data = json.loads((tmp_path / 'metrics.json').read_text())
+    assert data['summary']['read']['count'] == 1
+    assert data['spans'][0]['name'] == 'read'
+
+
+@pytest.mark.parametrize(
+    ('method', 'url', 'expected'),
+    [
+        (
+            'post',
+            'https://api.notion.com/v1/databases/56dada1e4604428b9e2d7d1a8d2ad131/query',
+            'notion POST databases/query',
+        ),
+        ('POST', 'https://api.notion.com/v1/pages', 'notion POST pages'),
+        (
+            'PATCH',
+            'https://api.notion.com/v1/blocks/d4251acf-eb2d-4f65-9809-543ca7524094/children',
+            'notion PATCH blocks/children',
+        ),
+    ],
+)
+def test_endpoint(method, url, expected):
+    assert endpoint(method, url) == expected
@@ -0,0 +1,64 @@
+import pytest
+
+from cook_upload import ExtractionResponse
+from cook_upload.main import upload_image
+from cook_upload.ocr_cache import OCRCache
+
+RESPONSE = ExtractionResponse(title='Baklava', ingredients='- nuts', steps='1. bake')
+
+
+@pytest.fixture
+def ocr_cache(cache_dir) -> OCRCache:
+    return OCRCache(cache_dir / 'ocr.sqlite3')
+
+
+def test_key_depends_on_image_prompt_and_model():
+    key = OCRCache.key(b'image')
+    assert key == OCRCache.key(b'image')
+    assert key != OCRCache.key(b'other image')
+    assert key != OCRCache.key(b'image', prompt='Another prompt')
+    assert key != OCRCache.key(b'image', model='gpt-4o')
+
+
+def test_get_and_set(ocr_cache: OCRCache):
+    key = OCRCache.key(b'image')
+    assert ocr_cache.get(key) is None
+
+    ocr_cache.set(key, RESPONSE)
+    assert ocr_cache.get(key) == RESPONSE
+    assert OCRCache(ocr_cache.path).get(key) == RESPONSE
+
+
+def test_least_recently_used_are_evicted(ocr_cache: OCRCache):
+    ocr_cache.max_bytes = 2 * len(RESPONSE.model_dump_json())
+    ocr_cache.set('first', RESPONSE)
+    ocr_cache.set('second', RESPONSE)
+    ocr_cache.get('first')
+    ocr_cache.set('third', RESPONSE)
+
+    assert ocr_cache.get('second') is None
+    assert ocr_cache.get('first') == RESPONSE
+    assert ocr_cache.get('third') == RESPONSE
+
+
+def test_upload_image_reuses_cached_extraction(tmp_path, mocker):
+    image_path = tmp_path / 'image.jpg'
+    image_path.write_bytes(b'\xff\xd8\xff')
+    mocked_parse = mocker.patch(
+        'cook_upload.main.parse_image',
+        return_value=(RESPONSE.title, RESPONSE.ingredients, RESPONSE.steps),
+    )
+    mocked_add = mocker.patch('cook_upload.main.notion_instance.add_entry')
+
+    upload_image(image_path, {'source': 'Leith'})
+    upload_image(image_path, {'source': 'Leith'})
+
+    mocked_parse.assert_called_once()
+    assert mocked_add.call_count == 2
+    assert mocked_add.call_args[1]['title'] == 'Baklava'
+
+
+def test_pages_key():
+    pages = [b'\xff\xd8\xff\x00', b'\xff\xd8\xff\x01']
+    assert OCRCache.pages_key(pages[:1]) == OCRCache.key(pages[0])
+    assert OCRCache.pages_key(pages) != OCRCache.pages_key(pages[::-1])
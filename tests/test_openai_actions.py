@@ -2,9 +2,11 @@ from base64 import b64encode
 from pathlib import Path
 
 import pytest
-from openai import BaseModel, OpenAI
+from openai import AsyncOpenAI, BaseModel, OpenAI
 
-from cook_upload import ImageRequest, parse_image
+from cook_upload import ImageRequest, aparse_image, parse_image
+from cook_upload.constants import OPENAI_PAGES_TEXT
+from cook_upload.openai_actions import _image_message
 
 
 class Message(BaseModel):
@@ -71,3 +73,31 @@ class Test_OpenAIActions:
 
         with pytest.raises(ValueError):
             parse_image(openai, b'abc')
+
+    async def test_aparse_fails(self, mocker):
+        client = AsyncOpenAI(api_key='dummy')
+        response = {
+            'id': 'chatcmpl-AV2E6tqg9DTGaUj4mtq3I35H38rTT',
+            'choices': [
+                {
+                    'finish_reason': 'stop',
+                    'message': {'content': '', 'refusal': 'Refused', 'parsed': {}},
+                },
+            ],
+        }
+
+        response = MockResponse.model_validate(response)
+        mocker.patch.object(client.beta.chat.completions, 'parse', return_value=response)
+
+        with pytest.raises(ValueError):
+            await aparse_image(client, b'abc')
+
+    def test_pages_in_one_message(self):
+        message = _image_message(['data:image/jpeg;base64,ab', 'data:image/jpeg;base64,cd'], 'low')
+        text, *images = message.content
+        assert OPENAI_PAGES_TEXT in text.text
+        assert [image.image_url.url for image in images] == [
+            'data:image/jpeg;base64,ab',
+            'data:image/jpeg;base64,cd',
+        ]
+        assert OPENAI_PAGES_TEXT not in _image_message('abcd', 'low').content[0].text
@@ -0,0 +1,138 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from cook_upload import ExtractionResponse
+from cook_upload.image_payload import encode_data_url
+from cook_upload.image_processing import ImageOptions
+from cook_upload.ocr_cache import OCRCache
+from cook_upload.openai_batch import (
+    BatchFailedError,
+    batch_request,
+    extract_to_cache,
+    wait_for_batch,
+    write_batch_files,
+)
+
+
+class FakeBatchClient:
+    """Local stand-in for the files and batches endpoints, answering with the image file name."""
+
+    def __init__(self, titles: dict[str, str], statuses=('validating', 'in_progress', 'completed')):
+        self.titles = titles
+        self.statuses = list(statuses)
+        self.uploads = {}
+        self.files = SimpleNamespace(create=self._create_file, content=self._file_content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve_batch)
+
+    def _create_file(self, file, purpose):
+        assert purpose == 'batch'
+        file_id = f'file-{len(self.uploads)}'
+        self.uploads[file_id] = [json.loads(line) for line in file.read().splitlines()]
+        return SimpleNamespace(id=file_id)
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        assert (endpoint, completion_window) == ('/v1/chat/completions', '24h')
+        return SimpleNamespace(id=input_file_id.replace('file', 'batch'))
+
+    def _retrieve_batch(self, batch_id):
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return SimpleNamespace(
+            id=batch_id,
+            status=status,
+            output_file_id=batch_id.replace('batch', 'output'),
+            error_file_id=None,
+            errors=None,
+        )
+
+    def _file_content(self, file_id):
+        lines = []
+        for request in self.uploads[file_id.replace('output', 'file')]:
+            url = request['body']['messages'][0]['content'][1]['image_url']['url']
+            title = self.titles[url]
+            message = {'content': None, 'refusal': 'Refused'}
+            if title:
+                content = {'title': title, 'ingredients': '- a', 'steps': '1. b'}
+                message = {'content': json.dumps(content), 'refusal': None}
+            body = {'choices': [{'message': message}]}
+            response = {'status_code': 200, 'body': body}
+            lines.append(json.dumps({'custom_id': request['custom_id'], 'response': response}))
+        return SimpleNamespace(text='\n'.join(lines))
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = [tmp_path / f'page{i}.jpg' for i in range(3)]
+    for i, path in enumerate(paths):
+        path.write_bytes(b'\xff\xd8\xff' + bytes([i]))
+    return paths
+
+
+def _titles(images, refused=()) -> dict[str, str | None]:
+    # The fake images are not valid JPEGs, so they are sent without pre-processing
+    return {
+        encode_data_url(path.read_bytes()): None if path in refused else path.stem
+        for path in images
+    }
+
+
+def test_batch_request_matches_parse_image():
+    request = batch_request('image-0', 'data:image/jpeg;base64,abcd', 'low')
+    body = request['body']
+    assert request['custom_id'] == 'image-0'
+    assert body['messages'][0]['content'][1]['image_url'] == {
+        'url': 'data:image/jpeg;base64,abcd',
+        'detail': 'low',
+    }
+    schema = body['response_format']['json_schema']
+    assert schema['strict'] is True
+    assert schema['schema']['additionalProperties'] is False
+    assert set(schema['schema']['required']) == set(ExtractionResponse.model_fields)
+
+
+def test_write_batch_files_splits_full_files(tmp_path, mocker):
+    mocker.patch('cook_upload.openai_batch.OPENAI_BATCH_MAX_REQUESTS', 2)
+    requests = [batch_request(f'image-{i}', 'data:image/jpeg;base64,abcd') for i in range(5)]
+    paths = write_batch_files(requests, tmp_path)
+    assert [len(path.read_text().splitlines()) for path in paths] == [2, 2, 1]
+
+
+def test_wait_for_batch_raises_on_failure():
+    client = FakeBatchClient({}, statuses=['in_progress', 'failed'])
+    with pytest.raises(BatchFailedError):
+        wait_for_batch(client, 'batch-0', poll_interval=0)
+
+
+def test_wait_for_batch_timeout():
+    client = FakeBatchClient({}, statuses=['in_progress'])
+    with pytest.raises(TimeoutError):
+        wait_for_batch(client, 'batch-0', poll_interval=0, timeout=0)
+
+
+def test_extract_to_cache(cache_dir, images):
+    ocr_cache = OCRCache(cache_dir / 'ocr.sqlite3')
+    client = FakeBatchClient(_titles(images, refused=[images[2]]))
+
+    failures = extract_to_cache(client, images, ocr_cache, poll_interval=0)
+
+    assert list(failures) == [images[2]]
+    for path in images[:2]:
+        key = OCRCache.key(path.read_bytes(), variant=ImageOptions().cache_variant)
+        assert ocr_cache.get(key).title == path.stem
+
+    # Extracted images are not sent again
+    assert extract_to_cache(client, images[:2], ocr_cache, poll_interval=0) == {}
+    assert len(client.uploads) == 1
+
+
+def test_extract_to_cache_reports_unreadable_images(cache_dir, images, tmp_path):
+    ocr_cache = OCRCache(cache_dir / 'ocr.sqlite3')
+    client = FakeBatchClient(_titles(images))
+    missing = tmp_path / 'missing.jpg'
+
+    failures = extract_to_cache(client, [missing, *images], ocr_cache, poll_interval=0)
+
+    assert list(failures) == [missing]
+    assert extract_to_cache(client, [missing], ocr_cache, poll_interval=0).keys() == {missing}
+    assert len(client.uploads) == 1
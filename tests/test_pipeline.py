@@ -0,0 +1,74 @@
+from threading import Event, Thread
+from time import sleep
+
+from cook_upload.pipeline import Pipeline, Stage
+
+
+def test_items_go_through_every_stage():
+    pipeline = Pipeline(
+        [
+            Stage('double', lambda _key, value: value * 2, workers=2),
+            Stage('increment', lambda _key, value: value + 1, workers=3, queue_size=2),
+        ],
+    )
+    assert dict(pipeline.run((i, i) for i in range(10))) == {i: i * 2 + 1 for i in range(10)}
+
+
+def test_failures_skip_the_next_stages():
+    seen = []
+
+    def fail_odd(key, value):
+        if key % 2:
+            raise ValueError(key)
+        return value
+
+    pipeline = Pipeline(
+        [Stage('fail', fail_odd), Stage('record', lambda key, value: seen.append(key) or value)],
+    )
+    results = dict(pipeline.run((i, i) for i in range(4)))
+
+    assert sorted(seen) == [0, 2]
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 2
+
+
+def test_stages_overlap():
+    second_prepared = Event()
+
+    def prepare(key, value):
+        if key == 1:
+            second_prepared.set()
+        return value
+
+    def extract(key, value):
+        # The first image is extracted while the second one is prepared
+        if key == 0:
+            assert second_prepared.wait(timeout=5)
+        return value
+
+    pipeline = Pipeline([Stage('prepare', prepare), Stage('extract', extract)])
+    assert dict(pipeline.run((i, i) for i in range(3))) == {0: 0, 1: 1, 2: 2}
+
+
+def test_bounded_queues_apply_backpressure():
+    prepared, release = [], Event()
+
+    def extract(_key, value):
+        release.wait(timeout=5)
+        return value
+
+    pipeline = Pipeline(
+        [
+            Stage('prepare', lambda key, value: prepared.append(key) or value),
+            Stage('extract', extract),
+        ],
+    )
+    collected = []
+    consumer = Thread(target=lambda: collected.extend(pipeline.run((i, i) for i in range(20))))
+    consumer.start()
+    sleep(0.2)
+    # One image in the extract stage, one waiting in its queue, one blocked on the queue
+    assert len(prepared) <= 3
+    release.set()
+    consumer.join(timeout=5)
+    assert len(collected) == 20
@@ -0,0 +1,76 @@
+import asyncio
+from threading import Thread
+
+import pytest
+
+from cook_upload.rate_limit import RateLimiter, TokenBucket, notion_rate_limiter
+
+
+@pytest.fixture
+def clock(mocker):
+    """Fake monotonic clock, advanced by the sleeps of the limiter."""
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    async def asleep(seconds):
+        now[0] += seconds
+
+    mocker.patch('cook_upload.rate_limit.monotonic', side_effect=lambda: now[0])
+    mocker.patch('cook_upload.rate_limit.sleep', side_effect=sleep)
+    mocker.patch('cook_upload.rate_limit.asyncio.sleep', side_effect=asleep)
+    return now
+
+
+def test_bucket_allows_a_burst_then_waits(clock):
+    bucket = TokenBucket(rate=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == pytest.approx(1 / 3)
+    assert bucket.reserve() == pytest.approx(2 / 3)
+
+    clock[0] += 10
+    assert bucket.reserve() == 0
+
+
+def test_requests_per_second(clock):
+    limiter = RateLimiter('Notion', requests_per_second=3)
+    for _ in range(9):
+        limiter.acquire()
+    # The first 3 are a burst, the next 6 are spread at 3 per second
+    assert clock[0] == pytest.approx(2)
+
+
+def test_tokens_per_minute(clock):
+    limiter = RateLimiter('OpenAI', requests_per_minute=600, tokens_per_minute=6000)
+    limiter.acquire(tokens=6000)
+    limiter.acquire(tokens=3000)
+    assert clock[0] == pytest.approx(30)
+
+
+async def test_async_acquire(clock):
+    limiter = RateLimiter('Notion', requests_per_second=2)
+    await asyncio.gather(*(limiter.aacquire() for _ in range(6)))
+    assert clock[0] == pytest.approx(2)
+
+
+@pytest.mark.usefixtures('clock')
+def test_limiter_is_shared_between_threads():
+    limiter = RateLimiter('Notion', requests_per_second=1000)
+    delays = []
+    threads = [
+        Thread(target=lambda: delays.extend(limiter._delay(0) for _ in range(500)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 2000 requests at 1000 per second with a burst of 1000 end one second later
+    assert max(delays) == pytest.approx(1)
+
+
+def test_disabled_limits(monkeypatch):
+    monkeypatch.setenv('COOK_UPLOAD_NOTION_RPS', '0')
+    notion_rate_limiter.cache_clear()
+    assert notion_rate_limiter()._delay(0) == 0
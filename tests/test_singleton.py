@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from time import sleep
+
+from cook_upload.singleton import singleton
+
+
+def test_singleton_builds_once_across_threads():
+    barrier = Barrier(8)
+    built = []
+
+    @singleton
+    def shared():
+        built.append(object())
+        sleep(0.01)
+        return built[-1]
+
+    def first_call(_):
+        barrier.wait()
+        return shared()
+
+    with ThreadPoolExecutor(8) as executor:
+        instances = set(map(id, executor.map(first_call, range(8))))
+
+    assert len(built) == 1
+    assert instances == {id(built[0])}
+    shared.cache_clear()
+    assert shared() is not built[0]
@@ -0,0 +1,180 @@
+import pytest
+
+from cook_upload import (
+    NotionActions,
+    NotionDBMetadata,
+    NotionTitleSearch,
+    PageAlreadyCreatedError,
+    TitleIndex,
+)
+from cook_upload.title_index import normalize_title, title_grams
+
+
+@pytest.fixture
+def search(page_payload) -> NotionTitleSearch:
+    return NotionTitleSearch.model_validate(page_payload)
+
+
+@pytest.fixture(autouse=True)
+def metadata(notion: NotionActions, metadata_payload, mocker):
+    return mocker.patch.object(
+        notion,
+        'get_db_metadata',
+        return_value=NotionDBMetadata.model_validate(metadata_payload),
+    )
+
+
+@pytest.fixture
+def index(cache_dir) -> TitleIndex:
+    return TitleIndex('db', cache_dir=cache_dir)
+
+
+def test_normalize_title():
+    assert normalize_title('  Spaghetti   CARBONARA ') == 'spaghetti carbonara'
+
+
+def test_title_grams():
+    assert title_grams('pho') == {' ph', 'pho', 'ho '}
+
+
+def _add(index: TitleIndex, page_id: str, title: str) -> None:
+    index._set(page_id, {'title': title, 'source': 'Leith', 'url': f'https://notion.so/{page_id}'})
+
+
+def test_similar_titles_are_ranked(index: TitleIndex):
+    _add(index, '1', 'Spaghetti alla Carbonara')
+    _add(index, '2', 'Spaghetti Carbonara')
+    _add(index, '3', 'Spaghetti Bolognese')
+    _add(index, '4', 'Baklava')
+
+    similar = index.similar('spaghetti  carbonara', threshold=0.3)
+    assert [page['title'] for _, page in similar] == [
+        'Spaghetti Carbonara',
+        'Spaghetti alla Carbonara',
+        'Spaghetti Bolognese',
+    ]
+    assert similar[0][0] == 1
+    assert [page['title'] for _, page in index.similar('Spaghetti Carbonara')] == [
+        'Spaghetti Carbonara',
+        'Spaghetti alla Carbonara',
+    ]
+
+
+def test_similar_forgets_removed_titles(index: TitleIndex):
+    _add(index, '1', 'Spaghetti Carbonara')
+    _add(index, '1', 'Baklava')
+    assert index.similar('Spaghetti Carbonara') == []
+    assert index.similar('Baklava')[0][1]['url'] == 'https://notion.so/1'
+
+
+def test_sync_then_lookup(notion: NotionActions, index: TitleIndex, search, mocker):
+    mocked_query = mocker.patch.object(notion, 'query_titles', return_value=search)
+
+    assert index.sync(notion) == 1
+    assert 'filter' not in mocked_query.call_args[0][0]
+    assert mocked_query.call_args[0][1] == ['title', 'uv%5DN']
+    assert index.lookup('baklava') == [
+        'https://www.notion.so/Baklava-d4251acfeb2d4f659809543ca7524094',
+    ]
+    assert index.lookup('Baklava', source='lebanon cookbookp pg 413')
+    assert index.lookup('Baklava', source='Other') == []
+    assert index.lookup('Moise') == []
+
+
+def test_sync_is_incremental(notion: NotionActions, index: TitleIndex, search, mocker):
+    mocked_query = mocker.patch.object(notion, 'query_titles', return_value=search)
+    index.sync(notion)
+    index.sync(notion)
+
+    body = mocked_query.call_args[0][0]
+    assert body['filter']['last_edited_time'] == {'on_or_after': '2021-06-16T20:45:00+00:00'}
+
+
+def test_sync_follows_cursors(notion: NotionActions, index: TitleIndex, page_payload, mocker):
+    first = NotionTitleSearch.model_validate({**page_payload, 'has_more': True, 'next_cursor': '1'})
+    second = NotionTitleSearch.model_validate({**page_payload, 'results': []})
+    mocked_query = mocker.patch.object(notion, 'query_titles', side_effect=[first, second])
+
+    assert index.sync(notion) == 1
+    assert mocked_query.call_args[0][0]['start_cursor'] == '1'
+
+
+def test_ensure_synced_within_interval(notion: NotionActions, index: TitleIndex, search, mocker):
+    mocked_query = mocker.patch.object(notion, 'query_titles', return_value=search)
+    index.ensure_synced(notion)
+    index.ensure_synced(notion)
+    assert mocked_query.call_count == 1
+
+
+def test_index_is_persisted(notion: NotionActions, index: TitleIndex, search, cache_dir, mocker):
+    mocker.patch.object(notion, 'query_titles', return_value=search)
+    index.sync(notion)
+
+    loaded = TitleIndex('db', cache_dir=cache_dir)
+    assert len(loaded) == 1
+    assert loaded.last_edited_time == index.last_edited_time
+    assert loaded.lookup('Baklava')
+
+
+def test_add_does_not_move_sync_position(index: TitleIndex, search):
+    index.add(search.results[0])
+    assert index.lookup('Baklava')
+    assert index.last_edited_time is None
+
+
+def test_archived_pages_are_removed(index: TitleIndex, search, page_payload):
+    index.update(search.results)
+    page_payload['results'][0]['archived'] = True
+    index.update(NotionTitleSearch.model_validate(page_payload).results)
+    assert index.lookup('Baklava') == []
+
+
+def test_is_title_used_with_index(notion: NotionActions, index: TitleIndex, search, mocker):
+    mocked_query = mocker.patch.object(notion, 'query_titles', return_value=search)
+    notion.title_index = index
+
+    with pytest.raises(PageAlreadyCreatedError, match='Baklava'):
+        notion.is_title_used(title='baklava', source='Lebanon Cookbookp pg 413')
+    assert notion.is_title_used(title='Moise', source='moise') is None
+    # The sync, then the check of the page found in the index
+    assert mocked_query.call_count == 2
+
+
+def test_is_title_used_drops_deleted_pages(
+    notion: NotionActions,
+    index: TitleIndex,
+    search,
+    mocker,
+):
+    index.update(search.results)
+    index.ensure_synced = mocker.Mock()
+    empty = NotionTitleSearch(results=[], has_more=False)
+    mocked_query = mocker.patch.object(notion, 'query_titles', return_value=empty)
+    notion.title_index = index
+
+    assert notion.is_title_used(title='baklava', source='Lebanon Cookbookp pg 413') is None
+    assert index.lookup('Baklava') == []
+    assert notion.is_title_used(title='baklava', source='Lebanon Cookbookp pg 413') is None
+    mocked_query.assert_called_once()
+
+
+def test_is_title_used_reports_similar_titles(notion: NotionActions, index: TitleIndex, mocker):
+    mocker.patch.object(
+        notion,
+        'query_titles',
+        return_value=NotionTitleSearch(results=[], has_more=False),
+    )
+    mocked_warning = mocker.patch('cook_upload.notion_actions.logger.warning')
+    _add(index, '1', 'Spaghetti alla Carbonara')
+    _add(index, '2', 'Chicken Curry')
+    notion.title_index = index
+
+    assert notion.is_title_used(title='Spaghetti Carbonara', source='Leith') is None
+    assert 'https://notion.so/1' in mocked_warning.call_args[0][0]
+    assert notion.is_title_used(title='Chicken Curry Soup', source='Leith') is None
+    assert 'https://notion.so/2' in mocked_warning.call_args[0][0]
+
+    mocked_warning.reset_mock()
+    index.similarity_threshold = 1
+    assert notion.is_title_used(title='Spaghetti Carbonara', source='Leith') is None
+    mocked_warning.assert_not_called()
@@ -0,0 +1,75 @@
+import os
+
+from typer.testing import CliRunner
+
+from cook_upload.watch import FolderWatcher, app
+
+runner = CliRunner()
+
+
+def test_poll_waits_for_files_to_settle(tmp_path):
+    watcher = FolderWatcher(tmp_path, settle=5)
+    photo = tmp_path / 'photo.jpg'
+    photo.write_bytes(b'\xff\xd8')
+    (tmp_path / '.photo.jpg').write_bytes(b'\xff\xd8')
+    (tmp_path / 'notes.txt').write_text('not an image')
+
+    assert watcher.poll(now=0) == []
+    assert watcher.poll(now=4) == []
+    # Still being written, the wait starts over
+    photo.write_bytes(b'\xff\xd8\xff')
+    assert watcher.poll(now=6) == []
+    assert watcher.poll(now=11) == [photo]
+    assert watcher.poll(now=20) == []
+
+
+def test_poll_reports_replaced_files(tmp_path):
+    watcher = FolderWatcher(tmp_path, settle=0)
+    photo = tmp_path / 'photo.jpg'
+    photo.write_bytes(b'\xff\xd8')
+    watcher.poll(now=0)
+    assert watcher.poll(now=0) == [photo]
+
+    photo.write_bytes(b'\xff\xd8\xff')
+    os.utime(photo, ns=(1, 1))
+    watcher.poll(now=1)
+    assert watcher.poll(now=1) == [photo]
+
+
+def test_poll_skips_empty_files(tmp_path):
+    watcher = FolderWatcher(tmp_path, settle=0)
+    (tmp_path / 'photo.jpg').touch()
+    watcher.poll(now=0)
+    assert watcher.poll(now=1) == []
+
+
+def test_watch_command(tmp_path, mocker):
+    photo = tmp_path / 'photo.jpg'
+    photo.write_bytes(b'\xff\xd8\xff')
+    mocker.patch(
+        'cook_upload.notion_actions.NotionActions.dish_type',
+        new_callable=mocker.PropertyMock,
+        return_value=['meat'],
+    )
+    mocker.patch('cook_upload.watch.get_notion_instance')
+    mocker.patch('cook_upload.watch.get_openai_instance')
+    mocked_batch = mocker.patch('cook_upload.watch.run_batch', return_value={})
+    mocker.patch('cook_upload.watch.sleep', side_effect=[None, KeyboardInterrupt])
+    results = runner.invoke(
+        app,
+        [tmp_path.as_posix(), '-s', 'leith', '--difficulty', 'easy', '-t', 'meat', '--settle', '0'],
+    )
+
+    assert results.exit_code == 0
+    assert f'{photo}: OK' in results.output
+    assert mocked_batch.call_args[0][:2] == (
+        [(photo, {})],
+        {
+            'difficulty': 'Easy',
+            'type_': 'Meat',
+            'origin': None,
+            'date': None,
+            'source': 'Leith',
+            'force': False,
+        },
+    )